@@ -2,6 +2,17 @@ import { useState, useEffect } from 'react'
 import './AdminPanel.css'
 import apiService from './services/api'
 
+// Insert record, or replace the one with the same id in place
+const upsertById = (list, record) => {
+  const index = list.findIndex((item) => item.id === record.id)
+  if (index === -1) return [...list, record]
+  const next = [...list]
+  next[index] = record
+  return next
+}
+
+const removeById = (list, id) => list.filter((item) => item.id !== id)
+
 function AdminPanel() {
   const [isLoggedIn, setIsLoggedIn] = useState(false)
   const [loginUsername, setLoginUsername] = useState('')
@@ -18,15 +29,41 @@ function AdminPanel() {
   const [aboutContent, setAboutContent] = useState('')
   const [aboutVideo, setAboutVideo] = useState('')
   const [successMessage, setSuccessMessage] = useState('')
+  // True while the change feed is connected and keeping the lists current
+  const [liveUpdates, setLiveUpdates] = useState(false)
 
   useEffect(() => {
     const token = apiService.getToken()
     if (token) {
       setIsLoggedIn(true)
-      loadAllData()
     }
   }, [])
 
+  // The feed starts with a reset (load everything) and then sends each change as it happens
+  useEffect(() => {
+    if (!isLoggedIn) return undefined
+    let loaded = false
+    const unsubscribe = apiService.subscribeToChanges({
+      onReset: () => {
+        loaded = true
+        loadAllData()
+      },
+      onEvent: applyChange,
+      onStatus: (status) => {
+        setLiveUpdates(status === 'live')
+        // Without the feed, load once; changes made here then reload the lists
+        if (status !== 'live' && !loaded) {
+          loaded = true
+          loadAllData()
+        }
+      }
+    })
+    return () => {
+      unsubscribe()
+      setLiveUpdates(false)
+    }
+  }, [isLoggedIn])
+
   // Form states
   const [newPackageName, setNewPackageName] = useState('')
   const [newPackagePrice, setNewPackagePrice] = useState('')
@@ -48,7 +85,6 @@ function AdminPanel() {
       setIsLoggedIn(true)
       setLoginUsername('')
       setLoginPassword('')
-      loadAllData()
     } else {
       setError(result.message || 'Invalid credentials')
     }
@@ -87,6 +123,43 @@ function AdminPanel() {
     setLoading(false)
   }
 
+  // Our own changes arrive through the feed too; without it, reload the lists
+  const refreshUnlessLive = () => {
+    if (!liveUpdates) loadAllData()
+  }
+
+  // ===== LIVE CHANGES =====
+  const applyChange = (type, data) => {
+    const setPackages = data.collection === 'high_selling_packages' ? setHighSellingPackages : setAllPackages
+    switch (type) {
+      case 'enquiry.created':
+        setEnquiries((list) => upsertById(list, data.enquiry))
+        break
+      case 'enquiry.deleted':
+        setEnquiries((list) => removeById(list, data.enquiry.id))
+        break
+      case 'package.created':
+      case 'package.updated':
+        setPackages((list) => upsertById(list, data.package))
+        break
+      case 'package.deleted':
+        setPackages((list) => removeById(list, data.package.id))
+        break
+      case 'image.added':
+        setHomeImages((list) => upsertById(list, data.image))
+        break
+      case 'image.deleted':
+        setHomeImages((list) => removeById(list, data.image.id))
+        break
+      case 'about.updated':
+        // Only the video: text being edited here is left alone
+        setAboutVideo(data.about?.video || '')
+        break
+      default:
+        break
+    }
+  }
+
   // ===== PACKAGE FUNCTIONS =====
   const handleCreateOrUpdatePackage = async (isHighSelling = false) => {
     if (!newPackageName || !newPackagePrice || !newPackageDesc) {
@@ -119,7 +192,7 @@ function AdminPanel() {
         if (result.success) {
           setSuccessMessage('Package updated successfully!')
           resetPackageForm()
-          loadAllData()
+          refreshUnlessLive()
         } else {
           setError('Failed to update package')
         }
@@ -131,7 +204,7 @@ function AdminPanel() {
         if (result.success) {
           setSuccessMessage('Package created successfully!')
           resetPackageForm()
-          loadAllData()
+          refreshUnlessLive()
         } else {
           setError('Failed to create package')
         }
@@ -176,7 +249,7 @@ function AdminPanel() {
     
     if (result.success) {
       setSuccessMessage('Package deleted successfully!')
-      loadAllData()
+      refreshUnlessLive()
       setTimeout(() => setSuccessMessage(''), 3000)
     }
     setLoading(false)
@@ -190,7 +263,7 @@ function AdminPanel() {
 
     if (result.success) {
       setSuccessMessage('Enquiry deleted successfully!')
-      loadAllData()
+      refreshUnlessLive()
       setTimeout(() => setSuccessMessage(''), 3000)
     } else {
       setError(result.message || 'Failed to delete enquiry')
@@ -210,7 +283,7 @@ function AdminPanel() {
     
     if (result.success) {
       setSuccessMessage('Image uploaded successfully!')
-      loadAllData()
+      refreshUnlessLive()
       setTimeout(() => setSuccessMessage(''), 3000)
     }
     setLoading(false)
@@ -256,7 +329,7 @@ function AdminPanel() {
     
     if (result.success) {
       setSuccessMessage('Image uploaded successfully!')
-      loadAllData()
+      refreshUnlessLive()
       setTimeout(() => setSuccessMessage(''), 3000)
     }
     setLoading(false)
@@ -270,7 +343,7 @@ function AdminPanel() {
     
     if (result.success) {
       setSuccessMessage('Image deleted successfully!')
-      loadAllData()
+      refreshUnlessLive()
       setTimeout(() => setSuccessMessage(''), 3000)
     }
     setLoading(false)
@@ -2,6 +2,29 @@ import { useState, useEffect } from 'react'
 import './App.css'
 import apiService from './services/api'
 
+// Resized WebP/AVIF copies the backend records for uploaded images, best format first
+const VARIANT_FORMATS = ['avif', 'webp']
+
+// Picture element offering an image's recorded variants by format and width; falls back to src
+function ResponsiveImage({ src, variants, sizes, alt, className }) {
+  const sources = VARIANT_FORMATS.map((format) => ({
+    format,
+    srcSet: (variants || [])
+      .filter((variant) => variant.format === format)
+      .map((variant) => `${apiService.resolveMediaUrl(variant.url)} ${variant.width}w`)
+      .join(', ')
+  })).filter((source) => source.srcSet)
+
+  return (
+    <picture>
+      {sources.map((source) => (
+        <source key={source.format} type={`image/${source.format}`} srcSet={source.srcSet} sizes={sizes} />
+      ))}
+      <img src={src} alt={alt} className={className} />
+    </picture>
+  )
+}
+
 function MainSite() {
   const [currentSection, setCurrentSection] = useState('home')
   const [sliderIndex, setSliderIndex] = useState(0)
@@ -21,40 +44,44 @@ function MainSite() {
   useEffect(() => {
     const loadPublicData = async () => {
       try {
-        const [home, highSelling, all, about] = await Promise.all([
-          apiService.getHomeImages(),
-          apiService.getHighSellingPackages(),
-          apiService.getPackages(),
-          apiService.getAbout()
-        ])
+        const site = await apiService.getSite()
+        const {
+          home_images: homeImages = [],
+          high_selling_packages: highSelling = [],
+          all_packages: all = [],
+          about = {}
+        } = site.data || {}
 
-        const backendSliderImages = (home.data || []).map((img) => apiService.resolveMediaUrl(img.url))
+        const backendSliderImages = homeImages.map((img) => ({
+          src: apiService.resolveMediaUrl(img.url),
+          variants: img.variants
+        }))
         setSliderImages(
           backendSliderImages.length > 0
             ? backendSliderImages
             : [
-                'https://picsum.photos/800/400?random=1',
-                'https://picsum.photos/800/400?random=2',
-                'https://picsum.photos/800/400?random=3'
+                { src: 'https://picsum.photos/800/400?random=1' },
+                { src: 'https://picsum.photos/800/400?random=2' },
+                { src: 'https://picsum.photos/800/400?random=3' }
               ]
         )
 
         setHighSellingPackages(
-          (highSelling.data || []).map((pkg) => ({
+          highSelling.map((pkg) => ({
             ...pkg,
             image: apiService.resolveMediaUrl(pkg.image)
           }))
         )
         setAllPackages(
-          (all.data || []).map((pkg) => ({
+          all.map((pkg) => ({
             ...pkg,
             image: apiService.resolveMediaUrl(pkg.image)
           }))
         )
 
-        setAboutContent(about.data?.content || '')
-        setHistoryContent(about.data?.history || '')
-        setVideoUrl(apiService.resolveMediaUrl(about.data?.video || ''))
+        setAboutContent(about.content || '')
+        setHistoryContent(about.history || '')
+        setVideoUrl(apiService.resolveMediaUrl(about.video || ''))
       } catch (error) {
         console.error('Error loading site data:', error)
       }
@@ -150,7 +177,14 @@ function MainSite() {
       {/* Home Section */}
       <section id="home" className="section home">
         <div className="slider">
-          <img src={sliderImages[sliderIndex]} alt="Slider" />
+          {sliderImages[sliderIndex] && (
+            <ResponsiveImage
+              src={sliderImages[sliderIndex].src}
+              variants={sliderImages[sliderIndex].variants}
+              sizes="(max-width: 768px) 100vw, 70vw"
+              alt="Slider"
+            />
+          )}
           <button className="slider-arrow left-arrow" onClick={() => setSliderIndex((prevIndex) => (prevIndex - 1 + sliderImages.length) % sliderImages.length)}>&larr;</button>
           <button className="slider-arrow right-arrow" onClick={() => setSliderIndex((prevIndex) => (prevIndex + 1) % sliderImages.length)}>&rarr;</button>
         </div>
@@ -158,7 +192,7 @@ function MainSite() {
           <div className="packages-grid">
             {highSellingPackages.map((pkg, index) => (
               <div key={index} className="package-card">
-                <img src={pkg.image} alt={pkg.name} className="package-image" />
+                <ResponsiveImage src={pkg.image} variants={pkg.image_variants} sizes="320px" alt={pkg.name} className="package-image" />
                 <h3>{pkg.name}</h3>
                 <p>{pkg.description}</p>
                 <p>{pkg.price}</p>
@@ -174,7 +208,13 @@ function MainSite() {
         <div className="packages-grid">
           {allPackages.map((pkg, index) => (
             <div key={index} className="package-card">
-              <img src={pkg.image} alt={pkg.name} className="package-image" />
+              <ResponsiveImage
+                src={pkg.image}
+                variants={pkg.image_variants}
+                sizes="(max-width: 600px) 100vw, 400px"
+                alt={pkg.name}
+                className="package-image"
+              />
               <h3>{pkg.name}</h3>
               <p>{pkg.description}</p>
               <p>{pkg.price}</p>
@@ -1,6 +1,8 @@
 const ENV_API_BASE = import.meta.env.VITE_API_BASE?.trim()
 const API_BASE = ENV_API_BASE || ''
 const API_URL = API_BASE ? `${API_BASE}/api` : '/api'
+// Files above this size are sent as resumable chunks instead of one multipart request
+const CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024
 
 const apiService = {
   getToken: () => localStorage.getItem('token'),
@@ -118,6 +120,22 @@ const apiService = {
     }
   },
 
+  deleteEnquiries: async (enquiryIds) => {
+    try {
+      const response = await fetch(`${API_URL}/enquiries/batch`, {
+        method: 'POST',
+        headers: apiService.getHeaders(),
+        body: JSON.stringify({ operations: enquiryIds.map((id) => ({ op: 'delete', id })) })
+      })
+
+      const data = await response.json()
+      return data
+    } catch (error) {
+      console.error('Error deleting enquiries:', error)
+      return { success: false, message: 'Network error' }
+    }
+  },
+
   downloadEnquiriesExcel: async () => {
     try {
       const token = apiService.getToken()
@@ -153,6 +171,103 @@ const apiService = {
     }
   },
 
+  // ===== LIVE CHANGES =====
+  // Follow /events (server-sent events) with fetch, which unlike EventSource can send the token.
+  // onReset() means reload everything; onEvent(type, data) gets each change after that;
+  // onStatus('live' | 'offline' | 'unauthorized') reports the connection. Returns a function that stops it.
+  subscribeToChanges: ({ onReset, onEvent, onStatus }) => {
+    let stopped = false
+    let controller = null
+    let lastEventId = null
+    let retryMs = 2000
+
+    const dispatch = (block) => {
+      let type = 'message'
+      let data = null
+      for (const line of block.split('\n')) {
+        if (!line || line.startsWith(':')) continue
+        const colon = line.indexOf(':')
+        const field = colon === -1 ? line : line.slice(0, colon)
+        const value = colon === -1 ? '' : line.slice(colon + 1).replace(/^ /, '')
+        if (field === 'event') type = value
+        else if (field === 'data') data = data === null ? value : `${data}\n${value}`
+        else if (field === 'id') lastEventId = value
+        else if (field === 'retry' && /^\d+$/.test(value)) retryMs = Number(value)
+      }
+      if (data === null) return
+      if (type === 'reset') onReset?.()
+      else onEvent?.(type, JSON.parse(data))
+    }
+
+    const follow = async () => {
+      while (!stopped) {
+        let waitMs = retryMs
+        controller = new AbortController()
+        try {
+          const headers = { ...apiService.getHeaders() }
+          delete headers['Content-Type']
+          // Resume after the last change we saw instead of reloading
+          if (lastEventId !== null) headers['Last-Event-ID'] = lastEventId
+          const response = await fetch(`${API_URL}/events`, { headers, signal: controller.signal })
+          if (response.status === 401) {
+            onStatus?.('unauthorized')
+            return
+          }
+          if (!response.ok || !response.body) {
+            // 503 when the server already serves its share of streams
+            waitMs = Math.max(retryMs, Number(response.headers.get('retry-after') || 0) * 1000)
+            throw new Error(`HTTP ${response.status}`)
+          }
+          onStatus?.('live')
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+          let buffer = ''
+          while (true) {
+            const { value, done } = await reader.read()
+            if (done) break
+            buffer += value
+            let end
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+              dispatch(buffer.slice(0, end))
+              buffer = buffer.slice(end + 2)
+            }
+          }
+          // The server ends streams now and then; reconnecting picks up where this one stopped
+        } catch (error) {
+          if (stopped) return
+          console.error('Change feed error:', error)
+          onStatus?.('offline')
+        }
+        if (!stopped) await new Promise((resolve) => setTimeout(resolve, waitMs))
+      }
+    }
+
+    follow()
+    return () => {
+      stopped = true
+      controller?.abort()
+    }
+  },
+
+  // ===== SITE BOOTSTRAP =====
+  // Everything the public homepage needs, from one server-side snapshot
+  getSite: async () => {
+    try {
+      const response = await fetch(`${API_URL}/site`, {
+        method: 'GET',
+        headers: apiService.getHeaders()
+      })
+
+      const data = await response.json()
+      return data
+    } catch (error) {
+      console.error('Error fetching site data:', error)
+      return {
+        success: false,
+        data: { home_images: [], high_selling_packages: [], all_packages: [], about: { content: '', video: '' } }
+      }
+    }
+  },
+
   // ===== HIGH-SELLING PACKAGES =====
   getHighSellingPackages: async () => {
     try {
@@ -232,6 +347,25 @@ const apiService = {
     }
   },
 
+  // params: { q, min_price, max_price, currency, min_duration, max_duration, sort, limit, offset }
+  searchPackages: async (params = {}) => {
+    try {
+      const query = new URLSearchParams(
+        Object.entries(params).filter(([, value]) => value !== undefined && value !== null && value !== '')
+      )
+      const response = await fetch(`${API_URL}/packages/search?${query}`, {
+        method: 'GET',
+        headers: apiService.getHeaders()
+      })
+
+      const data = await response.json()
+      return data
+    } catch (error) {
+      console.error('Error searching packages:', error)
+      return { success: false, data: [], total: 0, facets: {} }
+    }
+  },
+
   createAllPackage: async (packageData) => {
     try {
       const response = await fetch(`${API_URL}/packages`, {
@@ -279,6 +413,50 @@ const apiService = {
     }
   },
 
+  // operations: [{ op: 'create', data }, { op: 'update', id, data }, { op: 'delete', id }]
+  batchPackages: async (operations, highSelling = false) => {
+    try {
+      const response = await fetch(`${API_URL}/${highSelling ? 'high-selling-packages' : 'packages'}/batch`, {
+        method: 'POST',
+        headers: apiService.getHeaders(),
+        body: JSON.stringify({ operations })
+      })
+
+      const data = await response.json()
+      return data
+    } catch (error) {
+      console.error('Error applying package batch:', error)
+      return { success: false, message: 'Network error' }
+    }
+  },
+
+  // CSV or XLSX with a header row: name, price, description, duration, includes
+  importPackages: async (file, highSelling = false) => {
+    try {
+      const formData = new FormData()
+      formData.append('file', file)
+
+      const token = apiService.getToken()
+      const headers = {}
+
+      if (token) {
+        headers['Authorization'] = `Bearer ${token}`
+      }
+
+      const response = await fetch(`${API_URL}/${highSelling ? 'high-selling-packages' : 'packages'}/import`, {
+        method: 'POST',
+        headers,
+        body: formData
+      })
+
+      const data = await response.json()
+      return data
+    } catch (error) {
+      console.error('Error importing packages:', error)
+      return { success: false, message: 'Network error' }
+    }
+  },
+
   // ===== HOME IMAGES =====
   getHomeImages: async () => {
     try {
@@ -336,6 +514,22 @@ const apiService = {
     }
   },
 
+  deleteHomeImages: async (imageIds) => {
+    try {
+      const response = await fetch(`${API_URL}/home-images/batch`, {
+        method: 'POST',
+        headers: apiService.getHeaders(),
+        body: JSON.stringify({ operations: imageIds.map((id) => ({ op: 'delete', id })) })
+      })
+
+      const data = await response.json()
+      return data
+    } catch (error) {
+      console.error('Error deleting home images:', error)
+      return { success: false, message: 'Network error' }
+    }
+  },
+
   // ===== PACKAGE IMAGES =====
   uploadPackageImage: async (packageId, file) => {
     try {
@@ -421,8 +615,55 @@ const apiService = {
     }
   },
 
+  // Send a file through /uploads in chunks; a failed chunk is retried from the offset the server reports
+  uploadInChunks: async (file, target, extra = {}) => {
+    const headers = apiService.getHeaders()
+    const startResponse = await fetch(`${API_URL}/uploads`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify({ target, filename: file.name, size: file.size, ...extra })
+    })
+    const started = await startResponse.json()
+    if (!startResponse.ok) return started
+
+    const { id, chunk_size: chunkSize } = started.data
+    const authHeaders = { ...headers }
+    delete authHeaders['Content-Type']
+    let offset = 0
+    let retries = 0
+    while (offset < file.size) {
+      const end = Math.min(offset + chunkSize, file.size)
+      try {
+        const response = await fetch(`${API_URL}/uploads/${id}`, {
+          method: 'PUT',
+          headers: { ...authHeaders, 'Content-Range': `bytes ${offset}-${end - 1}/${file.size}` },
+          body: file.slice(offset, end)
+        })
+        const data = await response.json()
+        if (!response.ok && response.status !== 409) return data
+        if (response.ok) retries = 0
+        offset = data.data?.offset ?? offset
+        if (response.status === 409) {
+          const status = await fetch(`${API_URL}/uploads/${id}`, { headers })
+          offset = (await status.json()).data.offset
+        }
+      } catch (error) {
+        if (++retries > 3) throw error
+        const status = await fetch(`${API_URL}/uploads/${id}`, { headers })
+        offset = (await status.json()).data.offset
+      }
+    }
+
+    const complete = await fetch(`${API_URL}/uploads/${id}/complete`, { method: 'POST', headers })
+    return await complete.json()
+  },
+
   uploadAboutVideo: async (file) => {
     try {
+      if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        return await apiService.uploadInChunks(file, 'about-video')
+      }
+
       const formData = new FormData()
       formData.append('file', file)
       
@@ -1,18 +1,42 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Request, jsonify, request, send_from_directory
 from flask_cors import CORS
 from functools import wraps
 import jwt
+import csv
+import hashlib
+import hmac
+import io
 import json
+import math
+import mimetypes
 import os
+import time
 import uuid
+import urllib.request
 from pathlib import Path
-from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timedelta, timezone
+from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import generate_password_hash
+from storage import FileLock, JsonFileStore, StorageError, record_io
+from changes import ChangeLog, StreamSlots
+from repository import BatchError, DuplicateRecord, RecordNotFound, open_repository
+from jobs import JobQueue
+from metrics import registry as metrics
+from package_fields import backfill_package_fields, normalize_package_fields
+from package_import import ImportFormatError, read_package_rows
+from passwords import PasswordVerifier, VerifierBusy
+from ratelimit import DuplicateFilter, SharedTokenBucketLimiter, SlidingWindowLimiter
+from response_cache import ResponseCache
+from search import SORT_ORDERS, PackageSearchIndex
+from images import DerivativePool, pick_variant
+from static_files import SERVE_MODES, file_response
+from token_cache import TokenCache
+from uploads import ChunkedUploads, StreamingUploadFile, UploadIndex, UploadSessionError, save_upload, upload_filename
 try:
-    from openpyxl import Workbook, load_workbook
+    from openpyxl import Workbook
 except Exception:
     Workbook = None
-    load_workbook = None
 
 app = Flask(__name__)
 CORS(app)
@@ -21,10 +45,60 @@ CORS(app)
 app.config['SECRET_KEY'] = 'travel-app-secret-key-2024'
 BASE_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = BASE_DIR.parent.parent.parent
-app.config['UPLOAD_FOLDER'] = str(PROJECT_ROOT / 'uploads')
+app.config['UPLOAD_FOLDER'] = os.environ.get('TRAVEL_UPLOAD_DIR', str(PROJECT_ROOT / 'uploads'))
+
+# Partially received uploads; on the same filesystem so finished files are renamed into place
+INCOMING_UPLOAD_DIR = Path(app.config['UPLOAD_FOLDER']) / '.incoming'
+# Per-type upload size limits in bytes
+UPLOAD_LIMITS = {
+    'image': int(os.environ.get('UPLOAD_MAX_IMAGE_BYTES', 20 * 1024 * 1024)),
+    'video': int(os.environ.get('UPLOAD_MAX_VIDEO_BYTES', 2 * 1024 * 1024 * 1024)),
+    'import': int(os.environ.get('UPLOAD_MAX_IMPORT_BYTES', 20 * 1024 * 1024))
+}
+UPLOAD_KIND_BY_ENDPOINT = {
+    'upload_home_image': 'image',
+    'upload_package_image': 'image',
+    'upload_high_selling_package_image': 'image',
+    'upload_about_video': 'video',
+    'import_packages': 'import',
+    'import_high_selling_packages': 'import'
+}
+# Largest single chunk accepted by PUT /api/uploads/<id>
+UPLOAD_CHUNK_MAX_BYTES = 64 * 1024 * 1024
+# Upload filenames are never reused for different content, so clients may cache them forever
+UPLOADS_CACHE_CONTROL = os.environ.get('UPLOADS_CACHE_CONTROL', 'public, max-age=31536000, immutable')
+# Cache-Control for an uploaded image whose WebP/AVIF variants are still being generated: the same URL
+# is negotiated differently once they exist, so it must not be cached for long before then
+UPLOADS_PENDING_CACHE_CONTROL = os.environ.get('UPLOADS_PENDING_CACHE_CONTROL', 'public, max-age=60')
+# How /uploads bytes are sent: 'app' (sendfile via the WSGI server), 'x-sendfile' (Apache/lighttpd)
+# or 'x-accel-redirect' (nginx, with an internal location at UPLOADS_ACCEL_PREFIX)
+UPLOADS_SERVE_MODE = os.environ.get('UPLOADS_SERVE_MODE', 'app')
+if UPLOADS_SERVE_MODE not in SERVE_MODES:
+    raise ValueError(f'UPLOADS_SERVE_MODE must be one of {", ".join(SERVE_MODES)}')
+UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+# Proxies in front of the app (nginx, a load balancer) whose X-Forwarded-For/-Proto/-Host headers are
+# trusted, one per hop; 0 uses the connecting address, which behind a proxy is the proxy's own. Client
+# addresses key the login and enquiry limits, so set this to the number of proxies actually in front
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+# Whole-request cap; multipart framing needs a little room above the largest file
+app.config['MAX_CONTENT_LENGTH'] = max(UPLOAD_LIMITS.values()) + 1024 * 1024
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(INCOMING_UPLOAD_DIR, exist_ok=True)
+
+class StreamingUploadRequest(Request):
+    """Request whose file parts are streamed, hashed and size-checked straight into the uploads folder"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        kind = UPLOAD_KIND_BY_ENDPOINT.get(self.endpoint)
+        return StreamingUploadFile(INCOMING_UPLOAD_DIR, UPLOAD_LIMITS.get(kind, max(UPLOAD_LIMITS.values())))
+
+app.request_class = StreamingUploadRequest
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS, x_host=TRUSTED_PROXY_HOPS
+    )
 
 # Admin credentials (hashed)
 ADMIN_CREDENTIALS = {
@@ -32,111 +106,129 @@ ADMIN_CREDENTIALS = {
 }
 
 # Data storage paths
-DATA_FILE = BASE_DIR / 'data.json'
-ABOUT_FILE = BASE_DIR / 'about.json'
-USERS_FILE = BASE_DIR / 'users.json'
-ENQUIRIES_XLSX_FILE = BASE_DIR / 'enquiries.xlsx'
-DEFAULT_DATA_SCHEMA = {
-    'high_selling_packages': [],
-    'all_packages': [],
-    'home_images': [],
-    'enquiries': []
-}
+DATA_DIR = Path(os.environ.get('TRAVEL_DATA_DIR', BASE_DIR))
+# 'json' keeps records in data.json/about.json/users.json/enquiries.jsonl, 'sqlite' in one database file
+STORAGE_BACKEND = os.environ.get('TRAVEL_STORAGE', 'json')
+DATABASE_FILE = Path(os.environ.get('TRAVEL_DATABASE', DATA_DIR / 'travel.db'))
+UPLOADS_INDEX_FILE = DATA_DIR / 'uploads.json'
+ENQUIRIES_XLSX_FILE = DATA_DIR / 'enquiries.xlsx'
+# Records which enquiry log state enquiries.xlsx was built from
+ENQUIRIES_XLSX_STAMP_FILE = DATA_DIR / 'enquiries.xlsx.stamp'
+# Spool directory for background jobs that run after a request has committed
+JOB_SPOOL_DIR = DATA_DIR / 'spool'
+# Optional URL that receives a JSON POST for every enquiry created or deleted
+ENQUIRY_WEBHOOK_URL = os.environ.get('ENQUIRY_WEBHOOK_URL', '')
+# Cache-Control for public catalogue responses; clients revalidate with the ETag
+CATALOGUE_CACHE_CONTROL = os.environ.get('CATALOGUE_CACHE_CONTROL', 'public, no-cache')
+# Login attempts allowed per client IP and per username: a burst, then a steady rate per minute.
+# Counted in LOGIN_THROTTLE_FILE, so the limits hold across all server processes together
+LOGIN_THROTTLE_FILE = Path(os.environ.get('LOGIN_THROTTLE_FILE', DATA_DIR / 'login_throttle.db'))
+LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', '10'))
+LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', '10'))
+LOGIN_USER_BURST = int(os.environ.get('LOGIN_USER_BURST', '5'))
+LOGIN_USER_PER_MINUTE = float(os.environ.get('LOGIN_USER_PER_MINUTE', '5'))
+# Public enquiries allowed per client IP and per sender (email, else contact number) in a sliding window
+# of seconds; 0 disables a limit
+ENQUIRY_IP_LIMIT = int(os.environ.get('ENQUIRY_IP_LIMIT', '20'))
+ENQUIRY_IP_WINDOW = float(os.environ.get('ENQUIRY_IP_WINDOW', '600'))
+ENQUIRY_SENDER_LIMIT = int(os.environ.get('ENQUIRY_SENDER_LIMIT', '5'))
+ENQUIRY_SENDER_WINDOW = float(os.environ.get('ENQUIRY_SENDER_WINDOW', '3600'))
+# Seconds a repeated enquiry (same sender, package and message) is answered without storing it again
+ENQUIRY_DUPLICATE_WINDOW = float(os.environ.get('ENQUIRY_DUPLICATE_WINDOW', '3600'))
+# Password hashes checked in parallel, and the most checks allowed to wait for a slot
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', min(4, os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.environ.get('HASH_MAX_PENDING', HASH_WORKERS * 4))
+# Currency assumed for package prices that do not name one (e.g. "6777")
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+# Most operations accepted by one batch request (and rows by one package import)
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', '10000'))
+# Record changes streamed to the admin panel by /api/events, shared by all server processes
+CHANGES_FILE = DATA_DIR / 'changes.jsonl'
+# Most recent changes kept for clients resuming with Last-Event-ID; older ones get a 'reset'
+EVENTS_BACKLOG = int(os.environ.get('EVENTS_BACKLOG', '1000'))
+# Event streams one server process serves at once; each holds a thread (see GUNICORN_THREADS)
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', '2'))
+# Seconds before a stream is closed for the client to reconnect (and re-authenticate), and
+# seconds between keep-alive comments on a quiet stream (below proxy idle timeouts)
+EVENTS_STREAM_SECONDS = float(os.environ.get('EVENTS_STREAM_SECONDS', '300'))
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+# Milliseconds a client waits before reconnecting after a stream ends
+EVENTS_RETRY_MS = int(os.environ.get('EVENTS_RETRY_MS', '2000'))
+# Seconds between on-disk change checks for the in-memory stores
+STORE_CHECK_INTERVAL = float(os.environ.get('STORE_CHECK_INTERVAL', '1.0'))
+# Where server processes share their metrics so /metrics reports all of them; empty keeps each process's own
+METRICS_DIR = os.environ.get('METRICS_DIR', str(DATA_DIR / 'metrics'))
+# Seconds between writes of a process's metrics to METRICS_DIR
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '10'))
+# Bearer token /metrics requires; empty leaves it open, e.g. when the proxy blocks it from outside
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
 
-def ensure_data_schema(data):
-    normalized = dict(data) if isinstance(data, dict) else {}
-    for key, default_value in DEFAULT_DATA_SCHEMA.items():
-        if key not in normalized or not isinstance(normalized[key], list):
-            normalized[key] = list(default_value)
+def ensure_upload_index_schema(index):
+    normalized = dict(index) if isinstance(index, dict) else {}
+    if not isinstance(normalized.get('files'), dict):
+        normalized['files'] = {}
     return normalized
 
-# ===== UTILITY FUNCTIONS =====
-def load_data():
-    """Load data from JSON file with default structure"""
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            normalized = ensure_data_schema(data)
-            if normalized != data:
-                save_data(normalized)
-            return normalized
-        except Exception:
-            pass
-    return ensure_data_schema({})
-
-def save_data(data):
-    """Save data to JSON file"""
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(ensure_data_schema(data), f, indent=2)
-
-def load_about():
-    """Load about content"""
-    if os.path.exists(ABOUT_FILE):
-        try:
-            with open(ABOUT_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {'content': '', 'video': ''}
-
-def save_about(data):
-    """Save about content"""
-    with open(ABOUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
-
-def load_users():
-    if os.path.exists(USERS_FILE):
-        try:
-            with open(USERS_FILE, 'r', encoding='utf-8') as f:
-                users = json.load(f)
-            return users if isinstance(users, list) else []
-        except Exception:
-            return []
-    return []
-
-def save_users(users):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, indent=2)
-
-def append_enquiry_to_xlsx(enquiry):
-    """Append enquiry to enquiries.xlsx in backend folder."""
-    if Workbook is None or load_workbook is None:
-        return 'openpyxl is not installed; enquiry saved to JSON only.'
-
-    headers = ['ID', 'Name', 'Email', 'Contact', 'Package', 'Message', 'Timestamp']
-    if ENQUIRIES_XLSX_FILE.exists():
-        wb = load_workbook(ENQUIRIES_XLSX_FILE)
-        ws = wb.active
-    else:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Enquiries'
-        ws.append(headers)
-
-    ws.append([
-        enquiry.get('id', ''),
-        enquiry.get('name', ''),
-        enquiry.get('email', ''),
-        enquiry.get('contact', ''),
-        enquiry.get('package', ''),
-        enquiry.get('message', ''),
-        enquiry.get('timestamp', '')
-    ])
-    wb.save(ENQUIRIES_XLSX_FILE)
-    return None
-
-def rewrite_enquiries_xlsx(enquiries):
-    """Rewrite enquiries.xlsx from the current enquiries list."""
-    if Workbook is None or load_workbook is None:
-        return 'openpyxl is not installed; enquiry updated in JSON only.'
+# Packages, home images, users, about content and enquiries
+repository = open_repository(STORAGE_BACKEND, DATA_DIR, STORE_CHECK_INTERVAL, DATABASE_FILE)
+if STORAGE_BACKEND == 'sqlite':
+    # On switching from the json backend, start with the records it kept rather than an empty site
+    repository.adopt_json(DATA_DIR)
+job_queue = JobQueue(JOB_SPOOL_DIR, workers=int(os.environ.get('JOB_WORKERS', '2')))
+chunked_uploads = ChunkedUploads(INCOMING_UPLOAD_DIR)
+# Reference counts for the content-addressed files in the uploads folder
+upload_index = UploadIndex(
+    JsonFileStore(UPLOADS_INDEX_FILE, lambda: {'files': {}}, ensure_upload_index_schema, STORE_CHECK_INTERVAL),
+    app.config['UPLOAD_FOLDER']
+)
+# Worker processes that resize uploaded images into responsive WebP/AVIF variants. wsgi.py starts
+# them; under `python app.py` images are resized in the job thread, since spawned workers would
+# re-run this module's startup
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+derivative_pool = DerivativePool()
+# Login throttling happens before any password hash is computed
+login_ip_limiter = SharedTokenBucketLimiter(LOGIN_THROTTLE_FILE, 'ip', LOGIN_IP_PER_MINUTE / 60, LOGIN_IP_BURST)
+login_user_limiter = SharedTokenBucketLimiter(
+    LOGIN_THROTTLE_FILE, 'username', LOGIN_USER_PER_MINUTE / 60, LOGIN_USER_BURST
+)
+password_verifier = PasswordVerifier(HASH_WORKERS, HASH_MAX_PENDING)
+# Public enquiry form protection, checked before anything is stored. Counts are per server process,
+# so with several workers a client can get up to WEB_CONCURRENCY times these limits through
+enquiry_ip_limiter = SlidingWindowLimiter(ENQUIRY_IP_LIMIT, ENQUIRY_IP_WINDOW)
+enquiry_sender_limiter = SlidingWindowLimiter(ENQUIRY_SENDER_LIMIT, ENQUIRY_SENDER_WINDOW)
+recent_enquiries = DuplicateFilter(ENQUIRY_DUPLICATE_WINDOW, int(os.environ.get('ENQUIRY_DUPLICATE_MAX', '10000')))
+# Changes to enquiries, packages, home images and the about page, for /api/events
+change_log = ChangeLog(CHANGES_FILE, EVENTS_BACKLOG, STORE_CHECK_INTERVAL)
+event_streams = StreamSlots(EVENTS_MAX_STREAMS)
+# Decoded claims of recently seen bearer tokens
+token_cache = TokenCache(int(os.environ.get('TOKEN_CACHE_SIZE', '1024')))
+# Full-text and facet index over all_packages, kept in step with the collection
+package_search = PackageSearchIndex(repository.all_packages, DEFAULT_CURRENCY)
+# Encoded (and compressed) bodies of the public catalogue responses
+response_cache = ResponseCache()
+app.config['RESPONSE_CACHE'] = os.environ.get('RESPONSE_CACHE', '1') != '0'
+# Request counts and latency per route; storage and password timings are recorded by their modules
+if METRICS_DIR:
+    metrics.share(METRICS_DIR, METRICS_FLUSH_INTERVAL)
+http_requests = metrics.counter(
+    'travel_http_requests_total', 'Requests handled, by method, route and status code', ('method', 'route', 'status')
+)
+http_request_seconds = metrics.histogram(
+    'travel_http_request_duration_seconds', 'Time to produce a response, by method and route', ('method', 'route')
+)
+enquiries_shed = metrics.counter(
+    'travel_enquiries_shed_total', 'Public enquiries answered without being stored, by reason', ('reason',)
+)
 
-    headers = ['ID', 'Name', 'Email', 'Contact', 'Package', 'Message', 'Timestamp']
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Enquiries'
-    ws.append(headers)
+# ===== UTILITY FUNCTIONS =====
+ENQUIRY_XLSX_HEADERS = ['ID', 'Name', 'Email', 'Contact', 'Package', 'Message', 'Timestamp']
+enquiries_xlsx_lock = FileLock(ENQUIRIES_XLSX_FILE)
 
+def write_enquiries_xlsx(enquiries, path):
+    """Write enquiries to path using openpyxl's streaming write-only mode."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Enquiries')
+    ws.append(ENQUIRY_XLSX_HEADERS)
     for enquiry in enquiries:
         ws.append([
             enquiry.get('id', ''),
@@ -147,10 +239,236 @@ def rewrite_enquiries_xlsx(enquiries):
             enquiry.get('message', ''),
             enquiry.get('timestamp', '')
         ])
+    wb.save(str(path))
+
+def refresh_enquiries_xlsx():
+    """Rebuild enquiries.xlsx from the enquiry log if the log changed since the last build."""
+    if Workbook is None:
+        return 'openpyxl is not installed; enquiries are stored in JSON only.'
 
-    wb.save(ENQUIRIES_XLSX_FILE)
+    with enquiries_xlsx_lock:
+        source_stamp = repository.enquiries.stamp()
+        try:
+            built_stamp = ENQUIRIES_XLSX_STAMP_FILE.read_text(encoding='utf-8')
+        except OSError:
+            built_stamp = None
+        if built_stamp == source_stamp and ENQUIRIES_XLSX_FILE.exists():
+            return None
+
+        tmp_path = ENQUIRIES_XLSX_FILE.with_name(f'.{ENQUIRIES_XLSX_FILE.name}.{os.getpid()}.tmp')
+        try:
+            started = time.perf_counter()
+            write_enquiries_xlsx(repository.enquiries.all(), tmp_path)
+            size = tmp_path.stat().st_size
+            os.replace(tmp_path, ENQUIRIES_XLSX_FILE)
+            record_io(ENQUIRIES_XLSX_FILE.name, 'write', time.perf_counter() - started, size)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        ENQUIRIES_XLSX_STAMP_FILE.write_text(source_stamp, encoding='utf-8')
     return None
 
+# ===== BACKGROUND JOBS =====
+@job_queue.handler('enquiries.xlsx')
+def refresh_enquiries_xlsx_job():
+    """Rebuild a stale enquiries.xlsx.
+
+    No longer queued on enquiry changes, since a full rebuild per change
+    competes with requests; the export builds it on demand. Kept so jobs
+    spooled before that still run.
+    """
+    refresh_enquiries_xlsx()
+
+@job_queue.handler('enquiries.notify')
+def notify_enquiry_job(event, enquiry):
+    """POST an enquiry event to ENQUIRY_WEBHOOK_URL."""
+    req = urllib.request.Request(
+        ENQUIRY_WEBHOOK_URL,
+        data=json.dumps({'event': event, 'enquiry': enquiry}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        resp.read()
+
+@job_queue.handler('images.derivatives')
+def image_derivatives_job(filename):
+    """Generate the resized variants of an uploaded image and record them on its records."""
+    entry = upload_index.get(filename, fresh=True)
+    if entry is None:
+        return
+    variants = entry.get('variants')
+    if variants is None:
+        upload_folder = Path(app.config['UPLOAD_FOLDER'])
+        if not (upload_folder / filename).is_file():
+            return
+        variants = derivative_pool.generate(upload_folder / filename, upload_folder, Path(filename).stem)
+        if not upload_index.set_variants(filename, variants):
+            # The image was deleted while its variants were being generated.
+            for variant in variants:
+                (upload_folder / variant['filename']).unlink(missing_ok=True)
+            return
+    record_image_variants(filename, variants)
+
+def enqueue_enquiry_side_effects(event, enquiry):
+    """Queue the work that follows an enquiry change once it is durably stored."""
+    change_log.publish(event, {'enquiry': enquiry})
+    if ENQUIRY_WEBHOOK_URL:
+        job_queue.enqueue('enquiries.notify', {'event': event, 'enquiry': enquiry})
+
+def catalogue_response(name, sources, build):
+    """JSON response for public catalogue data with ETag/Last-Modified validators.
+
+    build receives the data of each repository collection or document in
+    sources, taken from one snapshot each. Returns 304 without serializing
+    anything when the client's copy is current; otherwise serves the
+    pre-encoded body from response_cache.
+    """
+    snapshots = [source.snapshot() for source in sources]
+    # Collections stored in the same file share an etag; list it once
+    version = '.'.join(dict.fromkeys(snapshot.etag for snapshot in snapshots))
+    etag = f'{name}-{version}'
+    last_modified = datetime.fromtimestamp(int(max(snapshot.last_modified for snapshot in snapshots)), timezone.utc)
+
+    not_modified = False
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    elif request.if_modified_since:
+        not_modified = last_modified <= request.if_modified_since
+
+    if not_modified:
+        response = app.response_class(status=304)
+    elif not app.config['RESPONSE_CACHE']:
+        response = jsonify(build(*(snapshot.data for snapshot in snapshots)))
+    else:
+        cached = response_cache.get(
+            name,
+            version,
+            lambda: jsonify(build(*(snapshot.data for snapshot in snapshots))).get_data()
+        )
+        body, encoding = cached.encoded(request.accept_encodings)
+        response = app.response_class(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if cached.gzip is not None:
+            response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = CATALOGUE_CACHE_CONTROL
+    return response
+
+def image_variant_urls(variants):
+    """Public form of derivative entries from the upload index."""
+    return [
+        {'url': f"/uploads/{variant['filename']}", 'width': variant['width'], 'format': variant['format']}
+        for variant in variants
+    ]
+
+def known_image_variants(filename):
+    """Variant URLs already generated for filename, or None when they still have to be made."""
+    variants = (upload_index.get(filename) or {}).get('variants')
+    return None if variants is None else image_variant_urls(variants)
+
+def record_image_variants(filename, variants):
+    """Store variant URLs on every home image and package that shows filename."""
+    image_url = f'/uploads/{filename}'
+    urls = image_variant_urls(variants)
+    repository.home_images.update_where('url', image_url, lambda img: img.update(variants=urls))
+    for collection in ('all_packages', 'high_selling_packages'):
+        repository.collection(collection).update_where('image', image_url, lambda pkg: pkg.update(image_variants=urls))
+
+def enqueue_image_derivatives(filename):
+    job_queue.enqueue('images.derivatives', {'filename': filename}, key=f'images.derivatives:{filename}')
+
+def attach_home_image(filename, content_hash, size):
+    """Record an uploaded file as a home page image.
+
+    Resized variants are generated in the background unless this content
+    was uploaded before and already has them.
+    """
+    image = {
+        'id': str(uuid.uuid4()),
+        'url': f'/uploads/{filename}',
+        'filename': filename,
+        'sha256': content_hash,
+        'size': size,
+        'uploaded_at': datetime.now().isoformat()
+    }
+    variants = known_image_variants(filename)
+    if variants is not None:
+        image['variants'] = variants
+    repository.home_images.add(image)
+    change_log.publish('image.added', {'image': image})
+    if variants is None:
+        enqueue_image_derivatives(filename)
+    return image
+
+def attach_package_image(collection, package_id, filename):
+    """Point a package in collection at an uploaded image; returns its URL.
+
+    The caller's reference to filename passes to the package; the reference
+    held by the package's previous image is released.
+    """
+    image_url = f'/uploads/{filename}'
+    variants = known_image_variants(filename)
+
+    # Update package with image
+    def set_image(pkg):
+        previous = pkg.get('image')
+        pkg['image'] = image_url
+        if variants is not None:
+            pkg['image_variants'] = variants
+        else:
+            pkg.pop('image_variants', None)
+        return previous
+
+    found, previous = repository.collection(collection).update(package_id, set_image)
+    if not found:
+        upload_index.release(filename)
+        return image_url
+    change_log.publish(*package_change('updated', collection, repository.collection(collection).get(package_id)))
+    if variants is None:
+        enqueue_image_derivatives(filename)
+    if previous != image_url:
+        upload_index.release(upload_filename(previous))
+    else:
+        # Same content uploaded again for this package: keep a single reference.
+        upload_index.release(filename)
+    return image_url
+
+def attach_about_video(filename):
+    """Make an uploaded file the about page video; returns its URL."""
+    video_url = f'/uploads/{filename}'
+
+    def set_video(about_data):
+        previous = about_data.get('video')
+        about_data.update({
+            'video': video_url,
+            'updated_at': datetime.now().isoformat()
+        })
+        return previous
+
+    previous = repository.about.update(set_video)
+    change_log.publish('about.updated', {'about': repository.about.get()})
+    # Either the old video's reference goes, or a re-upload of the same video leaves a spare one.
+    upload_index.release(upload_filename(previous) if previous != video_url else filename)
+    return video_url
+
+def upload_reference_counts():
+    """How many records refer to each file in the uploads folder."""
+    counts = {}
+    urls = [img.get('url') for img in repository.home_images.all()]
+    urls += [pkg.get('image') for pkg in repository.all_packages.all() + repository.high_selling_packages.all()]
+    urls.append(repository.about.get().get('video'))
+    for url in urls:
+        filename = upload_filename(url)
+        if filename:
+            counts[filename] = counts.get(filename, 0) + 1
+    return counts
+
+# Bring uploads made before the index existed under reference counting
+upload_index.adopt(upload_reference_counts())
+
 def normalize_includes(value):
     if isinstance(value, list):
         return [str(item).strip() for item in value if str(item).strip()]
@@ -158,34 +476,240 @@ def normalize_includes(value):
         return [item.strip() for item in value.split(',') if item.strip()]
     return []
 
+def new_package(form_data):
+    """A tour package record from submitted fields."""
+    return normalize_package_fields({
+        'id': str(uuid.uuid4()),
+        'name': form_data.get('name', ''),
+        'price': form_data.get('price', ''),
+        'description': form_data.get('description', ''),
+        'duration': form_data.get('duration', ''),
+        'includes': normalize_includes(form_data.get('includes', [])),
+        'image': None,
+        'created_at': datetime.now().isoformat()
+    }, DEFAULT_CURRENCY)
+
+def new_high_selling_package(form_data):
+    """A high-selling package record from submitted fields."""
+    return normalize_package_fields({
+        'id': str(uuid.uuid4()),
+        'name': form_data.get('name', ''),
+        'price': form_data.get('price', ''),
+        'description': form_data.get('description', ''),
+        'image': None,
+        'created_at': datetime.now().isoformat()
+    }, DEFAULT_CURRENCY)
+
+def package_updater(form_data):
+    """Mutator applying the submitted fields to a tour package."""
+    def apply_update(package):
+        package.update({
+            'name': form_data.get('name', package['name']),
+            'price': form_data.get('price', package['price']),
+            'description': form_data.get('description', package['description']),
+            'duration': form_data.get('duration', package.get('duration', '')),
+            'includes': normalize_includes(form_data.get('includes', package.get('includes', [])))
+        })
+        return normalize_package_fields(package, DEFAULT_CURRENCY)
+    return apply_update
+
+def high_selling_package_updater(form_data):
+    """Mutator applying the submitted fields to a high-selling package."""
+    def apply_update(package):
+        package.update({
+            'name': form_data.get('name', package['name']),
+            'price': form_data.get('price', package['price']),
+            'description': form_data.get('description', package['description'])
+        })
+        return normalize_package_fields(package, DEFAULT_CURRENCY)
+    return apply_update
+
+# Record builder and update mutator for each package collection
+PACKAGE_COLLECTIONS = {
+    'all_packages': (new_package, package_updater),
+    'high_selling_packages': (new_high_selling_package, high_selling_package_updater)
+}
+
+# Give packages stored before prices and durations were normalized their numeric fields
+for collection_name in PACKAGE_COLLECTIONS:
+    backfill_package_fields(repository.collection(collection_name), DEFAULT_CURRENCY)
+
+def package_change(event, collection, package):
+    """(type, data) of a change log event for a package in collection."""
+    return f'package.{event}', {'collection': collection, 'package': package}
+
+def batch_operations(payload, allowed):
+    """The 'operations' list of a batch request body, or an error message.
+
+    Each operation is {'op': 'create', 'data': {...}}, {'op': 'update',
+    'id': ..., 'data': {...}} or {'op': 'delete', 'id': ...}; allowed names
+    the ops this batch accepts.
+    """
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return None, 'operations must be a non-empty list'
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return None, f'A batch may contain at most {BATCH_MAX_OPERATIONS} operations'
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op not in allowed:
+            return None, f'Operation {index}: op must be one of {", ".join(allowed)}'
+        if op != 'create' and not operation.get('id'):
+            return None, f'Operation {index}: id is required'
+        if op != 'delete' and not isinstance(operation.get('data', {}), dict):
+            return None, f'Operation {index}: data must be an object'
+    return operations, None
+
+def batch_error_response(error):
+    status = 404 if isinstance(error.error, RecordNotFound) else 400
+    return jsonify({'success': False, 'message': str(error), 'index': error.index}), status
+
+def apply_package_operations(collection, operations):
+    """Run create/update/delete operations on a package collection in one write.
+
+    Returns the per-operation results; raises BatchError with nothing
+    applied when any operation fails.
+    """
+    build, updater = PACKAGE_COLLECTIONS[collection]
+    steps = []
+    for operation in operations:
+        if operation['op'] == 'create':
+            steps.append(('add', build(operation.get('data') or {})))
+        elif operation['op'] == 'update':
+            steps.append(('update', operation['id'], updater(operation.get('data') or {})))
+        else:
+            steps.append(('delete', operation['id']))
+    applied = repository.collection(collection).apply(steps)
+    results = []
+    changes = []
+    for operation, result in zip(operations, applied):
+        if operation['op'] == 'create':
+            results.append({'op': 'create', 'id': result['id'], 'package': result})
+            changes.append(package_change('created', collection, result))
+        else:
+            results.append({'op': operation['op'], 'id': operation['id']})
+        if operation['op'] == 'update':
+            changes.append(package_change('updated', collection, result))
+        elif operation['op'] == 'delete':
+            upload_index.release(upload_filename(result.get('image')))
+            changes.append(package_change('deleted', collection, {'id': operation['id']}))
+    change_log.publish_many(changes)
+    return results
+
+def package_batch_response(collection):
+    operations, message = batch_operations(request.get_json(silent=True), ('create', 'update', 'delete'))
+    if message:
+        return jsonify({'success': False, 'message': message}), 400
+    try:
+        results = apply_package_operations(collection, operations)
+    except BatchError as e:
+        return batch_error_response(e)
+    return jsonify({
+        'success': True,
+        'message': f'{len(results)} operations applied',
+        'results': results
+    }), 200
+
+def package_import_response(collection):
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'message': 'No file provided'}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'success': False, 'message': 'No file selected'}), 400
+    try:
+        started = time.perf_counter()
+        size = file.stream.seek(0, os.SEEK_END)
+        file.stream.seek(0)
+        rows = read_package_rows(file.stream, file.filename, BATCH_MAX_OPERATIONS)
+        record_io('import', 'read', time.perf_counter() - started, size)
+    except ImportFormatError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    finally:
+        file.close()
+    if not rows:
+        return jsonify({'success': False, 'message': 'The file contains no packages'}), 400
+    try:
+        results = apply_package_operations(collection, [{'op': 'create', 'data': row} for row in rows])
+    except BatchError as e:
+        return batch_error_response(e)
+    return jsonify({
+        'success': True,
+        'message': f'{len(results)} packages imported',
+        'packages': [result['package'] for result in results]
+    }), 201
+
+def authenticate(token):
+    """Claims for a bearer token; raises jwt.InvalidTokenError.
+
+    Decoded tokens are cached until they expire. A token that names a user
+    is only accepted while that user exists, and carries the user's current
+    role rather than the one it was issued with.
+    """
+    generation = repository.users.snapshot().etag
+    claims = token_cache.get(token, generation)
+    if claims is None:
+        claims = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        if claims.get('user_id'):
+            user = repository.users.get(claims['user_id'])
+            if user is None:
+                raise jwt.InvalidTokenError('User no longer exists')
+            claims = dict(claims, username=user.get('username'), role=user.get('role', 'user'))
+        token_cache.put(token, claims, generation)
+    return claims
+
 def token_required(f):
     """Decorator to require JWT token"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Check for token in Authorization header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-        
+        started = time.perf_counter()
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            request.user = data
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token'}), 401
-        
+            token = None
+
+            # Check for token in Authorization header
+            if 'Authorization' in request.headers:
+                auth_header = request.headers['Authorization']
+                try:
+                    token = auth_header.split(" ")[1]
+                except IndexError:
+                    return jsonify({'message': 'Invalid token format'}), 401
+
+            if not token:
+                return jsonify({'message': 'Token is missing!'}), 401
+
+            try:
+                request.user = authenticate(token)
+            except jwt.ExpiredSignatureError:
+                return jsonify({'message': 'Token has expired'}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({'message': 'Invalid token'}), 401
+        finally:
+            token_cache.observe(time.perf_counter() - started)
+
         return f(*args, **kwargs)
     return decorated
 
+@app.before_request
+def start_request_timer():
+    request.started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and its latency under its route pattern (never the raw path)."""
+    started = getattr(request, 'started', None)
+    if started is not None and not request.environ.get('travel.warm_up'):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_requests.inc((request.method, route, str(response.status_code)))
+        http_request_seconds.observe(time.perf_counter() - started, (request.method, route))
+        metrics.start()
+    return response
+
+@app.after_request
+def invalidate_response_cache(response):
+    """Drop cached catalogue bodies after any successful write."""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        response_cache.invalidate()
+    return response
+
 # ===== AUTHENTICATION ENDPOINTS =====
 @app.route('/api/auth/login', methods=['POST'])
 def login():
@@ -196,23 +720,39 @@ def login():
     
     if not username or not password:
         return jsonify({'message': 'Missing username or password'}), 400
-    # First try to authenticate against users.json
-    users = load_users()
-    matched = next((u for u in users if u.get('username') == username), None)
+    if not isinstance(username, str) or not isinstance(password, str):
+        return jsonify({'message': 'Username and password must be strings'}), 400
 
+    # Throttle before hashing, which is the expensive part of a login
+    for limiter, key in ((login_ip_limiter, request.remote_addr), (login_user_limiter, username.lower())):
+        allowed, retry_after = limiter.acquire(key)
+        if not allowed:
+            response = jsonify({'message': 'Too many login attempts, try again later'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+
+    # First try to authenticate against the stored users (indexed by username)
+    matched = next(iter(repository.users.find('username', username)), None)
     if matched:
-        # User exists in users.json
-        if not matched.get('password') or not check_password_hash(matched['password'], password):
-            return jsonify({'message': 'Invalid credentials'}), 401
+        pwhash = matched.get('password')
         role = matched.get('role', 'user')
         user_id = matched.get('id')
     else:
         # Fallback to ADMIN_CREDENTIALS
-        if username not in ADMIN_CREDENTIALS or not check_password_hash(ADMIN_CREDENTIALS[username], password):
-            return jsonify({'message': 'Invalid credentials'}), 401
+        pwhash = ADMIN_CREDENTIALS.get(username)
         role = 'admin'
         user_id = None
 
+    try:
+        verified = password_verifier.verify(pwhash, password)
+    except VerifierBusy:
+        response = jsonify({'message': 'Server busy, try again shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    if not verified:
+        return jsonify({'message': 'Invalid credentials'}), 401
+    login_user_limiter.reset(username.lower())
+
     # Generate JWT token (expires in 24 hours)
     token = jwt.encode({
         'username': username,
@@ -228,19 +768,93 @@ def login():
     }), 200
 
 # ===== ENQUIRIES ENDPOINTS =====
+ENQUIRY_PAGE_PARAMS = ('limit', 'cursor', 'since', 'until', 'package', 'order')
+ENQUIRY_PAGE_DEFAULT_LIMIT = 50
+ENQUIRY_PAGE_MAX_LIMIT = 500
+
+def enquiry_time_range():
+    """The since and until query parameters, plus an error message if either is not ISO 8601."""
+    since = request.args.get('since') or None
+    until = request.args.get('until') or None
+    for name, value in (('since', since), ('until', until)):
+        if value is None:
+            continue
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            return since, until, f'{name} must be an ISO 8601 timestamp'
+    return since, until, None
+
 @app.route('/api/enquiries', methods=['GET'])
 @token_required
 def get_enquiries():
-    """Get all customer enquiries"""
-    data = load_data()
+    """Get customer enquiries.
+
+    Without query parameters every enquiry is returned. Any of limit, cursor,
+    since, until, package or order switches to a page of results plus a
+    next_cursor for the following page.
+    """
+    if not any(param in request.args for param in ENQUIRY_PAGE_PARAMS):
+        return jsonify({
+            'success': True,
+            'data': repository.enquiries.all()
+        }), 200
+
+    try:
+        limit = int(request.args.get('limit', ENQUIRY_PAGE_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, ENQUIRY_PAGE_MAX_LIMIT))
+
+    order = request.args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        return jsonify({'success': False, 'message': "order must be 'asc' or 'desc'"}), 400
+
+    since, until, message = enquiry_time_range()
+    if message:
+        return jsonify({'success': False, 'message': message}), 400
+
+    try:
+        page, next_cursor, total = repository.enquiries.query(
+            since=since,
+            until=until,
+            package=request.args.get('package') or None,
+            descending=order == 'desc',
+            limit=limit,
+            cursor=request.args.get('cursor') or None
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
     return jsonify({
         'success': True,
-        'data': data.get('enquiries', [])
+        'data': page,
+        'next_cursor': next_cursor,
+        'total': total
     }), 200
 
+def enquiry_sender(email, contact):
+    """Who an enquiry is from: the email address, else the digits of the contact number."""
+    return email.lower() or ''.join(ch for ch in contact if ch.isdigit())
+
+def enquiry_fingerprint(sender, package_name, message):
+    """Digest identifying repeats of an enquiry, ignoring case and spacing."""
+    parts = (sender, package_name.lower(), ' '.join(message.lower().split()))
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).digest()[:16]
+
+def too_many_enquiries(retry_after):
+    response = jsonify({'success': False, 'message': 'Too many enquiries, try again later'})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
 @app.route('/api/enquiries', methods=['POST'])
 def create_enquiry():
-    """Create a new customer enquiry (no auth required for frontend form)"""
+    """Create a new customer enquiry (no auth required for frontend form).
+
+    Limited per client IP and per sender. Repeating an enquiry within
+    ENQUIRY_DUPLICATE_WINDOW (a double submit, or a bot replaying it)
+    returns the original with 200 instead of storing it again.
+    """
     form_data = request.get_json(silent=True) or {}
     name = form_data.get('name', '').strip()
     email = form_data.get('email', '').strip()
@@ -252,7 +866,15 @@ def create_enquiry():
         return jsonify({'success': False, 'message': 'Name is required'}), 400
     if not email and not contact:
         return jsonify({'success': False, 'message': 'Email or contact is required'}), 400
-    
+
+    # Everything up to the add() below is in memory, so shed requests cost no I/O
+    allowed, retry_after = enquiry_ip_limiter.acquire(request.remote_addr)
+    if not allowed:
+        enquiries_shed.inc(('ip_limit',))
+        return too_many_enquiries(retry_after)
+
+    sender = enquiry_sender(email, contact)
+    fingerprint = enquiry_fingerprint(sender, package_name, message)
     enquiry = {
         'id': str(uuid.uuid4()),
         'name': name,
@@ -262,94 +884,192 @@ def create_enquiry():
         'message': message or (f"Package enquiry for {package_name}" if package_name else ''),
         'timestamp': datetime.now().isoformat()
     }
-    
-    data = load_data()
-    data.setdefault('enquiries', []).append(enquiry)
-    save_data(data)
-    xlsx_error = append_enquiry_to_xlsx(enquiry)
-    
-    response = {
+    original = recent_enquiries.claim(fingerprint, enquiry)
+    if original is not None:
+        enquiries_shed.inc(('duplicate',))
+        return jsonify({
+            'success': True,
+            'message': 'Enquiry already received',
+            'enquiry': original
+        }), 200
+
+    allowed, retry_after = enquiry_sender_limiter.acquire(sender)
+    if not allowed:
+        recent_enquiries.discard(fingerprint)
+        enquiries_shed.inc(('sender_limit',))
+        return too_many_enquiries(retry_after)
+
+    try:
+        repository.enquiries.add(enquiry)
+    except Exception:
+        # Not stored, so a retry must not be taken for a duplicate
+        recent_enquiries.discard(fingerprint)
+        raise
+    enqueue_enquiry_side_effects('enquiry.created', enquiry)
+
+    return jsonify({
         'success': True,
         'message': 'Enquiry created successfully',
         'enquiry': enquiry
-    }
-    if xlsx_error:
-        response['warning'] = xlsx_error
-
-    return jsonify(response), 201
+    }), 201
 
 @app.route('/api/enquiries/<enquiry_id>', methods=['DELETE'])
 @token_required
 def delete_enquiry(enquiry_id):
-    """Delete a customer enquiry and sync enquiries.xlsx."""
-    data = load_data()
-    enquiries = data.get('enquiries', [])
-    filtered_enquiries = [e for e in enquiries if e.get('id') != enquiry_id]
-
-    if len(filtered_enquiries) == len(enquiries):
+    """Delete a customer enquiry; enquiries.xlsx is refreshed in the background."""
+    if not repository.enquiries.delete(enquiry_id):
         return jsonify({'success': False, 'message': 'Enquiry not found'}), 404
+    enqueue_enquiry_side_effects('enquiry.deleted', {'id': enquiry_id})
 
-    data['enquiries'] = filtered_enquiries
-    save_data(data)
-    xlsx_error = rewrite_enquiries_xlsx(filtered_enquiries)
-
-    response = {
+    return jsonify({
         'success': True,
         'message': 'Enquiry deleted successfully'
-    }
-    if xlsx_error:
-        response['warning'] = xlsx_error
-
-    return jsonify(response), 200
+    }), 200
 
-@app.route('/api/enquiries/export', methods=['GET'])
+@app.route('/api/enquiries/batch', methods=['POST'])
 @token_required
-def export_enquiries_xlsx():
-    """Download enquiries.xlsx from backend storage."""
-    if not ENQUIRIES_XLSX_FILE.exists():
-        # Try rebuilding XLSX from current JSON enquiries when file is missing.
-        data = load_data()
-        xlsx_error = rewrite_enquiries_xlsx(data.get('enquiries', []))
-        if xlsx_error or not ENQUIRIES_XLSX_FILE.exists():
+def batch_enquiries():
+    """Delete several enquiries at once; all ids must exist or none are deleted"""
+    operations, message = batch_operations(request.get_json(silent=True), ('delete',))
+    if message:
+        return jsonify({'success': False, 'message': message}), 400
+    seen = set()
+    for index, operation in enumerate(operations):
+        # As with the package batches, deleting the same id twice fails
+        if operation['id'] in seen or repository.enquiries.get(operation['id']) is None:
             return jsonify({
                 'success': False,
-                'message': xlsx_error or 'enquiries.xlsx is not available'
+                'message': f'Operation {index}: {RecordNotFound(operation["id"])}',
+                'index': index
             }), 404
+        seen.add(operation['id'])
+    ids = [operation['id'] for operation in operations]
+    deleted = repository.enquiries.delete_many(ids)
+    change_log.publish_many([('enquiry.deleted', {'enquiry': {'id': enquiry_id}}) for enquiry_id in ids])
+    if ENQUIRY_WEBHOOK_URL:
+        for enquiry_id in ids:
+            job_queue.enqueue('enquiries.notify', {'event': 'enquiry.deleted', 'enquiry': {'id': enquiry_id}})
+
+    return jsonify({
+        'success': True,
+        'message': f'{deleted} enquiries deleted',
+        'results': [{'op': 'delete', 'id': enquiry_id} for enquiry_id in ids]
+    }), 200
+
+# Streamed export formats and their content types; xlsx is built as a file instead
+ENQUIRY_EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+ENQUIRY_EXPORT_FIELDS = ('id', 'name', 'email', 'contact', 'package', 'message', 'timestamp')
+# Encoded bytes collected before a chunk of a streamed export is sent
+ENQUIRY_EXPORT_CHUNK_BYTES = 64 * 1024
+# Characters that make a spreadsheet read a CSV cell as a formula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+PHONE_CHARACTERS = frozenset('0123456789 ()-')
+
+def csv_cell(value):
+    """value as CSV text, quoted with a leading ' if a spreadsheet would run it as a formula.
+
+    Phone numbers such as +91 98765 43210 are left alone.
+    """
+    text = '' if value is None else str(value)
+    if text.startswith(CSV_FORMULA_PREFIXES):
+        if not (text[0] in '+-' and len(text) > 1 and PHONE_CHARACTERS.issuperset(text[1:])):
+            return "'" + text
+    return text
+
+def encode_enquiries(enquiries, fmt):
+    """Yield enquiries encoded as CSV or NDJSON, in chunks of about ENQUIRY_EXPORT_CHUNK_BYTES."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(ENQUIRY_XLSX_HEADERS)
+    for enquiry in enquiries:
+        if fmt == 'csv':
+            writer.writerow([csv_cell(enquiry.get(field, '')) for field in ENQUIRY_EXPORT_FIELDS])
+        else:
+            buffer.write(json.dumps(enquiry, ensure_ascii=False))
+            buffer.write('\n')
+        if buffer.tell() >= ENQUIRY_EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+@app.route('/api/enquiries/export', methods=['GET'])
+@token_required
+def export_enquiries():
+    """Download enquiries as enquiries.xlsx, or stream them with format=csv or format=ndjson.
+
+    The streamed formats are read from the store in batches and sent with
+    chunked transfer encoding, oldest first, so memory use does not grow
+    with the number of enquiries. They accept the since, until and package
+    filters of GET /api/enquiries.
+    """
+    fmt = request.args.get('format', 'xlsx')
+    if fmt in ENQUIRY_EXPORT_FORMATS:
+        since, until, message = enquiry_time_range()
+        if message:
+            return jsonify({'success': False, 'message': message}), 400
+        enquiries = repository.enquiries.scan(since=since, until=until, package=request.args.get('package') or None)
+        response = app.response_class(encode_enquiries(enquiries, fmt), content_type=ENQUIRY_EXPORT_FORMATS[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename=enquiries.{fmt}'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    if fmt != 'xlsx':
+        return jsonify({'success': False, 'message': "format must be 'xlsx', 'csv' or 'ndjson'"}), 400
+    if any(request.args.get(param) for param in ('since', 'until', 'package')):
+        return jsonify({
+            'success': False,
+            'message': 'since, until and package need format=csv or format=ndjson'
+        }), 400
+
+    xlsx_error = refresh_enquiries_xlsx()
+    if xlsx_error or not ENQUIRIES_XLSX_FILE.exists():
+        return jsonify({
+            'success': False,
+            'message': xlsx_error or 'enquiries.xlsx is not available'
+        }), 404
 
     return send_from_directory(
-        str(BASE_DIR),
+        str(DATA_DIR),
         ENQUIRIES_XLSX_FILE.name,
         as_attachment=True
     )
 
+# ===== SITE BOOTSTRAP ENDPOINT =====
+@app.route('/api/site', methods=['GET'])
+def get_site():
+    """Get all public homepage data in one response"""
+    sources = (repository.home_images, repository.high_selling_packages, repository.all_packages, repository.about)
+    return catalogue_response('site', sources, lambda home_images, high_selling, all_packages, about_data: {
+        'success': True,
+        'data': {
+            'home_images': home_images,
+            'high_selling_packages': high_selling,
+            'all_packages': all_packages,
+            'about': about_data
+        }
+    })
+
 # ===== HIGH-SELLING PACKAGES ENDPOINTS =====
 @app.route('/api/high-selling-packages', methods=['GET'])
 def get_high_selling_packages():
     """Get all high-selling packages"""
-    data = load_data()
-    return jsonify({
+    return catalogue_response('high-selling-packages', (repository.high_selling_packages,), lambda records: {
         'success': True,
-        'data': data.get('high_selling_packages', [])
-    }), 200
+        'data': records
+    })
 
 @app.route('/api/high-selling-packages', methods=['POST'])
 @token_required
 def create_high_selling_package():
     """Create a new high-selling package"""
-    form_data = request.json
-    
-    package = {
-        'id': str(uuid.uuid4()),
-        'name': form_data.get('name', ''),
-        'price': form_data.get('price', ''),
-        'description': form_data.get('description', ''),
-        'image': None,
-        'created_at': datetime.now().isoformat()
-    }
-    
-    data = load_data()
-    data['high_selling_packages'].append(package)
-    save_data(data)
+    package = new_high_selling_package(request.json)
+    repository.high_selling_packages.add(package)
+    change_log.publish(*package_change('created', 'high_selling_packages', package))
     
     return jsonify({
         'success': True,
@@ -361,12 +1081,10 @@ def create_high_selling_package():
 @token_required
 def delete_high_selling_package(package_id):
     """Delete a high-selling package"""
-    data = load_data()
-    data['high_selling_packages'] = [
-        p for p in data.get('high_selling_packages', [])
-        if p['id'] != package_id
-    ]
-    save_data(data)
+    package = repository.high_selling_packages.delete(package_id)
+    if package:
+        upload_index.release(upload_filename(package.get('image')))
+        change_log.publish(*package_change('deleted', 'high_selling_packages', {'id': package_id}))
     
     return jsonify({
         'success': True,
@@ -377,54 +1095,93 @@ def delete_high_selling_package(package_id):
 @token_required
 def update_high_selling_package(package_id):
     """Update a high-selling package"""
-    form_data = request.json
-    data = load_data()
-    
-    for package in data.get('high_selling_packages', []):
-        if package['id'] == package_id:
-            package.update({
-                'name': form_data.get('name', package['name']),
-                'price': form_data.get('price', package['price']),
-                'description': form_data.get('description', package['description'])
-            })
-            break
-    
-    save_data(data)
+    found, package = repository.high_selling_packages.update(package_id, high_selling_package_updater(request.json))
+    if found:
+        change_log.publish(*package_change('updated', 'high_selling_packages', package))
     return jsonify({
         'success': True,
         'message': 'Package updated successfully'
     }), 200
 
+@app.route('/api/high-selling-packages/batch', methods=['POST'])
+@token_required
+def batch_high_selling_packages():
+    """Create, update and delete high-selling packages in one atomic write"""
+    return package_batch_response('high_selling_packages')
+
+@app.route('/api/high-selling-packages/import', methods=['POST'])
+@token_required
+def import_high_selling_packages():
+    """Create high-selling packages from an uploaded CSV or XLSX file"""
+    return package_import_response('high_selling_packages')
+
 # ===== ALL PACKAGES ENDPOINTS =====
 @app.route('/api/packages', methods=['GET'])
 def get_all_packages():
     """Get all tour packages"""
-    data = load_data()
+    return catalogue_response('packages', (repository.all_packages,), lambda records: {
+        'success': True,
+        'data': records
+    })
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+@app.route('/api/packages/search', methods=['GET'])
+def search_packages():
+    """Search tour packages.
+
+    q matches words in the name, description and includes (the last word
+    also as a prefix); min_price/max_price and min_duration/max_duration
+    (days) narrow the results. sort is relevance (the default), price,
+    -price, duration, -duration or newest. Prices are filtered, bucketed and
+    sorted in currency (an ISO code, DEFAULT_CURRENCY by default) only.
+    The response carries price, duration and currency facet counts for
+    everything matching q.
+    """
+    params = {}
+    for name, cast in (('min_price', float), ('max_price', float), ('min_duration', int), ('max_duration', int)):
+        value = request.args.get(name) or None
+        if value is None:
+            continue
+        try:
+            params[name] = cast(value)
+            if not math.isfinite(params[name]):
+                raise ValueError(value)
+        except ValueError:
+            return jsonify({'success': False, 'message': f'{name} must be a number'}), 400
+    try:
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit and offset must be integers'}), 400
+    sort = request.args.get('sort') or 'relevance'
+    if sort not in SORT_ORDERS:
+        return jsonify({'success': False, 'message': f'sort must be one of {", ".join(SORT_ORDERS)}'}), 400
+
+    found = package_search.search(
+        request.args.get('q', ''),
+        sort=sort,
+        limit=max(1, min(limit, SEARCH_MAX_LIMIT)),
+        offset=max(0, offset),
+        currency=(request.args.get('currency') or DEFAULT_CURRENCY).upper(),
+        **params
+    )
     return jsonify({
         'success': True,
-        'data': data.get('all_packages', [])
+        'data': found['results'],
+        'total': found['total'],
+        'facets': found['facets'],
+        'currency': found['currency']
     }), 200
 
 @app.route('/api/packages', methods=['POST'])
 @token_required
 def create_package():
     """Create a new tour package"""
-    form_data = request.json
-    
-    package = {
-        'id': str(uuid.uuid4()),
-        'name': form_data.get('name', ''),
-        'price': form_data.get('price', ''),
-        'description': form_data.get('description', ''),
-        'duration': form_data.get('duration', ''),
-        'includes': normalize_includes(form_data.get('includes', [])),
-        'image': None,
-        'created_at': datetime.now().isoformat()
-    }
-    
-    data = load_data()
-    data['all_packages'].append(package)
-    save_data(data)
+    package = new_package(request.json)
+    repository.all_packages.add(package)
+    change_log.publish(*package_change('created', 'all_packages', package))
     
     return jsonify({
         'success': True,
@@ -436,12 +1193,10 @@ def create_package():
 @token_required
 def delete_package(package_id):
     """Delete a tour package"""
-    data = load_data()
-    data['all_packages'] = [
-        p for p in data.get('all_packages', [])
-        if p['id'] != package_id
-    ]
-    save_data(data)
+    package = repository.all_packages.delete(package_id)
+    if package:
+        upload_index.release(upload_filename(package.get('image')))
+        change_log.publish(*package_change('deleted', 'all_packages', {'id': package_id}))
     
     return jsonify({
         'success': True,
@@ -452,35 +1207,34 @@ def delete_package(package_id):
 @token_required
 def update_package(package_id):
     """Update a tour package"""
-    form_data = request.json
-    data = load_data()
-    
-    for package in data.get('all_packages', []):
-        if package['id'] == package_id:
-            package.update({
-                'name': form_data.get('name', package['name']),
-                'price': form_data.get('price', package['price']),
-                'description': form_data.get('description', package['description']),
-                'duration': form_data.get('duration', package.get('duration', '')),
-                'includes': normalize_includes(form_data.get('includes', package.get('includes', [])))
-            })
-            break
-    
-    save_data(data)
+    found, package = repository.all_packages.update(package_id, package_updater(request.json))
+    if found:
+        change_log.publish(*package_change('updated', 'all_packages', package))
     return jsonify({
         'success': True,
         'message': 'Package updated successfully'
     }), 200
 
+@app.route('/api/packages/batch', methods=['POST'])
+@token_required
+def batch_packages():
+    """Create, update and delete tour packages in one atomic write"""
+    return package_batch_response('all_packages')
+
+@app.route('/api/packages/import', methods=['POST'])
+@token_required
+def import_packages():
+    """Create tour packages from an uploaded CSV or XLSX file (header row: name, price, description, duration, includes)"""
+    return package_import_response('all_packages')
+
 # ===== HOME IMAGES ENDPOINTS =====
 @app.route('/api/home-images', methods=['GET'])
 def get_home_images():
     """Get all home page images"""
-    data = load_data()
-    return jsonify({
+    return catalogue_response('home-images', (repository.home_images,), lambda records: {
         'success': True,
-        'data': data.get('home_images', [])
-    }), 200
+        'data': records
+    })
 
 @app.route('/api/home-images', methods=['POST'])
 @token_required
@@ -494,26 +1248,16 @@ def upload_home_image():
         return jsonify({'message': 'No file selected'}), 400
     
     try:
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        image = {
-            'id': str(uuid.uuid4()),
-            'url': f'/uploads/{filename}',
-            'filename': filename,
-            'uploaded_at': datetime.now().isoformat()
-        }
-        
-        data = load_data()
-        data['home_images'].append(image)
-        save_data(data)
+        filename, content_hash, size = save_upload(file, upload_index, INCOMING_UPLOAD_DIR, UPLOAD_LIMITS['image'])
+        image = attach_home_image(filename, content_hash, size)
         
         return jsonify({
             'success': True,
             'message': 'Image uploaded successfully',
             'image': image
         }), 201
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -524,34 +1268,38 @@ def upload_home_image():
 @token_required
 def delete_home_image(image_id):
     """Delete a home page image"""
-    data = load_data()
-    
-    # Find and delete the image
-    image_to_delete = None
-    for img in data.get('home_images', []):
-        if img['id'] == image_id:
-            image_to_delete = img
-            break
-    
+    image_to_delete = repository.home_images.delete(image_id)
     if image_to_delete:
-        try:
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], image_to_delete.get('filename', ''))
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        except:
-            pass
-        
-        data['home_images'] = [
-            img for img in data.get('home_images', [])
-            if img['id'] != image_id
-        ]
-        save_data(data)
+        # Removes the file once no other record uses the same content
+        upload_index.release(image_to_delete.get('filename'))
+        change_log.publish('image.deleted', {'image': {'id': image_id}})
     
     return jsonify({
         'success': True,
         'message': 'Image deleted successfully'
     }), 200
 
+@app.route('/api/home-images/batch', methods=['POST'])
+@token_required
+def batch_home_images():
+    """Delete several home page images in one atomic write"""
+    operations, message = batch_operations(request.get_json(silent=True), ('delete',))
+    if message:
+        return jsonify({'success': False, 'message': message}), 400
+    try:
+        removed = repository.home_images.apply([('delete', operation['id']) for operation in operations])
+    except BatchError as e:
+        return batch_error_response(e)
+    for image in removed:
+        upload_index.release(image.get('filename'))
+    change_log.publish_many([('image.deleted', {'image': {'id': image['id']}}) for image in removed])
+
+    return jsonify({
+        'success': True,
+        'message': f'{len(removed)} images deleted',
+        'results': [{'op': 'delete', 'id': image['id']} for image in removed]
+    }), 200
+
 @app.route('/api/packages/<package_id>/image', methods=['POST'])
 @token_required
 def upload_package_image(package_id):
@@ -564,26 +1312,16 @@ def upload_package_image(package_id):
         return jsonify({'message': 'No file selected'}), 400
     
     try:
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        image_url = f'/uploads/{filename}'
-        
-        # Update package with image
-        data = load_data()
-        for pkg in data.get('all_packages', []):
-            if pkg['id'] == package_id:
-                pkg['image'] = image_url
-                break
-        
-        save_data(data)
+        filename, content_hash, size = save_upload(file, upload_index, INCOMING_UPLOAD_DIR, UPLOAD_LIMITS['image'])
+        image_url = attach_package_image('all_packages', package_id, filename)
         
         return jsonify({
             'success': True,
             'message': 'Image uploaded successfully',
             'image': image_url
         }), 200
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -602,26 +1340,16 @@ def upload_high_selling_package_image(package_id):
         return jsonify({'message': 'No file selected'}), 400
     
     try:
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        image_url = f'/uploads/{filename}'
-        
-        # Update package with image
-        data = load_data()
-        for pkg in data.get('high_selling_packages', []):
-            if pkg['id'] == package_id:
-                pkg['image'] = image_url
-                break
-        
-        save_data(data)
+        filename, content_hash, size = save_upload(file, upload_index, INCOMING_UPLOAD_DIR, UPLOAD_LIMITS['image'])
+        image_url = attach_package_image('high_selling_packages', package_id, filename)
         
         return jsonify({
             'success': True,
             'message': 'Image uploaded successfully',
             'image': image_url
         }), 200
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -632,11 +1360,10 @@ def upload_high_selling_package_image(package_id):
 @app.route('/api/about', methods=['GET'])
 def get_about():
     """Get about content"""
-    about_data = load_about()
-    return jsonify({
+    return catalogue_response('about', (repository.about,), lambda about_data: {
         'success': True,
         'data': about_data
-    }), 200
+    })
 
 @app.route('/api/about', methods=['PUT'])
 @token_required
@@ -649,8 +1376,18 @@ def update_about():
         'video': form_data.get('video', ''),
         'updated_at': datetime.now().isoformat()
     }
-    
-    save_about(about_data)
+
+    def replace_about(current):
+        previous = current.get('video')
+        current.clear()
+        current.update(about_data)
+        return previous
+
+    previous_video = repository.about.update(replace_about)
+    change_log.publish('about.updated', {'about': about_data})
+    if previous_video != about_data['video']:
+        upload_index.acquire(upload_filename(about_data['video']))
+        upload_index.release(upload_filename(previous_video))
     
     return jsonify({
         'success': True,
@@ -669,17 +1406,8 @@ def upload_about_video():
         return jsonify({'message': 'No file selected'}), 400
     
     try:
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        video_url = f'/uploads/{filename}'
-        
-        # Update about with video URL
-        about_data = load_about()
-        about_data['video'] = video_url
-        about_data['updated_at'] = datetime.now().isoformat()
-        save_about(about_data)
+        filename, content_hash, size = save_upload(file, upload_index, INCOMING_UPLOAD_DIR, UPLOAD_LIMITS['video'])
+        video_url = attach_about_video(filename)
         
         return jsonify({
             'success': True,
@@ -689,19 +1417,130 @@ def upload_about_video():
                 'url': video_url
             }
         }), 200
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
             'message': str(e)
         }), 500
 
+# ===== CHUNKED UPLOAD ENDPOINTS =====
+# Upload target -> which size limit applies
+UPLOAD_TARGETS = {
+    'home-image': 'image',
+    'package-image': 'image',
+    'high-selling-package-image': 'image',
+    'about-video': 'video'
+}
+
+def parse_content_range(header):
+    """Parse 'bytes start-end/total' into (start, length)."""
+    try:
+        unit, _, rest = header.partition(' ')
+        span, _, _total = rest.partition('/')
+        start, _, end = span.partition('-')
+        start, end = int(start), int(end)
+    except (AttributeError, ValueError):
+        return None
+    if unit != 'bytes' or start < 0 or end < start:
+        return None
+    return start, end - start + 1
+
+def session_response(session):
+    return {
+        'id': session['id'],
+        'offset': session['offset'],
+        'size': session['size'],
+        'target': session['target']
+    }
+
+@app.route('/api/uploads', methods=['POST'])
+@token_required
+def create_chunked_upload():
+    """Start a resumable upload; the bytes follow as PUT requests with Content-Range"""
+    form_data = request.get_json(silent=True) or {}
+    target = form_data.get('target', '')
+    if target not in UPLOAD_TARGETS:
+        return jsonify({'success': False, 'message': f"target must be one of {', '.join(UPLOAD_TARGETS)}"}), 400
+    if target in ('package-image', 'high-selling-package-image') and not form_data.get('package_id'):
+        return jsonify({'success': False, 'message': 'package_id is required'}), 400
+    try:
+        size = int(form_data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'size must be an integer'}), 400
+
+    kind = UPLOAD_TARGETS[target]
+    session = chunked_uploads.create(
+        form_data.get('filename', ''),
+        size,
+        kind,
+        UPLOAD_LIMITS[kind],
+        {'target': target, 'package_id': form_data.get('package_id')}
+    )
+    return jsonify({
+        'success': True,
+        'data': dict(session_response(session), chunk_size=min(8 * 1024 * 1024, UPLOAD_CHUNK_MAX_BYTES))
+    }), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@token_required
+def get_chunked_upload(upload_id):
+    """Report how many bytes of an upload have arrived, so a client can resume"""
+    return jsonify({'success': True, 'data': session_response(chunked_uploads.get(upload_id))}), 200
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+@token_required
+def put_upload_chunk(upload_id):
+    """Append one chunk to an upload"""
+    content_range = parse_content_range(request.headers.get('Content-Range'))
+    if content_range is None:
+        return jsonify({'success': False, 'message': 'Content-Range: bytes start-end/total is required'}), 400
+    start, length = content_range
+    if length > UPLOAD_CHUNK_MAX_BYTES:
+        return jsonify({'success': False, 'message': f'Chunks are limited to {UPLOAD_CHUNK_MAX_BYTES} bytes'}), 413
+    if request.content_length is not None and request.content_length != length:
+        return jsonify({'success': False, 'message': 'Content-Length does not match Content-Range'}), 400
+
+    session = chunked_uploads.write_chunk(upload_id, start, request.stream, length)
+    return jsonify({'success': True, 'data': session_response(session)}), 200
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@token_required
+def complete_chunked_upload(upload_id):
+    """Finish an upload and attach the file to its target"""
+    session = chunked_uploads.get(upload_id)
+    filename, content_hash, size = chunked_uploads.complete(upload_id, upload_index)
+    target = session['target']
+
+    if target == 'home-image':
+        image = attach_home_image(filename, content_hash, size)
+        return jsonify({'success': True, 'message': 'Image uploaded successfully', 'image': image}), 201
+    if target == 'about-video':
+        video_url = attach_about_video(filename)
+        return jsonify({
+            'success': True,
+            'message': 'Video uploaded successfully',
+            'data': {'video': video_url, 'url': video_url}
+        }), 200
+    collection = 'all_packages' if target == 'package-image' else 'high_selling_packages'
+    image_url = attach_package_image(collection, session['package_id'], filename)
+    return jsonify({'success': True, 'message': 'Image uploaded successfully', 'image': image_url}), 200
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@token_required
+def abort_chunked_upload(upload_id):
+    """Discard an unfinished upload"""
+    chunked_uploads.abort(upload_id)
+    return jsonify({'success': True, 'message': 'Upload discarded'}), 200
+
 # ===== USER MANAGEMENT ENDPOINTS =====
 
 @app.route('/api/users', methods=['GET'])
 @token_required
 def get_users():
     """Get all users"""
-    users = load_users()
+    users = repository.users.all()
     response_users = [
         {
             'id': u.get('id'),
@@ -726,15 +1565,6 @@ def create_user():
     if not username or not email or not password:
         return jsonify({'success': False, 'message': 'Missing required fields'}), 400
     
-    users = load_users()
-    
-    # Check if user already exists
-    if any(u['username'] == username for u in users):
-        return jsonify({'success': False, 'message': 'Username already exists'}), 400
-    
-    if any(u['email'] == email for u in users):
-        return jsonify({'success': False, 'message': 'Email already exists'}), 400
-    
     new_user = {
         'id': str(uuid.uuid4()),
         'username': username,
@@ -743,9 +1573,12 @@ def create_user():
         'role': role,
         'created_at': datetime.now().isoformat()
     }
-    
-    users.append(new_user)
-    save_users(users)
+
+    try:
+        # Usernames and emails are unique in the user store
+        repository.users.add(new_user)
+    except DuplicateRecord as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
     # Return user without password
     response_user = {'id': new_user['id'], 'username': new_user['username'], 'email': new_user['email'], 'role': new_user['role']}
@@ -756,62 +1589,153 @@ def create_user():
 def update_user(user_id):
     """Update an existing user"""
     data = request.get_json()
-    users = load_users()
-    
-    user_index = next((i for i, u in enumerate(users) if u['id'] == user_id), None)
-    if user_index is None:
+    # Hash outside the write lock; it is the slow part of the update
+    password_hash = generate_password_hash(data['password']) if data.get('password') else None
+
+    def apply_update(user):
+        # The store rejects a username or email that another user already has
+        user['username'] = data.get('username', user['username'])
+        user['email'] = data.get('email', user['email'])
+
+        # Update password if provided
+        if password_hash:
+            user['password'] = password_hash
+
+        # Update role if provided
+        if 'role' in data:
+            user['role'] = data['role']
+
+        user['updated_at'] = datetime.now().isoformat()
+        # Return user without password
+        return {'id': user['id'], 'username': user['username'], 'email': user['email'], 'role': user['role']}
+
+    try:
+        found, response_user = repository.users.update(user_id, apply_update)
+    except DuplicateRecord as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not found:
         return jsonify({'success': False, 'message': 'User not found'}), 404
-    
-    user = users[user_index]
-    
-    # Update username if provided and unique
-    if 'username' in data and data['username'] != user['username']:
-        if any(u['username'] == data['username'] for u in users):
-            return jsonify({'success': False, 'message': 'Username already exists'}), 400
-        user['username'] = data['username']
-    
-    # Update email if provided and unique
-    if 'email' in data and data['email'] != user['email']:
-        if any(u['email'] == data['email'] for u in users):
-            return jsonify({'success': False, 'message': 'Email already exists'}), 400
-        user['email'] = data['email']
-    
-    # Update password if provided
-    if 'password' in data and data['password']:
-        user['password'] = generate_password_hash(data['password'])
-    
-    # Update role if provided
-    if 'role' in data:
-        user['role'] = data['role']
-    
-    user['updated_at'] = datetime.now().isoformat()
-    users[user_index] = user
-    save_users(users)
-    
-    # Return user without password
-    response_user = {'id': user['id'], 'username': user['username'], 'email': user['email'], 'role': user['role']}
+    # Tokens issued to this user must pick up the new role (or username)
+    token_cache.invalidate_user(user_id)
     return jsonify({'success': True, 'data': response_user})
 
 @app.route('/api/users/<user_id>', methods=['DELETE'])
 @token_required
 def delete_user(user_id):
     """Delete a user"""
-    users = load_users()
-    
-    user_index = next((i for i, u in enumerate(users) if u['id'] == user_id), None)
-    if user_index is None:
+    if not repository.users.delete(user_id):
         return jsonify({'success': False, 'message': 'User not found'}), 404
-    
-    users.pop(user_index)
-    save_users(users)
+    token_cache.invalidate_user(user_id)
     
     return jsonify({'success': True, 'message': 'User deleted successfully'})
 
+# ===== CHANGE EVENTS =====
+def server_sent_event(event_type, event_id, data):
+    return f'event: {event_type}\nid: {event_id}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode('utf-8')
+
+def change_events_stream(after):
+    """Yield the change log as server-sent events, starting after the event id after."""
+    deadline = time.monotonic() + EVENTS_STREAM_SECONDS
+    yield f'retry: {EVENTS_RETRY_MS}\n\n'.encode('utf-8')
+    events = None if after is None else change_log.events_after(after)
+    while True:
+        if events is None:
+            # Nothing to resume from: the client reloads everything, then follows on from here
+            after = change_log.last_id
+            yield server_sent_event('reset', after, {})
+        elif events:
+            for event in events:
+                yield server_sent_event(event['type'], event['id'], event['data'])
+            after = events[-1]['id']
+        else:
+            yield b': keep-alive\n\n'
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = change_log.events_after(after, min(remaining, EVENTS_HEARTBEAT_SECONDS))
+
+@app.route('/api/events', methods=['GET'])
+@token_required
+def change_events():
+    """Stream changes to enquiries, packages, home images and the about page as server-sent events
+
+    Events are named enquiry.created, enquiry.deleted, package.created,
+    package.updated, package.deleted, image.added, image.deleted and
+    about.updated, and carry their change log id. A client reconnecting
+    with Last-Event-ID receives what it missed; when that is no longer
+    held, or on a first connection, it gets a 'reset' event and should
+    reload the lists. Streams end after EVENTS_STREAM_SECONDS and the
+    client reconnects.
+    """
+    if not event_streams.acquire():
+        response = jsonify({'success': False, 'message': 'Too many event streams, try again later'})
+        response.headers['Retry-After'] = str(max(1, EVENTS_RETRY_MS // 1000))
+        return response, 503
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    after = int(last_event_id) if last_event_id.isdigit() else None
+    response = app.response_class(change_events_stream(after), mimetype='text/event-stream')
+    response.call_on_close(event_streams.release)
+    response.headers['Cache-Control'] = 'no-store'
+    # Tell nginx not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# ===== SYSTEM ENDPOINTS =====
+@app.route('/api/stats', methods=['GET'])
+@token_required
+def get_stats():
+    """Background job queue depth and per-job latency, shedding counters, event streams and auth overhead"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'jobs': job_queue.stats(),
+            'login': {
+                'rejected_by_ip': login_ip_limiter.rejected,
+                'rejected_by_username': login_user_limiter.rejected,
+                'rejected_busy': password_verifier.busy_rejections
+            },
+            'enquiries': {
+                'rejected_by_ip': enquiry_ip_limiter.rejected,
+                'rejected_by_sender': enquiry_sender_limiter.rejected,
+                'duplicates': recent_enquiries.duplicates
+            },
+            'events': {
+                'last_id': change_log.last_id,
+                'streams': event_streams.open,
+                'rejected_streams': event_streams.rejected
+            },
+            'auth': token_cache.stats()
+        }
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, storage and password-check metrics of every server process, in Prometheus text format"""
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'):
+        return jsonify({'message': 'Invalid metrics token'}), 401
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 # ===== STATIC FILE SERVING =====
 @app.route('/uploads/<filename>')
 def serve_upload(filename):
-    """Serve uploaded files"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    """Serve uploaded files, preferring a resized WebP/AVIF variant the client accepts"""
+    entry = upload_index.get(filename)
+    variants = (entry or {}).get('variants')
+    # Indexed images get variants; until they are recorded the response may change, so keep it short-lived
+    negotiable = entry is not None and (mimetypes.guess_type(filename)[0] or '').startswith('image/')
+    pending = negotiable and variants is None
+    variant = pick_variant(variants, request.accept_mimetypes, request.args.get('w', type=int))
+    response = file_response(
+        request,
+        app.config['UPLOAD_FOLDER'],
+        variant['filename'] if variant else filename,
+        UPLOADS_PENDING_CACHE_CONTROL if pending else UPLOADS_CACHE_CONTROL,
+        UPLOADS_SERVE_MODE,
+        UPLOADS_ACCEL_PREFIX
+    )
+    if negotiable:
+        response.vary.add('Accept')
+    return response
 
 # ===== ERROR HANDLERS =====
 @app.errorhandler(404)
@@ -822,5 +1746,42 @@ def not_found(error):
 def server_error(error):
     return jsonify({'message': 'Internal server error'}), 500
 
+@app.errorhandler(413)
+def too_large(error):
+    return jsonify({'success': False, 'message': getattr(error, 'description', None) or 'Upload too large'}), 413
+
+@app.errorhandler(UploadSessionError)
+def upload_session_error(error):
+    return jsonify({'success': False, 'message': str(error)}), error.status
+
+@app.errorhandler(StorageError)
+def storage_error(error):
+    return jsonify({'success': False, 'message': str(error)}), 503
+
+# ===== STARTUP =====
+# Public catalogue responses pre-rendered by warm_caches()
+WARM_PATHS = ('/api/site', '/api/packages', '/api/high-selling-packages', '/api/home-images', '/api/about')
+
+def warm_caches():
+    """Load every store, build the search index and render the catalogue responses.
+
+    Run in the server's master process before it forks workers (see
+    gunicorn.conf.py), so each worker starts with warm memory instead of
+    paying for it on its first requests. Database handles opened here are
+    closed again so no worker inherits them, and the requests it makes are
+    left out of the request metrics.
+    """
+    started = time.perf_counter()
+    repository.users.snapshot()
+    repository.enquiries.refresh()
+    upload_index.store.snapshot()
+    for sort in SORT_ORDERS:
+        package_search.search(sort=sort, limit=1)
+    client = app.test_client()
+    for path in WARM_PATHS:
+        client.get(path, headers={'Accept-Encoding': 'br, gzip'}, environ_base={'travel.warm_up': True})
+    repository.close()
+    return time.perf_counter() - started
+
 if __name__ == '__main__':
     app.run(debug=False, port=5000, host='0.0.0.0')
@@ -0,0 +1,118 @@
+"""Throughput and memory of the streamed CSV/NDJSON enquiry exports.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_enquiry_export.py
+    TRAVEL_STORAGE=json python benchmarks/bench_enquiry_export.py
+
+Loads ENQUIRY_COUNT synthetic enquiries into a temporary store (sqlite
+unless TRAVEL_STORAGE says otherwise), then downloads every export through
+the Flask test client without buffering, reading the resident set size
+after each chunk. Reports rows/sec, MB/sec and how far RSS rose above its
+level before the export, and exits non-zero if any export grew RSS by more
+than RSS_BUDGET_MIB. The json backend keeps every enquiry in memory by
+design, so the budget there covers the export's own growth on top of it.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='travel-bench-')
+os.environ['TRAVEL_DATA_DIR'] = TMP_DIR
+os.environ.setdefault('TRAVEL_STORAGE', 'sqlite')
+
+import app as backend  # noqa: E402
+
+ENQUIRY_COUNT = 1000000
+LOAD_BATCH = 20000
+RSS_BUDGET_MIB = 64
+PACKAGES = ['Kerala', 'Goa', 'Manali', 'Ooty', 'Jaipur']
+CASES = [
+    ('csv, everything', {'format': 'csv'}),
+    ('ndjson, everything', {'format': 'ndjson'}),
+    ('csv, one month', {'format': 'csv', 'since': '2026-03-01', 'until': '2026-04-01'}),
+    ('ndjson, package=Goa', {'format': 'ndjson', 'package': 'Goa'}),
+]
+
+
+def rss():
+    """Resident set size of this process in bytes."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def load_enquiries():
+    for start in range(0, ENQUIRY_COUNT, LOAD_BATCH):
+        backend.repository.enquiries.add_many([
+            {
+                'id': f'enquiry-{i:07d}',
+                'name': f'Customer {i}',
+                'email': f'customer{i}@example.com',
+                'contact': f'+91 98{i:08d}',
+                'package': PACKAGES[i % len(PACKAGES)],
+                'message': 'Please send more details about dates, hotels and the price for two adults',
+                # One enquiry every 30 seconds from the start of 2026
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(1767225600 + i * 30))
+            }
+            for i in range(start, min(start + LOAD_BATCH, ENQUIRY_COUNT))
+        ])
+
+
+def auth_headers():
+    token = backend.jwt.encode({'username': 'bench', 'role': 'admin', 'exp': time.time() + 3600},
+                               backend.app.config['SECRET_KEY'], algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
+
+
+def export(client, headers, query):
+    """(rows, bytes, seconds, peak RSS growth) of one streamed download."""
+    baseline = rss()
+    peak = baseline
+    size = rows = 0
+    start = time.perf_counter()
+    response = client.get('/api/enquiries/export', query_string=query, headers=headers, buffered=False)
+    assert response.status_code == 200, response.status_code
+    for chunk in response.response:
+        size += len(chunk)
+        rows += chunk.count(b'\n')
+        peak = max(peak, rss())
+    response.close()
+    elapsed = time.perf_counter() - start
+    if query['format'] == 'csv':
+        rows -= 1
+    return rows, size, elapsed, peak - baseline
+
+
+def main():
+    start = time.perf_counter()
+    load_enquiries()
+    print(f"{os.environ['TRAVEL_STORAGE']}: loaded {ENQUIRY_COUNT} enquiries in {time.perf_counter() - start:.1f}s")
+    # Warm the store the way the admin panel's first page does
+    backend.repository.enquiries.query(limit=1)
+    client = backend.app.test_client()
+    headers = auth_headers()
+    print(f"{'case':<22} {'rows':>9} {'rows/s':>9} {'MB/s':>7} {'size':>9} {'RSS growth':>11}")
+    over_budget = []
+    for label, query in CASES:
+        rows, size, elapsed, growth = export(client, headers, query)
+        print(f'{label:<22} {rows:>9} {rows / elapsed:>9.0f} {size / elapsed / 1e6:>7.1f} '
+              f'{size / 2 ** 20:>7.1f}MiB {growth / 2 ** 20:>8.1f}MiB')
+        if growth > RSS_BUDGET_MIB * 2 ** 20:
+            over_budget.append(label)
+    if over_budget:
+        print(f'RSS grew by more than {RSS_BUDGET_MIB}MiB in: {", ".join(over_budget)}')
+        return 1
+    print(f'Every export stayed within {RSS_BUDGET_MIB}MiB of RSS growth')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Cost of a flood of public enquiries, stored versus shed.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_enquiry_flood.py
+
+Posts enquiries through the Flask test client for DURATION_SECONDS per
+case: every request distinct with the limits off (each one is stored),
+one bot IP over the IP limit, one sender over the per-sender limit, and
+the same enquiry replayed. Reports requests/sec, median latency, how many
+requests were stored and how many bytes enquiries.jsonl grew by.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='travel-bench-')
+os.environ['TRAVEL_DATA_DIR'] = TMP_DIR
+os.environ['TRAVEL_UPLOAD_DIR'] = os.path.join(TMP_DIR, 'uploads')
+
+import app as backend  # noqa: E402
+from ratelimit import DuplicateFilter, SlidingWindowLimiter  # noqa: E402
+
+DURATION_SECONDS = 3.0
+CASES = [
+    ('distinct enquiries, limits off', lambda i: (f'10.0.{i // 256 % 256}.{i % 256}', f'bot{i}@example.com', f'm{i}')),
+    ('one IP over its limit', lambda i: ('10.9.9.9', f'bot{i}@example.com', f'm{i}')),
+    ('one sender over its limit', lambda i: (f'10.0.{i // 256 % 256}.{i % 256}', 'bot@example.com', f'm{i}')),
+    ('the same enquiry replayed', lambda i: (f'10.0.{i // 256 % 256}.{i % 256}', 'bot@example.com', 'Hello')),
+]
+
+
+def configure(limited):
+    if limited:
+        backend.enquiry_ip_limiter = SlidingWindowLimiter(backend.ENQUIRY_IP_LIMIT, backend.ENQUIRY_IP_WINDOW)
+        backend.enquiry_sender_limiter = SlidingWindowLimiter(
+            backend.ENQUIRY_SENDER_LIMIT, backend.ENQUIRY_SENDER_WINDOW)
+    else:
+        backend.enquiry_ip_limiter = SlidingWindowLimiter(0, 1)
+        backend.enquiry_sender_limiter = SlidingWindowLimiter(0, 1)
+    backend.recent_enquiries = DuplicateFilter(backend.ENQUIRY_DUPLICATE_WINDOW)
+
+
+def store_size():
+    path = Path(TMP_DIR) / 'enquiries.jsonl'
+    return path.stat().st_size if path.exists() else 0
+
+
+def bench(name, request_for):
+    configure(limited=not name.endswith('limits off'))
+    client = backend.app.test_client()
+    stored_before = len(backend.repository.enquiries.all())
+    size_before = store_size()
+    latencies = []
+    deadline = time.perf_counter() + DURATION_SECONDS
+    i = 0
+    while time.perf_counter() < deadline:
+        ip, email, message = request_for(i)
+        started = time.perf_counter()
+        client.post('/api/enquiries', json={'name': 'Bot', 'email': email, 'message': message},
+                    environ_base={'REMOTE_ADDR': ip})
+        latencies.append(time.perf_counter() - started)
+        i += 1
+    stored = len(backend.repository.enquiries.all()) - stored_before
+    print(f'{name:<34} {len(latencies) / DURATION_SECONDS:>9.0f} {statistics.median(latencies) * 1e3:>9.2f}ms '
+          f'{stored:>8} {(store_size() - size_before) / 1024:>9.0f}KiB')
+
+
+def main():
+    print(f"{'case':<34} {'req/s':>9} {'p50':>11} {'stored':>8} {'written':>12}")
+    for name, request_for in CASES:
+        bench(name, request_for)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Page-fetch latency of GET /api/enquiries with 100k enquiries.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_enquiry_pages.py
+
+Loads synthetic enquiries into a temporary enquiry log, then compares the
+legacy full-list response with cursor pages, filtered pages and deep pages.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='travel-bench-')
+os.environ['TRAVEL_DATA_DIR'] = TMP_DIR
+
+import app as backend  # noqa: E402
+
+ENQUIRY_COUNT = 100000
+PACKAGES = ['Kerala', 'Goa', 'Manali', 'Ooty', 'Jaipur']
+
+
+def load_enquiries():
+    enquiries = [
+        {
+            'id': f'enquiry-{i:06d}',
+            'name': f'Customer {i}',
+            'email': f'customer{i}@example.com',
+            'contact': '',
+            'package': PACKAGES[i % len(PACKAGES)],
+            'message': 'Please send more details',
+            'timestamp': f'2026-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:{i % 60:02d}'
+        }
+        for i in range(ENQUIRY_COUNT)
+    ]
+    backend.repository.enquiries.add_many(enquiries)
+
+
+def auth_headers():
+    token = backend.jwt.encode({'username': 'bench', 'role': 'admin', 'exp': time.time() + 3600},
+                               backend.app.config['SECRET_KEY'], algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
+
+
+def measure(client, headers, query, rounds):
+    client.get('/api/enquiries', query_string=query, headers=headers)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        response = client.get('/api/enquiries', query_string=query, headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return statistics.median(samples), len(response.data)
+
+
+def main():
+    load_enquiries()
+    client = backend.app.test_client()
+    headers = auth_headers()
+    start = time.perf_counter()
+    backend.repository.enquiries.query(limit=1)
+    print(f'index build for {ENQUIRY_COUNT} enquiries: {(time.perf_counter() - start) * 1e3:.1f}ms')
+
+    first_page = client.get('/api/enquiries', query_string={'limit': 50}, headers=headers).get_json()
+    cases = [
+        ('full list (no params)', {}, 5),
+        ('first page, limit=50', {'limit': 50}, 200),
+        ('second page via cursor', {'limit': 50, 'cursor': first_page['next_cursor']}, 200),
+        ('package=Goa, limit=50', {'package': 'Goa', 'limit': 50}, 200),
+        ('since/until one month, asc', {'since': '2026-06-01', 'until': '2026-07-01', 'order': 'asc', 'limit': 50}, 200),
+        ('limit=500', {'limit': 500}, 100),
+    ]
+    for label, query, rounds in cases:
+        latency, size = measure(client, headers, query, rounds)
+        print(f'{label:<30} {latency * 1e3:>9.2f}ms {size / 1024:>10.1f}KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Login throughput and CPU use while the login endpoint is under attack.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_login.py
+
+Attacker threads post wrong passwords for an existing user through the
+Flask test client while one legitimate client logs in once per second with
+its own IP and account. For each scenario the script reports attempts/sec,
+how many attempts reached password hashing, the CPU those hashes cost per
+wall-clock second (the attackers run in the same process, so total process
+CPU would mostly measure them) and the legitimate client's login latency.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='travel-bench-')
+os.environ['TRAVEL_DATA_DIR'] = TMP_DIR
+
+import app as backend  # noqa: E402
+from passwords import PasswordVerifier  # noqa: E402
+from ratelimit import SharedTokenBucketLimiter, TokenBucketLimiter  # noqa: E402
+from werkzeug.security import check_password_hash, generate_password_hash  # noqa: E402
+
+ATTACKERS = 16
+DURATION_SECONDS = 5.0
+VICTIM = 'victim'
+LEGIT_USER = 'legit'
+
+
+def create_users():
+    for username in (VICTIM, LEGIT_USER):
+        backend.repository.users.add({
+            'id': str(uuid.uuid4()),
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': generate_password_hash('correct horse'),
+            'role': 'admin'
+        })
+
+
+def configure(protected):
+    if protected:
+        # A fresh file per scenario, so none starts with buckets drained by the last one
+        path = Path(TMP_DIR) / f'login_throttle-{uuid.uuid4().hex}.db'
+        backend.login_ip_limiter = SharedTokenBucketLimiter(
+            path, 'ip', backend.LOGIN_IP_PER_MINUTE / 60, backend.LOGIN_IP_BURST
+        )
+        backend.login_user_limiter = SharedTokenBucketLimiter(
+            path, 'username', backend.LOGIN_USER_PER_MINUTE / 60, backend.LOGIN_USER_BURST
+        )
+        backend.password_verifier = PasswordVerifier(backend.HASH_WORKERS, backend.HASH_MAX_PENDING)
+    else:
+        # The previous behaviour: no throttling and one hash per request thread
+        backend.login_ip_limiter = TokenBucketLimiter(1e9, 1e9)
+        backend.login_user_limiter = TokenBucketLimiter(1e9, 1e9)
+        backend.password_verifier = PasswordVerifier(ATTACKERS, ATTACKERS + 1, cache_size=0)
+
+
+def attacker(client, deadline, spread_ips, counts, lock):
+    local = {}
+    while time.perf_counter() < deadline:
+        ip = f'10.{random.randrange(256)}.{random.randrange(256)}.{random.randrange(256)}' if spread_ips else '10.0.0.1'
+        status = client.post(
+            '/api/auth/login',
+            json={'username': VICTIM, 'password': 'wrong'},
+            environ_base={'REMOTE_ADDR': ip}
+        ).status_code
+        local[status] = local.get(status, 0) + 1
+    with lock:
+        for status, count in local.items():
+            counts[status] = counts.get(status, 0) + count
+
+
+def legitimate(client, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = client.post(
+            '/api/auth/login',
+            json={'username': LEGIT_USER, 'password': 'correct horse'},
+            environ_base={'REMOTE_ADDR': '192.168.1.10'}
+        )
+        latencies.append((time.perf_counter() - start, response.status_code))
+        time.sleep(1.0)
+
+
+def hash_cpu_seconds():
+    pwhash = generate_password_hash('correct horse')
+    start = time.process_time()
+    for _ in range(5):
+        check_password_hash(pwhash, 'wrong')
+    return (time.process_time() - start) / 5
+
+
+def run(label, protected, spread_ips, hash_cost):
+    configure(protected)
+    client = backend.app.test_client()
+    counts, latencies, lock = {}, [], threading.Lock()
+    deadline = time.perf_counter() + DURATION_SECONDS
+    wall_start = time.perf_counter()
+    threads = [threading.Thread(target=attacker, args=(client, deadline, spread_ips, counts, lock)) for _ in range(ATTACKERS)]
+    threads.append(threading.Thread(target=legitimate, args=(client, deadline, latencies)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    hashed = counts.get(401, 0) + sum(1 for _, status in latencies if status == 200)
+    attempts = sum(counts.values())
+    legit_ok = sum(1 for _, status in latencies if status == 200)
+    print(
+        f'{label:<34} {attempts / wall:>9.0f}/s {hashed:>7} {hashed * hash_cost / wall:>9.2f} '
+        f'{statistics.median(l for l, _ in latencies) * 1e3:>9.1f}ms {legit_ok:>3}/{len(latencies)}'
+    )
+
+
+def main():
+    create_users()
+    hash_cost = hash_cpu_seconds()
+    print(f'{ATTACKERS} attacker threads for {DURATION_SECONDS:.0f}s, {os.cpu_count()} CPUs, '
+          f'{hash_cost * 1e3:.0f}ms CPU per password hash')
+    print(f"{'scenario':<34} {'attempts':>11} {'hashed':>7} {'hash cpu/s':>9} {'legit p50':>11} {'ok':>7}")
+    run('unthrottled, one IP', False, False, hash_cost)
+    run('throttled, one IP', True, False, hash_cost)
+    run('throttled, random IPs', True, True, hash_cost)
+
+
+if __name__ == '__main__':
+    main()
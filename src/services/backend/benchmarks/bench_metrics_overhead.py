@@ -0,0 +1,72 @@
+"""Cost of the request and storage metrics.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_metrics_overhead.py
+
+Times ROUNDS requests to a cached catalogue endpoint through the Flask test
+client with the metrics hooks installed and with them removed, then the
+recording calls on their own and one render of /metrics.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ['TRAVEL_DATA_DIR'] = tempfile.mkdtemp(prefix='travel-bench-')
+
+import app as backend  # noqa: E402
+from storage import record_io  # noqa: E402
+
+ROUNDS = 20000
+REPEATS = 5
+PATH = '/api/packages'
+
+
+def per_request(client):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        client.get(PATH)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def per_call(func):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main():
+    client = backend.app.test_client()
+    hooks = (
+        (backend.app.before_request_funcs[None], backend.start_request_timer),
+        (backend.app.after_request_funcs[None], backend.record_request_metrics),
+    )
+    with_metrics, without_metrics = [], []
+    for _ in range(REPEATS):
+        with_metrics.append(per_request(client))
+        for funcs, hook in hooks:
+            funcs.remove(hook)
+        without_metrics.append(per_request(client))
+        for funcs, hook in hooks:
+            funcs.append(hook)
+    on, off = statistics.median(with_metrics), statistics.median(without_metrics)
+    print(f'GET {PATH} x {ROUNDS}, median of {REPEATS}')
+    print(f'  without metrics  {off * 1e6:8.1f}us per request')
+    print(f'  with metrics     {on * 1e6:8.1f}us per request ({(on - off) * 1e6:+.1f}us, {(on - off) / off:+.1%})')
+    print(f"  counter inc      {per_call(lambda: backend.http_requests.inc(('GET', PATH, '200'))) * 1e6:8.2f}us")
+    print(f"  histogram obs.   {per_call(lambda: backend.http_request_seconds.observe(0.01, ('GET', PATH))) * 1e6:8.2f}us")
+    print(f"  record_io        {per_call(lambda: record_io('data.json', 'read', 0.001, 4096)) * 1e6:8.2f}us")
+    start = time.perf_counter()
+    body = backend.metrics.render()
+    print(f'  render /metrics  {(time.perf_counter() - start) * 1e3:8.2f}ms ({len(body)} bytes)')
+
+
+if __name__ == '__main__':
+    main()
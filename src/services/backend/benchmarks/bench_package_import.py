@@ -0,0 +1,107 @@
+"""Time to create 5,000 packages one request at a time, in one batch, and by CSV/XLSX import.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_package_import.py
+
+Requests go through the Flask test client against each repository backend
+in a fresh temporary directory. One-at-a-time creation is timed for the
+first ONE_BY_ONE packages and extrapolated linearly. Each JSON request
+rewrites the whole document, so the real JSON total is higher still.
+"""
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ['TRAVEL_DATA_DIR'] = tempfile.mkdtemp(prefix='travel-bench-')
+
+import app as backend  # noqa: E402
+from openpyxl import Workbook  # noqa: E402
+from repository import BACKENDS, open_repository  # noqa: E402
+
+PACKAGES = 5000
+ONE_BY_ONE = 500
+COLUMNS = ('name', 'price', 'description', 'duration', 'includes')
+
+
+def make_rows():
+    return [
+        (f'Package {i}', f'${1000 + i}', 'Synthetic package used for benchmarking', str(3 + i % 10), 'hotel, breakfast')
+        for i in range(PACKAGES)
+    ]
+
+
+def csv_bytes(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def xlsx_bytes(rows):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Packages')
+    sheet.append(COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def fresh_repository(name):
+    data_dir = tempfile.mkdtemp(prefix=f'travel-bench-{name}-')
+    backend.repository = open_repository(name, data_dir)
+
+
+def timed(func):
+    start = time.perf_counter()
+    response = func()
+    elapsed = time.perf_counter() - start
+    assert response.status_code < 300, response.get_json()
+    return elapsed
+
+
+def bench(name, client, headers, rows, files):
+    fresh_repository(name)
+    start = time.perf_counter()
+    for row in rows[:ONE_BY_ONE]:
+        response = client.post('/api/packages', headers=headers, json=dict(zip(COLUMNS, row)))
+        assert response.status_code == 201
+    one_by_one = (time.perf_counter() - start) * PACKAGES / ONE_BY_ONE
+
+    fresh_repository(name)
+    operations = [{'op': 'create', 'data': dict(zip(COLUMNS, row))} for row in rows]
+    batch = timed(lambda: client.post('/api/packages/batch', headers=headers, json={'operations': operations}))
+
+    imports = []
+    for filename, body in files:
+        fresh_repository(name)
+        imports.append(timed(lambda: client.post(
+            '/api/packages/import', headers=headers, data={'file': (io.BytesIO(body), filename)}
+        )))
+    print(f'{name:<8} {one_by_one:>13.1f}s {batch:>9.2f}s {imports[0]:>9.2f}s {imports[1]:>9.2f}s')
+
+
+def main():
+    client = backend.app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    rows = make_rows()
+    files = (('packages.csv', csv_bytes(rows)), ('packages.xlsx', xlsx_bytes(rows)))
+    print(f'{PACKAGES} packages; one-at-a-time extrapolated from {ONE_BY_ONE} requests')
+    print(f"{'backend':<8} {'one-by-one':>14} {'batch':>10} {'csv':>10} {'xlsx':>10}")
+    for name in BACKENDS:
+        bench(name, client, headers, rows, files)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Latency of PackageSearchIndex queries over 50k packages on both backends.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_package_search.py
+
+Each backend is loaded with synthetic packages through import_dump(). The
+script reports how long the first query takes (it builds the index), the
+median and p99 latency of a set of representative queries, and the cost of
+the first query after a single package update (the incremental re-sync).
+"""
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from repository import BACKENDS, open_repository  # noqa: E402
+from search import PackageSearchIndex  # noqa: E402
+
+PACKAGES = 50000
+ROUNDS = 200
+DESTINATIONS = ['Bali', 'Goa', 'Kerala', 'Paris', 'Zürich', 'Kyoto', 'Cairo', 'Lisbon', 'Queenstown', 'Cusco',
+                'Santorini', 'Marrakech', 'Reykjavik', 'Hanoi', 'Cape Town', 'Havana', 'Ladakh', 'Maldives']
+THEMES = ['beach', 'trek', 'honeymoon', 'family', 'heritage', 'safari', 'cruise', 'wellness', 'food', 'adventure']
+INCLUDES = ['Hotel', 'Flights', 'Breakfast', 'Airport transfers', 'Guide', 'Visa', 'Dinner', 'Spa', 'Boat ride']
+PRICE_FORMATS = ['${}', '{}', 'INR {:,}', '₹{:,}', '€{}', 'From ${:,} pp']
+QUERIES = [
+    {'query': 'bali'},
+    {'query': 'beach honeymoon'},
+    {'query': 'kyo'},
+    {'query': 'zurich heritage', 'max_price': 5000},
+    {'query': 'guide', 'min_duration': 5, 'max_duration': 10},
+    {'query': 'safari spa', 'min_price': 1000, 'max_price': 3000},
+    {'query': 'nomatch'},
+    {'query': '', 'sort': 'price'},
+    {'query': '', 'sort': '-duration', 'min_price': 1000, 'max_price': 3000},
+    {'query': 'beach', 'sort': 'newest', 'offset': 40},
+]
+
+
+def make_package(rng, i):
+    destination = rng.choice(DESTINATIONS)
+    theme = rng.choice(THEMES)
+    return {
+        'id': str(uuid.uuid4()),
+        'name': f'{destination} {theme} escape {i}',
+        'price': rng.choice(PRICE_FORMATS).format(rng.randrange(300, 15000)),
+        'description': f'A {theme} holiday in {destination} with hand-picked stays and local experiences.',
+        'duration': rng.choice(['{} days', '{}D/{}N', '{} Days', '{}']).format(rng.randrange(2, 21), 0),
+        'includes': rng.sample(INCLUDES, 3),
+        'image': None,
+        'created_at': '2026-01-01T00:00:00'
+    }
+
+
+def bench(backend, packages):
+    repository = open_repository(backend, tempfile.mkdtemp(prefix=f'travel-bench-{backend}-'), check_interval=0)
+    repository.import_dump({'all_packages': packages})
+    index = PackageSearchIndex(repository.all_packages, 'USD')
+
+    start = time.perf_counter()
+    index.search('bali')
+    build = time.perf_counter() - start
+
+    samples = []
+    for _ in range(ROUNDS):
+        for query in QUERIES:
+            start = time.perf_counter()
+            index.search(**query)
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    target = packages[len(packages) // 2]['id']
+    repository.all_packages.update(target, lambda package: package.update({'name': 'Renamed Lisbon package'}))
+    start = time.perf_counter()
+    found = index.search('renamed')
+    resync = time.perf_counter() - start
+    assert found['total'] == 1
+
+    print(f'{backend:<8} {build * 1e3:>9.0f}ms {statistics.median(samples) * 1e3:>9.3f}ms '
+          f'{samples[int(len(samples) * 0.99)] * 1e3:>9.3f}ms {resync * 1e3:>9.1f}ms')
+
+
+def main():
+    rng = random.Random(42)
+    packages = [make_package(rng, i) for i in range(PACKAGES)]
+    print(f'{PACKAGES} packages, {len(QUERIES)} queries x {ROUNDS} rounds')
+    print(f"{'backend':<8} {'build':>11} {'p50':>11} {'p99':>11} {'resync':>11}")
+    for backend in BACKENDS:
+        bench(backend, packages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""GET latency of the public catalogue endpoints as the enquiry list grows.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_read_cache.py
+
+For each enquiry count the script writes a fresh data.json into a temporary
+directory, then times GET /api/packages, /api/high-selling-packages and
+/api/home-images through the Flask test client. The "disk parse" column is
+what every request used to pay for json.load() of the whole file.
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='travel-bench-')
+os.environ['TRAVEL_DATA_DIR'] = TMP_DIR
+os.environ['TRAVEL_STORAGE'] = 'json'
+
+import app as backend  # noqa: E402
+
+ENQUIRY_COUNTS = [0, 1000, 10000, 100000]
+ENDPOINTS = ['/api/packages', '/api/high-selling-packages', '/api/home-images']
+REQUESTS_PER_ENDPOINT = 300
+
+
+def build_document(enquiry_count):
+    packages = [
+        {
+            'id': str(uuid.uuid4()),
+            'name': f'Package {i}',
+            'price': f'${1000 + i}',
+            'description': 'Synthetic package used for benchmarking',
+            'duration': str(3 + i % 10),
+            'includes': ['hotel', 'breakfast'],
+            'image': None,
+            'created_at': '2026-01-01T00:00:00'
+        }
+        for i in range(50)
+    ]
+    enquiries = [
+        {
+            'id': str(uuid.uuid4()),
+            'name': f'Customer {i}',
+            'email': f'customer{i}@example.com',
+            'contact': '',
+            'package': 'Package 1',
+            'message': 'Please send more details',
+            'timestamp': '2026-01-01T00:00:00'
+        }
+        for i in range(enquiry_count)
+    ]
+    return {
+        'high_selling_packages': packages[:5],
+        'all_packages': packages,
+        'home_images': [],
+        'enquiries': enquiries
+    }
+
+
+def time_disk_parse(path, rounds=5):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def time_endpoint(client, url):
+    client.get(url)
+    samples = []
+    for _ in range(REQUESTS_PER_ENDPOINT):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return statistics.median(samples)
+
+
+def main():
+    client = backend.app.test_client()
+    print(f"{'enquiries':>10} {'disk parse':>12} " + ' '.join(f'{url:>28}' for url in ENDPOINTS))
+    for count in ENQUIRY_COUNTS:
+        data_store = backend.repository.data_store
+        with open(data_store.path, 'w', encoding='utf-8') as f:
+            json.dump(build_document(count), f)
+        data_store.invalidate()
+        parse = time_disk_parse(data_store.path)
+        results = [time_endpoint(client, url) for url in ENDPOINTS]
+        print(f'{count:>10} {parse * 1e3:>10.2f}ms ' + ' '.join(f'{r * 1e6:>26.0f}us' for r in results))
+
+
+if __name__ == '__main__':
+    main()
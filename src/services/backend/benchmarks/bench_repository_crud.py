@@ -0,0 +1,93 @@
+"""CRUD latency of the JSON and SQLite repository backends at 1k, 10k and 100k rows.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_repository_crud.py
+
+Each backend gets a fresh temporary directory loaded with N packages via
+import_dump(). The script then reports median latency for get by id, an
+indexed find, add, update and delete on the all_packages collection. Write
+timings include the durable commit (an fsynced file rewrite for JSON, a WAL
+commit for SQLite).
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from repository import BACKENDS, open_repository  # noqa: E402
+
+ROW_COUNTS = (1000, 10000, 100000)
+READ_ROUNDS = 500
+WRITE_ROUNDS = 10
+OPERATIONS = ('get', 'find', 'add', 'update', 'delete')
+
+
+def make_package(i):
+    return {
+        'id': str(uuid.uuid4()),
+        'name': f'Package {i}',
+        'price': f'${1000 + i}',
+        'description': 'Synthetic package used for benchmarking',
+        'duration': str(3 + i % 10),
+        'includes': ['hotel', 'breakfast'],
+        'image': f'/uploads/{i:064x}.png',
+        'created_at': '2026-01-01T00:00:00'
+    }
+
+
+def timed(func, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def bench(backend, rows):
+    data_dir = tempfile.mkdtemp(prefix=f'travel-bench-{backend}-')
+    # check_interval=0 so every read re-validates against the file or database
+    repository = open_repository(backend, data_dir, check_interval=0)
+    packages = [make_package(i) for i in range(rows)]
+    repository.import_dump({'all_packages': packages})
+    collection = repository.all_packages
+    collection.get(packages[0]['id'])
+    ids = [p['id'] for p in packages]
+
+    results = {
+        'get': timed(lambda: collection.get(random.choice(ids)), READ_ROUNDS),
+        'find': timed(lambda: collection.find('image', random.choice(packages)['image']), READ_ROUNDS)
+    }
+    counter = iter(range(rows, rows + WRITE_ROUNDS * 2))
+    added = []
+
+    def add():
+        added.append(collection.add(make_package(next(counter)))['id'])
+
+    def update():
+        collection.update(random.choice(ids), lambda package: package.update(price='$1'))
+
+    results['add'] = timed(add, WRITE_ROUNDS)
+    results['update'] = timed(update, WRITE_ROUNDS)
+    results['delete'] = timed(lambda: collection.delete(added.pop()), WRITE_ROUNDS)
+    return results
+
+
+def main():
+    print(f"{'backend':<8} {'rows':>7} " + ' '.join(f'{op:>11}' for op in OPERATIONS))
+    for rows in ROW_COUNTS:
+        for backend in BACKENDS:
+            results = bench(backend, rows)
+            print(f'{backend:<8} {rows:>7} ' + ' '.join(f'{results[op] * 1e3:>9.3f}ms' for op in OPERATIONS))
+
+
+if __name__ == '__main__':
+    main()
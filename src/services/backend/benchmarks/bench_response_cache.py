@@ -0,0 +1,78 @@
+"""Requests/sec on GET /api/packages with and without the response cache.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_response_cache.py
+
+Uses a catalogue of 500 packages and the Flask test client, so the numbers
+include Flask/Werkzeug request overhead but no network.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='travel-bench-')
+os.environ['TRAVEL_DATA_DIR'] = TMP_DIR
+os.environ['TRAVEL_STORAGE'] = 'json'
+
+import app as backend  # noqa: E402
+
+PACKAGE_COUNT = 500
+DURATION_SECONDS = 3.0
+
+
+def write_catalogue():
+    packages = [
+        {
+            'id': str(uuid.uuid4()),
+            'name': f'Package {i}',
+            'price': f'${1000 + i}',
+            'description': 'A synthetic package description that is about as long as a real one. ' * 3,
+            'duration': str(3 + i % 10),
+            'includes': ['hotel', 'breakfast', 'airport transfer'],
+            'image': f'/uploads/{uuid.uuid4()}_photo.png',
+            'created_at': '2026-01-01T00:00:00'
+        }
+        for i in range(PACKAGE_COUNT)
+    ]
+    with open(backend.repository.data_store.path, 'w', encoding='utf-8') as f:
+        json.dump({'high_selling_packages': [], 'all_packages': packages, 'home_images': []}, f)
+    backend.repository.data_store.invalidate()
+
+
+def requests_per_second(client, headers):
+    client.get('/api/packages', headers=headers)
+    count = 0
+    deadline = time.perf_counter() + DURATION_SECONDS
+    while time.perf_counter() < deadline:
+        response = client.get('/api/packages', headers=headers)
+        assert response.status_code == 200
+        count += 1
+    return count / DURATION_SECONDS
+
+
+def main():
+    write_catalogue()
+    client = backend.app.test_client()
+    cases = [
+        ('jsonify per request', False, {}),
+        ('response cache, identity', True, {}),
+        ('jsonify + no compression (gzip asked)', False, {'Accept-Encoding': 'gzip'}),
+        ('response cache, gzip', True, {'Accept-Encoding': 'gzip'}),
+        ('response cache, br', True, {'Accept-Encoding': 'br'}),
+    ]
+    for label, enabled, headers in cases:
+        backend.app.config['RESPONSE_CACHE'] = enabled
+        size = len(client.get('/api/packages', headers=headers).data)
+        print(f'{label:<40} {requests_per_second(client, headers):>8.0f} req/s {size / 1024:>8.1f}KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Concurrent HTTP Range requests against a video in /uploads.
+
+Run from src/services/backend:
+
+    python benchmarks/bench_upload_ranges.py
+
+Serves the app with Werkzeug's threaded server on a local port and has
+several client threads seek around a 64 MiB file with 1 MiB range requests,
+the way a video player scrubs. Reports requests/sec, throughput and latency
+per concurrency level. Under gunicorn the same code path uses sendfile(2).
+"""
+import http.client
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='travel-bench-')
+os.environ['TRAVEL_DATA_DIR'] = TMP_DIR
+os.environ['TRAVEL_UPLOAD_DIR'] = os.path.join(TMP_DIR, 'uploads')
+
+import app as backend  # noqa: E402
+from werkzeug.serving import WSGIRequestHandler, make_server  # noqa: E402
+
+VIDEO_BYTES = 64 * 1024 * 1024
+RANGE_BYTES = 1024 * 1024
+CONCURRENCY = (1, 8, 32)
+DURATION_SECONDS = 3.0
+VIDEO_NAME = 'bench-video.mp4'
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def write_video():
+    with open(os.path.join(backend.app.config['UPLOAD_FOLDER'], VIDEO_NAME), 'wb') as f:
+        for _ in range(VIDEO_BYTES // (1024 * 1024)):
+            f.write(os.urandom(1024 * 1024))
+
+
+def client(port, deadline, latencies, lock):
+    rng = random.Random()
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    local = []
+    while time.perf_counter() < deadline:
+        start = rng.randrange(0, VIDEO_BYTES - RANGE_BYTES)
+        began = time.perf_counter()
+        conn.request('GET', f'/uploads/{VIDEO_NAME}', headers={'Range': f'bytes={start}-{start + RANGE_BYTES - 1}'})
+        response = conn.getresponse()
+        body = response.read()
+        assert response.status == 206 and len(body) == RANGE_BYTES
+        local.append(time.perf_counter() - began)
+    conn.close()
+    with lock:
+        latencies.extend(local)
+
+
+def run(port, concurrency):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + DURATION_SECONDS
+    threads = [threading.Thread(target=client, args=(port, deadline, latencies, lock)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def main():
+    write_video()
+    server = make_server('127.0.0.1', 0, backend.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    print(f'mode={backend.UPLOADS_SERVE_MODE} file={VIDEO_BYTES >> 20}MiB range={RANGE_BYTES >> 10}KiB')
+    for concurrency in CONCURRENCY:
+        latencies = sorted(run(port, concurrency))
+        rate = len(latencies) / DURATION_SECONDS
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if len(latencies) >= 100 else latencies[-1]
+        print(
+            f'{concurrency:>3} clients {rate:>8.0f} req/s {rate * RANGE_BYTES / 2**20:>8.0f} MiB/s '
+            f'p50 {statistics.median(latencies) * 1000:>6.1f}ms p99 {p99 * 1000:>6.1f}ms'
+        )
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Requests per second through the development server and gunicorn.
+
+Run from src/services/backend (gunicorn must be installed):
+
+    python benchmarks/bench_wsgi_server.py
+
+Each server runs on a copy of data.json in a temporary directory. CLIENTS
+processes each hold one keep-alive connection and cycle through PATHS for
+SECONDS; the script reports requests per second, the median and p99
+latency, and how many requests failed and were retried.
+
+Client and server share the machine, so on a small host the clients use
+much of the CPU. The last column divides the requests served by the CPU
+seconds the server processes used meanwhile (read from /proc on Linux):
+roughly the requests per second one core can serve when it does nothing
+else.
+"""
+import http.client
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CLIENTS = 16
+SECONDS = 20
+PATHS = [
+    '/api/site',
+    '/api/packages',
+    '/api/high-selling-packages',
+    '/api/about',
+    '/api/packages/search?q=bali',
+    '/api/packages/search?sort=price&limit=10',
+]
+SERVERS = [
+    ('flask dev server', [sys.executable, '-c', 'import sys; from app import app; app.run(port=int(sys.argv[1]))']),
+    ('gunicorn, gunicorn.conf.py defaults', ['-m', 'gunicorn']),
+    ('gunicorn, defaults without keep-alive', ['-m', 'gunicorn', '--keep-alive', '0']),
+    ('gunicorn, 1 worker x 1 thread', ['-m', 'gunicorn', '-w', '1', '--threads', '1']),
+    ('gunicorn, 1 sync worker', ['-m', 'gunicorn', '-w', '1', '--worker-class', 'sync']),
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_tree_cpu(pid):
+    """CPU seconds used so far by pid and its descendants, or None off Linux."""
+    ticks = os.sysconf('SC_CLK_TCK')
+    parents = {}
+    usage = {}
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            fields = (entry / 'stat').read_text().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        parents[int(entry.name)] = int(fields[1])
+        # utime and stime, plus those of reaped children (workers that were recycled)
+        usage[int(entry.name)] = sum(int(value) for value in fields[11:15]) / ticks
+    if pid not in usage:
+        return None
+    tree = {pid}
+    for _ in range(3):
+        tree |= {child for child, parent in parents.items() if parent in tree}
+    return sum(usage[member] for member in tree)
+
+
+def start(command, port, data_dir):
+    env = dict(os.environ, TRAVEL_DATA_DIR=data_dir, TRAVEL_UPLOAD_DIR=os.path.join(data_dir, 'uploads'))
+    if command[0] == '-m':
+        # gunicorn.conf.py in the working directory supplies everything not given here
+        command = [sys.executable] + command + ['--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'wsgi:app']
+    else:
+        command = command + [str(port)]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/api/about')
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{command} did not start')
+
+
+def client(port, deadline, results):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    errors = 0
+    i = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request('GET', PATHS[i % len(PATHS)], headers={'Accept-Encoding': 'gzip'})
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            # Counted, then retried on a new connection like a browser would
+            connection.close()
+            errors += 1
+            continue
+        if response.will_close:
+            connection.close()
+        latencies.append(time.perf_counter() - started)
+        i += 1
+    results.put((latencies, errors))
+
+
+def bench(name, command):
+    data_dir = tempfile.mkdtemp(prefix='travel-bench-wsgi-')
+    shutil.copy(BACKEND_DIR / 'data.json', data_dir)
+    port = free_port()
+    process = start(command, port, data_dir)
+    try:
+        results = multiprocessing.Queue()
+        cpu_before = process_tree_cpu(process.pid)
+        deadline = time.monotonic() + SECONDS
+        clients = [multiprocessing.Process(target=client, args=(port, deadline, results)) for _ in range(CLIENTS)]
+        for p in clients:
+            p.start()
+        latencies = []
+        errors = 0
+        for _ in clients:
+            client_latencies, client_errors = results.get()
+            latencies += client_latencies
+            errors += client_errors
+        latencies.sort()
+        cpu = process_tree_cpu(process.pid)
+        for p in clients:
+            p.join()
+    finally:
+        process.terminate()
+        process.wait()
+    print(f'{name:<38} {len(latencies) / SECONDS:>9.0f} {statistics.median(latencies) * 1e3:>9.1f}ms '
+          f'{latencies[int(len(latencies) * 0.99)] * 1e3:>9.1f}ms {errors:>7} '
+          f"{len(latencies) / (cpu - cpu_before) if cpu and cpu > cpu_before else float('nan'):>13.0f}")
+
+
+def main():
+    print(f'{CLIENTS} keep-alive clients for {SECONDS}s over {len(PATHS)} GET endpoints, {os.cpu_count()} CPU(s)')
+    print(f"{'server':<38} {'req/s':>9} {'p50':>11} {'p99':>11} {'errors':>7} {'req/cpu-sec':>13}")
+    for name, command in SERVERS:
+        bench(name, command)
+
+
+if __name__ == '__main__':
+    main()
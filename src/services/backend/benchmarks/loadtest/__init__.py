@@ -0,0 +1,28 @@
+"""Reproducible load test of every API route on a synthetic dataset.
+
+Run from src/services/backend:
+
+    python -m benchmarks.loadtest generate --packages 5000 --enquiries 20000 --output /tmp/travel-dataset
+    python -m benchmarks.loadtest run --dataset /tmp/travel-dataset --output before.json
+    python -m benchmarks.loadtest run --dataset /tmp/travel-dataset --driver gunicorn --concurrency 8 --output after.json
+    python -m benchmarks.loadtest compare before.json after.json
+    python -m benchmarks.loadtest routes
+
+generate writes a seeded dataset (records for either storage backend plus
+image files); the same arguments always produce the same records. run
+copies the dataset to a temporary directory, starts the app on the copy
+and sends every scenario in scenarios.py its share of --requests, first
+through Flask's test client (--driver client, no network) or through a
+local gunicorn or development server with --concurrency client processes.
+The JSON report has the commit, dataset and host next to the p50/p95/p99
+latency and throughput of each route, so reports taken on different
+commits on the same host can be compared: compare exits with status 1 when
+a route got slower or started failing. routes lists the app's routes that
+no scenario covers.
+"""
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from . import __doc__ as DESCRIPTION
+from .dataset import DEFAULTS, generate, load_manifest
+from .report import compare, comparable, print_comparison, print_header, print_row
+from .runner import git_revision, host, run_in_process, run_server, selected, timestamp
+from .scenarios import SCENARIOS, uncovered_routes
+from repository import BACKENDS
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument('--packages', type=int, default=DEFAULTS['packages'])
+    parser.add_argument('--high-selling', type=int, default=DEFAULTS['high_selling'])
+    parser.add_argument('--home-images', type=int, default=DEFAULTS['home_images'])
+    parser.add_argument('--enquiries', type=int, default=DEFAULTS['enquiries'])
+    parser.add_argument('--users', type=int, default=DEFAULTS['users'])
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULTS['backend'])
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'])
+
+
+def generate_from(args, output):
+    return generate(output, args.packages, args.high_selling, args.home_images, args.enquiries, args.users,
+                    args.backend, args.seed)
+
+
+def run(args):
+    scenarios = selected(args.only)
+    if not scenarios:
+        sys.exit(f'No scenario matches {", ".join(args.only)}')
+    generated = None
+    if args.dataset is None:
+        generated = Path(tempfile.mkdtemp(prefix='travel-dataset-'))
+        print(f'Generating a dataset in {generated}', file=sys.stderr)
+        generate_from(args, generated)
+    dataset = args.dataset or generated
+    manifest = load_manifest(dataset)
+    revision = git_revision()
+    print(f'{revision}: {args.driver}, {args.concurrency} client(s), {args.requests} requests per scenario, '
+          f'dataset {manifest["params"]}')
+    print_header()
+    try:
+        if args.driver == 'client':
+            results, uncovered = run_in_process(dataset, manifest, scenarios, args.requests, args.concurrency,
+                                                args.warmup, manifest['params']['seed'], print_row)
+        else:
+            results, uncovered = run_server(dataset, manifest, scenarios, args.requests, args.concurrency,
+                                            args.warmup, manifest['params']['seed'], print_row, args.driver,
+                                            args.gunicorn_args.split())
+    finally:
+        if generated is not None:
+            shutil.rmtree(generated, ignore_errors=True)
+
+    report = {
+        'revision': revision,
+        'created': timestamp(),
+        'host': host(),
+        'driver': args.driver,
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'dataset': manifest['params'],
+        'routes': results
+    }
+    if uncovered:
+        report['uncovered_routes'] = uncovered
+        print(f'Routes without a scenario: {", ".join(uncovered)}', file=sys.stderr)
+    output = args.output or Path(f'loadtest-{revision or "report"}-{args.driver}.json')
+    output.write_text(json.dumps(report, indent=2) + '\n')
+    print(f'Report written to {output}', file=sys.stderr)
+    failed = [name for name, summary in results.items() if summary['errors']]
+    if failed:
+        print(f'Requests failed in: {", ".join(failed)}', file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description=DESCRIPTION.split('\n', 1)[0],
+                                     epilog=DESCRIPTION.split('\n\n', 1)[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='write a synthetic dataset')
+    add_dataset_arguments(generate_parser)
+    generate_parser.add_argument('--output', type=Path, required=True, help='directory to create (must not exist)')
+
+    run_parser = commands.add_parser('run', help='load every route and write a JSON report')
+    add_dataset_arguments(run_parser)
+    run_parser.add_argument('--dataset', type=Path,
+                            help='directory from generate (default: a fresh one from the dataset arguments)')
+    run_parser.add_argument('--driver', choices=('client', 'gunicorn', 'dev'), default='client',
+                            help="Flask's test client in this process, or HTTP to a local gunicorn or dev server")
+    run_parser.add_argument('--concurrency', type=int, default=1, help='simultaneous clients')
+    run_parser.add_argument('--requests', type=int, default=200, help='timed requests per scenario')
+    run_parser.add_argument('--warmup', type=int, default=5, help='untimed requests per client before timing')
+    run_parser.add_argument('--only', action='append', metavar='TEXT',
+                            help='run the scenarios whose name contains TEXT (repeatable)')
+    run_parser.add_argument('--gunicorn-args', default='', help='extra gunicorn options, e.g. "-w 4 --threads 2"')
+    run_parser.add_argument('--output', type=Path, help='report file (default: loadtest-<revision>-<driver>.json)')
+
+    compare_parser = commands.add_parser('compare', help='compare two reports; exit status 1 on a regression')
+    compare_parser.add_argument('base', type=Path)
+    compare_parser.add_argument('new', type=Path)
+    compare_parser.add_argument('--threshold', type=float, default=0.25,
+                                help='relative latency growth counted as a regression (default 0.25)')
+    compare_parser.add_argument('--floor-ms', type=float, default=0.5,
+                                help='latency growth below this never counts (default 0.5)')
+
+    commands.add_parser('routes', help='list the scenarios and any route without one')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        if args.output.exists() and any(args.output.iterdir()):
+            parser.error(f'{args.output} is not empty')
+        manifest = generate_from(args, args.output)
+        print(f'Generated {manifest["params"]} in {args.output}', file=sys.stderr)
+        return 0
+    if args.command == 'run':
+        if args.concurrency < 1 or args.requests < 1:
+            parser.error('--concurrency and --requests must be at least 1')
+        return run(args)
+    if args.command == 'compare':
+        base, new = (json.loads(path.read_text()) for path in (args.base, args.new))
+        for difference in comparable(base, new):
+            print(f'Warning: reports differ in {difference}', file=sys.stderr)
+        rows, regressed = compare(base, new, args.threshold, args.floor_ms)
+        print(f'{base.get("revision")} -> {new.get("revision")}')
+        print_comparison(rows)
+        return 1 if regressed else 0
+
+    for scenario in SCENARIOS:
+        print(scenario.name)
+    work_dir = tempfile.mkdtemp(prefix='travel-loadtest-')
+    try:
+        os.environ.update(TRAVEL_DATA_DIR=work_dir, TRAVEL_UPLOAD_DIR=os.path.join(work_dir, 'uploads'))
+        from app import app
+        missing = uncovered_routes(app)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    for route in missing:
+        print(f'Route without a scenario: {route}', file=sys.stderr)
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
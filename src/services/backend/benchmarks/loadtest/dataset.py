@@ -0,0 +1,197 @@
+"""Seeded synthetic datasets for the load test.
+
+A dataset directory holds data/ (used as TRAVEL_DATA_DIR, with the image
+files in data/uploads) and manifest.json, which records the arguments it
+was generated with and ids the scenarios pick from. Records are written
+through Repository.import_dump(), so the layout is whatever the chosen
+backend stores: data.json, users.json and enquiries.jsonl for 'json',
+travel.db for 'sqlite'.
+"""
+import hashlib
+import json
+import random
+import struct
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+from repository import open_repository
+from package_fields import normalize_package_fields
+
+MANIFEST_FILE = 'manifest.json'
+# Every synthetic user logs in with this password
+USER_PASSWORD = 'loadtest-password'
+# How many ids of each collection the manifest keeps for the scenarios
+SAMPLE_SIZE = 1000
+# Records are dated from here on, so a seed always yields the same timestamps
+EPOCH = datetime(2025, 1, 1)
+DEFAULTS = {
+    'packages': 2000,
+    'high_selling': 50,
+    'home_images': 20,
+    'enquiries': 10000,
+    'users': 50,
+    'backend': 'json',
+    'seed': 1
+}
+
+DESTINATIONS = ['Bali', 'Goa', 'Kerala', 'Paris', 'Zürich', 'Kyoto', 'Cairo', 'Lisbon', 'Queenstown', 'Cusco',
+                'Santorini', 'Marrakech', 'Reykjavik', 'Hanoi', 'Cape Town', 'Havana', 'Ladakh', 'Maldives']
+THEMES = ['beach', 'trek', 'honeymoon', 'family', 'heritage', 'safari', 'cruise', 'wellness', 'food', 'adventure']
+INCLUDES = ['Hotel', 'Flights', 'Breakfast', 'Airport transfers', 'Guide', 'Visa', 'Dinner', 'Spa', 'Boat ride']
+PRICE_FORMATS = ['${}', '{}', 'INR {:,}', '₹{:,}', '€{}', 'From ${:,} pp']
+DURATION_FORMATS = ['{} days', '{}D/{}N', '{}', '{} Days {} Nights']
+FIRST_NAMES = ['Asha', 'Ben', 'Chen', 'Dana', 'Emeka', 'Farah', 'Goran', 'Hana', 'Ivan', 'Jaya', 'Kofi', 'Lena']
+LAST_NAMES = ['Nair', 'Smith', 'Li', 'Cohen', 'Okafor', 'Haddad', 'Petrov', 'Sato', 'Silva', 'Rao', 'Mensah']
+WORDS = ['sunrise', 'villa', 'private', 'guided', 'old town', 'lagoon', 'market', 'temple', 'sunset', 'local',
+         'boutique', 'mountain', 'river', 'island', 'cuisine', 'festival', 'garden', 'desert', 'coral', 'rail']
+
+
+def png(rng, width=64, height=48):
+    """A small gradient PNG whose colours come from rng."""
+    start = [rng.randrange(256) for _ in range(3)]
+    step = [rng.randrange(-4, 5) for _ in range(3)]
+    rows = b''.join(
+        b'\x00' + bytes((start[c] + step[c] * (x + y)) % 256 for x in range(width) for c in range(3))
+        for y in range(height)
+    )
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+def password_hash(rng, password):
+    """A werkzeug scrypt hash of password with a salt from rng, so the users file is reproducible too."""
+    salt = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789') for _ in range(16))
+    n, r, p = 32768, 8, 1
+    digest = hashlib.scrypt(password.encode('utf-8'), salt=salt.encode('utf-8'), n=n, r=r, p=p, maxmem=132 * n * r * p)
+    return f'scrypt:{n}:{r}:{p}${salt}${digest.hex()}'
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def record_id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def package_fields(rng):
+    """Submitted fields of a plausible tour package, as the admin panel sends them."""
+    destination = rng.choice(DESTINATIONS)
+    days = rng.randint(2, 15)
+    return {
+        'name': f'{destination} {rng.choice(THEMES)} {rng.choice(THEMES)}',
+        'price': rng.choice(PRICE_FORMATS).format(rng.randrange(200, 9000, 50)),
+        'description': f'{destination}: {sentence(rng)}',
+        'duration': rng.choice(DURATION_FORMATS).format(days, days - 1),
+        'includes': rng.sample(INCLUDES, rng.randint(1, 5))
+    }
+
+
+def enquiry_fields(rng, package_names):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    package_name = rng.choice(package_names) if package_names and rng.random() < 0.8 else ''
+    return {
+        'name': f'{first} {last}',
+        'email': f'{first}.{last}{rng.randrange(10000)}@example.com'.lower(),
+        'contact': f'+91{rng.randrange(10 ** 9, 10 ** 10)}',
+        'package': package_name,
+        'message': sentence(rng, rng.randint(4, 30))
+    }
+
+
+def generate(output, packages, high_selling, home_images, enquiries, users, backend, seed):
+    """Write a dataset to the directory output (which must be empty) and return its manifest."""
+    rng = random.Random(seed)
+    data_dir = output / 'data'
+    upload_dir = data_dir / 'uploads'
+    upload_dir.mkdir(parents=True)
+
+    images = []
+    for i in range(max(home_images, 1)):
+        content = png(rng)
+        filename = f'{uuid.UUID(int=rng.getrandbits(128), version=4).hex}.png'
+        (upload_dir / filename).write_bytes(content)
+        images.append({
+            'id': record_id(rng),
+            'url': f'/uploads/{filename}',
+            'filename': filename,
+            'sha256': None,
+            'size': len(content),
+            'uploaded_at': (EPOCH + timedelta(hours=i)).isoformat()
+        })
+
+    def package(i, full):
+        fields = package_fields(rng)
+        record = {
+            'id': record_id(rng),
+            'name': fields['name'],
+            'price': fields['price'],
+            'description': fields['description'],
+            'image': rng.choice(images)['url'] if rng.random() < 0.7 else None,
+            'created_at': (EPOCH + timedelta(minutes=i)).isoformat()
+        }
+        if full:
+            record.update(duration=fields['duration'], includes=fields['includes'])
+        return normalize_package_fields(record, 'USD')
+
+    all_packages = [package(i, True) for i in range(packages)]
+    high_selling_packages = [package(i, False) for i in range(high_selling)]
+    package_names = [record['name'] for record in all_packages]
+    spacing = timedelta(days=365) / max(enquiries, 1)
+    enquiry_records = [
+        dict(enquiry_fields(rng, package_names), id=record_id(rng), timestamp=(EPOCH + spacing * i).isoformat())
+        for i in range(enquiries)
+    ]
+    # One hash for everyone, since hashing is deliberately slow
+    shared_hash = password_hash(rng, USER_PASSWORD)
+    user_records = [{
+        'id': record_id(rng),
+        'username': f'user{i:05d}',
+        'email': f'user{i:05d}@example.com',
+        'password': shared_hash,
+        'role': 'admin' if i % 20 == 0 else 'user',
+        'created_at': (EPOCH + timedelta(hours=i)).isoformat()
+    } for i in range(users)]
+
+    repository = open_repository(backend, data_dir)
+    repository.import_dump({
+        'all_packages': all_packages,
+        'high_selling_packages': high_selling_packages,
+        'home_images': images[:home_images],
+        'users': user_records,
+        'about': {'content': '\n\n'.join(sentence(rng, 60) for _ in range(5)), 'video': ''},
+        'enquiries': enquiry_records
+    })
+    repository.close()
+
+    manifest = {
+        'params': {
+            'packages': packages,
+            'high_selling': high_selling,
+            'home_images': home_images,
+            'enquiries': enquiries,
+            'users': users,
+            'backend': backend,
+            'seed': seed
+        },
+        'samples': {
+            'all_packages': [record['id'] for record in all_packages[:SAMPLE_SIZE]],
+            'high_selling_packages': [record['id'] for record in high_selling_packages[:SAMPLE_SIZE]],
+            'package_names': package_names[:SAMPLE_SIZE],
+            'images': [image['filename'] for image in images],
+            'users': [{'id': user['id'], 'username': user['username']} for user in user_records[:SAMPLE_SIZE]]
+        }
+    }
+    (output / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(dataset):
+    return json.loads((dataset / MANIFEST_FILE).read_text())
@@ -0,0 +1,109 @@
+"""Ways to send the load test's requests: Flask's test client or HTTP to a local server."""
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+
+from . import BACKEND_DIR
+
+# Development server: app.run() on the port given as the first argument
+DEV_SERVER = [sys.executable, '-c', 'import sys; from app import app; app.run(port=int(sys.argv[1]), threaded=True)']
+
+
+class Response:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def encode(body):
+    """(bytes, content type) for a request body: None, a JSON document or a (content type, bytes) pair."""
+    if body is None:
+        return None, None
+    if isinstance(body, tuple):
+        content_type, data = body
+        return data, content_type
+    return json.dumps(body).encode('utf-8'), 'application/json'
+
+
+class TestClientDriver:
+    """Calls the app in this process; measures the application without a network or server."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        data, content_type = encode(body)
+        headers = dict(headers or {})
+        if content_type:
+            headers['Content-Type'] = content_type
+        response = self.client.open(path, method=method, data=data, headers=headers)
+        try:
+            return Response(response.status_code, response.get_data())
+        finally:
+            response.close()
+
+    def close(self):
+        pass
+
+
+class HttpDriver:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it."""
+
+    def __init__(self, port, host='127.0.0.1'):
+        self.host = host
+        self.port = port
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        data, content_type = encode(body)
+        headers = dict(headers or {})
+        if content_type:
+            headers['Content-Type'] = content_type
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.connection.request(method, path, body=data, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+        if response.will_close:
+            self.close()
+        return Response(response.status, payload)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def start_server(server, port, env, gunicorn_args=()):
+    """Start the development server or gunicorn (with gunicorn.conf.py) and wait until it answers."""
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+                   *gunicorn_args, 'wsgi:app']
+    else:
+        command = DEV_SERVER + [str(port)]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=dict(os.environ, **env),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/api/about')
+            connection.getresponse().read()
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{" ".join(command)} did not start')
@@ -0,0 +1,104 @@
+"""Latency summaries, the report table and comparison of two reports."""
+import math
+
+# Latencies are compared at these percentiles
+COMPARED = ('p50_ms', 'p95_ms')
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def summarize(merged, server_cpu=None):
+    """Report entry for one scenario from the merged results of its clients."""
+    latencies = sorted(merged['latencies'])
+    count = len(latencies)
+
+    def ms(value):
+        return None if value is None else round(value * 1e3, 3)
+
+    summary = {
+        'requests': count,
+        'errors': merged['errors'],
+        'rps': round(count / merged['seconds'], 1) if merged['seconds'] > 0 else None,
+        'mean_ms': ms(sum(latencies) / count) if count else None,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None)
+    }
+    if server_cpu is not None and count:
+        # CPU the server processes spent per request, setup requests included
+        summary['server_cpu_ms'] = ms(server_cpu / count)
+    if merged['error']:
+        summary['first_error'] = merged['error']
+    return summary
+
+
+def _cell(value, width=9):
+    return f'{"-" if value is None else value:>{width}}'
+
+
+def print_row(name, summary):
+    print(f'{name:<52} {_cell(summary["requests"], 6)} {_cell(summary["errors"], 6)} {_cell(summary["rps"])} '
+          f'{_cell(summary["p50_ms"])} {_cell(summary["p95_ms"])} {_cell(summary["p99_ms"])}', flush=True)
+
+
+def print_header():
+    print(f'{"scenario":<52} {"reqs":>6} {"errors":>6} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+
+
+def comparable(base, new):
+    """Settings that differ between two reports, which make their numbers incomparable."""
+    differences = []
+    for key in ('dataset', 'driver', 'concurrency', 'requests'):
+        if base.get(key) != new.get(key):
+            differences.append(f'{key}: {base.get(key)} -> {new.get(key)}')
+    if base.get('host', {}).get('cpus') != new.get('host', {}).get('cpus'):
+        differences.append('host cpus differ')
+    return differences
+
+
+def compare(base, new, threshold, floor_ms):
+    """Rows of (scenario, base entry, new entry, verdict) and whether any route regressed.
+
+    A route regressed when it has more errors than before, or a compared
+    percentile grew by more than threshold (a fraction) and by more than
+    floor_ms, which keeps sub-millisecond jitter from counting.
+    """
+    rows = []
+    regressed = False
+    for name, after in new['routes'].items():
+        before = base['routes'].get(name)
+        verdict = ''
+        if before is None:
+            verdict = 'new'
+        elif after['errors'] > before['errors']:
+            verdict = 'ERRORS'
+        else:
+            for key in COMPARED:
+                old, current = before.get(key), after.get(key)
+                if old is not None and current is not None and current - old > max(old * threshold, floor_ms):
+                    verdict = 'SLOWER'
+        regressed = regressed or verdict in ('ERRORS', 'SLOWER')
+        rows.append((name, before, after, verdict))
+    for name in base['routes'].keys() - new['routes'].keys():
+        rows.append((name, base['routes'][name], None, 'missing'))
+    return rows, regressed
+
+
+def print_comparison(rows):
+    def change(before, after, key):
+        if not before or not after or before.get(key) is None or after.get(key) is None:
+            return f'{"-":>24}'
+        old, new = before[key], after[key]
+        percent = f'{(new - old) / old * 100:+.0f}%' if old else ''
+        return f'{old:>8} -> {new:<8} {percent:>5}'
+
+    print(f'{"scenario":<52} {"p50 ms":>24} {"p95 ms":>24} {"req/s":>24}')
+    for name, before, after, verdict in rows:
+        print(f'{name:<52} {change(before, after, "p50_ms")} {change(before, after, "p95_ms")} '
+              f'{change(before, after, "rps")} {verdict}')
@@ -0,0 +1,205 @@
+"""Run scenarios with several concurrent clients and collect their latencies."""
+import http.client
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from . import BACKEND_DIR
+from .drivers import HttpDriver, TestClientDriver, start_server
+from .report import summarize
+from .scenarios import SCENARIOS, Session, session_rng, uncovered_routes
+
+# Settings for the app under test: nothing may throttle the login and enquiry
+# scenarios or reach out to a webhook from the caller's environment, and event
+# streams end straight after their first event instead of staying open
+APP_ENV = {
+    'LOGIN_IP_BURST': '1000000',
+    'LOGIN_IP_PER_MINUTE': '1000000',
+    'LOGIN_USER_BURST': '1000000',
+    'LOGIN_USER_PER_MINUTE': '1000000',
+    'ENQUIRY_IP_LIMIT': '1000000',
+    'ENQUIRY_SENDER_LIMIT': '1000000',
+    'HASH_MAX_PENDING': '1000',
+    'ENQUIRY_WEBHOOK_URL': '',
+    'METRICS_TOKEN': '',
+    'EVENTS_STREAM_SECONDS': '0',
+    'EVENTS_MAX_STREAMS': '1000'
+}
+ADMIN_LOGIN = {'username': 'admin', 'password': 'admin123'}
+
+
+def run_once(session, scenario):
+    """Seconds the scenario's measured request took; raises RuntimeError when it failed."""
+    steps = scenario.run(session)
+    step = next(steps)
+    path, body, headers = (step, None, None) if isinstance(step, str) else tuple(step) + (None,) * (3 - len(step))
+    headers = dict(session.headers(scenario.auth), **(headers or {}))
+    started = time.perf_counter()
+    response = session.driver.request(scenario.method, path, body, headers)
+    elapsed = time.perf_counter() - started
+    if response.status not in scenario.expect:
+        steps.close()
+        raise RuntimeError(f'{scenario.method} {path}: {response.status} {response.body[:200]!r}')
+    try:
+        steps.send(response)
+    except StopIteration:
+        pass
+    else:
+        raise RuntimeError(f'{scenario.name} made more than one measured request')
+    return elapsed
+
+
+def run_worker(driver, token, manifest, scenario, seed, worker, count, warmup):
+    """One client's share of a scenario: warmup untimed runs, then count timed ones."""
+    session = Session(driver, token, manifest, session_rng(seed, scenario.name, worker))
+    latencies = []
+    errors = 0
+    error = None
+    started = None
+    for i in range(warmup + count):
+        if i == warmup:
+            started = time.monotonic()
+        try:
+            elapsed = run_once(session, scenario)
+        except (RuntimeError, ValueError, KeyError, OSError, http.client.HTTPException) as e:
+            if i >= warmup:
+                errors += 1
+                error = error or f'{type(e).__name__}: {e}'
+            continue
+        if i >= warmup:
+            latencies.append(elapsed)
+    driver.close()
+    return {'latencies': latencies, 'errors': errors, 'error': error, 'started': started, 'finished': time.monotonic()}
+
+
+def shares(requests, concurrency):
+    """Timed requests per client; clients that would get none are left out."""
+    counts = [requests // concurrency + (1 if worker < requests % concurrency else 0) for worker in range(concurrency)]
+    return [count for count in counts if count]
+
+
+def merge(results):
+    merged = {'latencies': [], 'errors': 0, 'error': None}
+    for result in results:
+        merged['latencies'] += result['latencies']
+        merged['errors'] += result['errors']
+        merged['error'] = merged['error'] or result['error']
+    merged['seconds'] = max(r['finished'] for r in results) - min(r['started'] for r in results)
+    return merged
+
+
+def login(driver):
+    response = driver.request('POST', '/api/auth/login', ADMIN_LOGIN)
+    if response.status != 200:
+        raise RuntimeError(f'Admin login failed: {response.status} {response.body[:200]!r}')
+    return response.json()['token']
+
+
+def _http_worker(port, token, manifest, name, seed, worker, count, warmup, results):
+    scenario = next(s for s in SCENARIOS if s.name == name)
+    results.put(run_worker(HttpDriver(port), token, manifest, scenario, seed, worker, count, warmup))
+
+
+def selected(patterns):
+    if not patterns:
+        return list(SCENARIOS)
+    return [s for s in SCENARIOS if any(pattern in s.name for pattern in patterns)]
+
+
+def prepare(dataset, manifest):
+    """A throwaway copy of the dataset's data directory and the app settings that point at it."""
+    work_dir = tempfile.mkdtemp(prefix='travel-loadtest-')
+    data_dir = os.path.join(work_dir, 'data')
+    shutil.copytree(dataset / 'data', data_dir)
+    env = dict(APP_ENV,
+               TRAVEL_DATA_DIR=data_dir,
+               TRAVEL_UPLOAD_DIR=os.path.join(data_dir, 'uploads'),
+               TRAVEL_STORAGE=manifest['params']['backend'])
+    return work_dir, env
+
+
+def run_in_process(dataset, manifest, scenarios, requests, concurrency, warmup, seed, progress):
+    """Drive the app through its test client, one thread per client; returns (results, uncovered routes)."""
+    work_dir, env = prepare(dataset, manifest)
+    os.environ.update(env)
+    try:
+        from app import app, warm_caches
+        warm_caches()
+        token = login(TestClientDriver(app))
+        results = {}
+        for scenario in scenarios:
+            counts = shares(requests, concurrency)
+            outcomes = [None] * len(counts)
+
+            def client(worker, count):
+                outcomes[worker] = run_worker(TestClientDriver(app), token, manifest, scenario, seed, worker, count, warmup)
+
+            threads = [threading.Thread(target=client, args=(worker, count)) for worker, count in enumerate(counts)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results[scenario.name] = summarize(merge(outcomes))
+            progress(scenario.name, results[scenario.name])
+        return results, uncovered_routes(app)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_server(dataset, manifest, scenarios, requests, concurrency, warmup, seed, progress, server, gunicorn_args):
+    """Drive a local server with one process per client; returns (results, None)."""
+    from benchmarks.bench_wsgi_server import free_port, process_tree_cpu
+    work_dir, env = prepare(dataset, manifest)
+    port = free_port()
+    process = start_server(server, port, env, gunicorn_args)
+    try:
+        token = login(HttpDriver(port))
+        results = {}
+        for scenario in scenarios:
+            queue = multiprocessing.Queue()
+            clients = [
+                multiprocessing.Process(target=_http_worker, args=(
+                    port, token, manifest, scenario.name, seed, worker, count, warmup, queue))
+                for worker, count in enumerate(shares(requests, concurrency))
+            ]
+            cpu_before = process_tree_cpu(process.pid)
+            for client in clients:
+                client.start()
+            outcomes = [queue.get() for _ in clients]
+            cpu = process_tree_cpu(process.pid)
+            for client in clients:
+                client.join()
+            results[scenario.name] = summarize(merge(outcomes), None if cpu is None else cpu - cpu_before)
+            progress(scenario.name, results[scenario.name])
+        return results, None
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def host():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+def timestamp():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
@@ -0,0 +1,366 @@
+"""One or more scenarios per API route.
+
+A scenario is a generator function taking a Session. Whatever it does
+before its yield is setup and is not timed; it yields the measured request
+as a path, (path, body) or (path, body, headers) and receives the
+Response; what follows puts things back (deleting what it created) so
+repeated runs keep the dataset the same size. A body is a JSON document or
+a (content type, bytes) pair.
+"""
+import random
+import uuid
+
+from .dataset import USER_PASSWORD, enquiry_fields, package_fields, png, sentence
+
+SCENARIOS = []
+# Searches tried in turn by the search scenario
+SEARCHES = [
+    'q=bali',
+    'q=beach+honeymoon',
+    'q=kyo',
+    'q=heritage&max_price=5000',
+    'q=guide&min_duration=5&max_duration=10',
+    'sort=price&limit=10',
+    'q=safari&sort=-duration',
+    'q=nomatch'
+]
+
+
+class Scenario:
+    def __init__(self, name, method, rule, run, auth, expect):
+        self.name = name
+        self.method = method
+        self.rule = rule
+        self.run = run
+        self.auth = auth
+        self.expect = expect
+
+
+def scenario(method, rule, name=None, auth=True, expect=(200,)):
+    """Register the decorated generator as the scenario for method and rule (the app's route pattern)."""
+    def register(run):
+        SCENARIOS.append(Scenario(name or f'{method} {rule}', method, rule, run, auth, expect))
+        return run
+    return register
+
+
+def multipart(filename, content, content_type, field='file'):
+    """A multipart/form-data body holding one file."""
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n').encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return f'multipart/form-data; boundary={boundary}', body
+
+
+def package_csv(rng, rows):
+    lines = ['name,price,description,duration,includes']
+    for _ in range(rows):
+        fields = package_fields(rng)
+        lines.append(f'"{fields["name"]}","{fields["price"]}","{fields["description"]}",'
+                     f'"{fields["duration"]}","{", ".join(fields["includes"])}"')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class Session:
+    """What one simulated client knows: its driver, token, random stream and the dataset manifest."""
+
+    def __init__(self, driver, token, manifest, rng):
+        self.driver = driver
+        self.token = token
+        self.manifest = manifest
+        self.rng = rng
+
+    def headers(self, auth=True):
+        headers = {'Accept-Encoding': 'gzip'}
+        if auth:
+            headers['Authorization'] = f'Bearer {self.token}'
+        return headers
+
+    def call(self, method, path, body=None, expect=(200, 201)):
+        """An untimed setup or clean-up request; raises RuntimeError on an unexpected status."""
+        response = self.driver.request(method, path, body, self.headers())
+        if response.status not in expect:
+            raise RuntimeError(f'{method} {path}: {response.status} {response.body[:200]!r}')
+        return response
+
+    def pick(self, sample):
+        return self.rng.choice(self.manifest['samples'][sample])
+
+    def image(self):
+        return multipart(f'photo-{self.rng.randrange(10 ** 6)}.png', png(self.rng), 'image/png')
+
+    def create(self, path, fields, key='package'):
+        return self.call('POST', path, fields).json()[key]['id']
+
+
+# ===== Catalogue =====
+@scenario('GET', '/api/site', auth=False)
+def get_site(session):
+    yield '/api/site'
+
+
+@scenario('GET', '/api/packages', auth=False)
+def get_packages(session):
+    yield '/api/packages'
+
+
+@scenario('GET', '/api/packages/search', auth=False)
+def search_packages(session):
+    yield f'/api/packages/search?{session.rng.choice(SEARCHES)}'
+
+
+@scenario('GET', '/api/high-selling-packages', auth=False)
+def get_high_selling_packages(session):
+    yield '/api/high-selling-packages'
+
+
+@scenario('GET', '/api/home-images', auth=False)
+def get_home_images(session):
+    yield '/api/home-images'
+
+
+@scenario('GET', '/api/about', auth=False)
+def get_about(session):
+    yield '/api/about'
+
+
+@scenario('GET', '/uploads/<filename>', auth=False)
+def get_upload(session):
+    yield f'/uploads/{session.pick("images")}'
+
+
+# ===== Packages (both collections) =====
+def package_scenarios(prefix, sample):
+    @scenario('POST', prefix, expect=(201,))
+    def create(session):
+        response = yield prefix, package_fields(session.rng)
+        session.call('DELETE', f'{prefix}/{response.json()["package"]["id"]}')
+
+    @scenario('PUT', f'{prefix}/<package_id>')
+    def update(session):
+        yield f'{prefix}/{session.pick(sample)}', {'price': f'${session.rng.randrange(200, 9000, 50)}'}
+
+    @scenario('DELETE', f'{prefix}/<package_id>')
+    def delete(session):
+        package_id = session.create(prefix, package_fields(session.rng))
+        yield f'{prefix}/{package_id}'
+
+    @scenario('POST', f'{prefix}/batch')
+    def batch(session):
+        operations = [{'op': 'create', 'data': package_fields(session.rng)} for _ in range(10)]
+        operations.append({'op': 'update', 'id': session.pick(sample), 'data': {'description': sentence(session.rng)}})
+        response = yield f'{prefix}/batch', {'operations': operations}
+        created = [{'op': 'delete', 'id': result['id']} for result in response.json()['results'] if result['op'] == 'create']
+        session.call('POST', f'{prefix}/batch', {'operations': created})
+
+    @scenario('POST', f'{prefix}/import', expect=(201,))
+    def import_file(session):
+        response = yield f'{prefix}/import', multipart('packages.csv', package_csv(session.rng, 20), 'text/csv')
+        created = [{'op': 'delete', 'id': package['id']} for package in response.json()['packages']]
+        session.call('POST', f'{prefix}/batch', {'operations': created})
+
+    @scenario('POST', f'{prefix}/<package_id>/image')
+    def upload_image(session):
+        package_id = session.create(prefix, package_fields(session.rng))
+        yield f'{prefix}/{package_id}/image', session.image()
+        session.call('DELETE', f'{prefix}/{package_id}')
+
+
+package_scenarios('/api/packages', 'all_packages')
+package_scenarios('/api/high-selling-packages', 'high_selling_packages')
+
+
+# ===== Home images =====
+@scenario('POST', '/api/home-images', expect=(201,))
+def upload_home_image(session):
+    response = yield '/api/home-images', session.image()
+    session.call('DELETE', f'/api/home-images/{response.json()["image"]["id"]}')
+
+
+@scenario('DELETE', '/api/home-images/<image_id>')
+def delete_home_image(session):
+    image_id = session.call('POST', '/api/home-images', session.image()).json()['image']['id']
+    yield f'/api/home-images/{image_id}'
+
+
+@scenario('POST', '/api/home-images/batch')
+def batch_home_images(session):
+    ids = [session.call('POST', '/api/home-images', session.image()).json()['image']['id'] for _ in range(3)]
+    yield '/api/home-images/batch', {'operations': [{'op': 'delete', 'id': image_id} for image_id in ids]}
+
+
+# ===== About =====
+@scenario('PUT', '/api/about')
+def update_about(session):
+    yield '/api/about', {'content': '\n\n'.join(sentence(session.rng, 60) for _ in range(5)), 'video': ''}
+
+
+@scenario('POST', '/api/about/video')
+def upload_about_video(session):
+    video = bytes(session.rng.getrandbits(8) for _ in range(64 * 1024))
+    yield '/api/about/video', multipart('tour.mp4', video, 'video/mp4')
+
+
+# ===== Enquiries =====
+@scenario('POST', '/api/enquiries', auth=False, expect=(201,))
+def create_enquiry(session):
+    response = yield '/api/enquiries', enquiry_fields(session.rng, session.manifest['samples']['package_names'])
+    session.call('DELETE', f'/api/enquiries/{response.json()["enquiry"]["id"]}')
+
+
+@scenario('GET', '/api/enquiries')
+def get_enquiries(session):
+    yield '/api/enquiries'
+
+
+@scenario('GET', '/api/enquiries', name='GET /api/enquiries?limit=50')
+def get_enquiry_page(session):
+    yield '/api/enquiries?limit=50'
+
+
+@scenario('DELETE', '/api/enquiries/<enquiry_id>')
+def delete_enquiry(session):
+    fields = enquiry_fields(session.rng, session.manifest['samples']['package_names'])
+    enquiry_id = session.create('/api/enquiries', fields, 'enquiry')
+    yield f'/api/enquiries/{enquiry_id}'
+
+
+@scenario('POST', '/api/enquiries/batch')
+def batch_enquiries(session):
+    names = session.manifest['samples']['package_names']
+    ids = [session.create('/api/enquiries', enquiry_fields(session.rng, names), 'enquiry') for _ in range(5)]
+    yield '/api/enquiries/batch', {'operations': [{'op': 'delete', 'id': enquiry_id} for enquiry_id in ids]}
+
+
+@scenario('GET', '/api/enquiries/export')
+def export_enquiries(session):
+    yield '/api/enquiries/export'
+
+
+@scenario('GET', '/api/enquiries/export', name='GET /api/enquiries/export?format=csv')
+def export_enquiries_csv(session):
+    yield '/api/enquiries/export?format=csv'
+
+
+@scenario('GET', '/api/enquiries/export', name='GET /api/enquiries/export?format=ndjson, one month')
+def export_enquiries_month(session):
+    month = session.rng.randint(1, 12)
+    yield f'/api/enquiries/export?format=ndjson&since=2025-{month:02d}-01&until={2025 + month // 12}-{month % 12 + 1:02d}-01'
+
+
+# ===== Chunked uploads =====
+def start_upload(session, content):
+    fields = {'target': 'home-image', 'filename': 'photo.png', 'size': len(content)}
+    return session.call('POST', '/api/uploads', fields).json()['data']['id']
+
+
+def upload_chunk(content):
+    return ('application/octet-stream', content), {'Content-Range': f'bytes 0-{len(content) - 1}/{len(content)}'}
+
+
+@scenario('POST', '/api/uploads', expect=(201,))
+def create_upload(session):
+    response = yield '/api/uploads', {'target': 'home-image', 'filename': 'photo.png', 'size': 4096}
+    session.call('DELETE', f'/api/uploads/{response.json()["data"]["id"]}')
+
+
+@scenario('GET', '/api/uploads/<upload_id>')
+def get_upload_session(session):
+    upload_id = start_upload(session, b'x')
+    yield f'/api/uploads/{upload_id}'
+    session.call('DELETE', f'/api/uploads/{upload_id}')
+
+
+@scenario('PUT', '/api/uploads/<upload_id>')
+def put_upload_chunk(session):
+    content = png(session.rng)
+    upload_id = start_upload(session, content)
+    body, headers = upload_chunk(content)
+    yield f'/api/uploads/{upload_id}', body, headers
+    session.call('DELETE', f'/api/uploads/{upload_id}')
+
+
+@scenario('POST', '/api/uploads/<upload_id>/complete', expect=(201,))
+def complete_upload(session):
+    content = png(session.rng)
+    upload_id = start_upload(session, content)
+    body, headers = upload_chunk(content)
+    response = session.driver.request('PUT', f'/api/uploads/{upload_id}', body, dict(session.headers(), **headers))
+    if response.status != 200:
+        raise RuntimeError(f'PUT /api/uploads/{upload_id}: {response.status}')
+    response = yield f'/api/uploads/{upload_id}/complete'
+    session.call('DELETE', f'/api/home-images/{response.json()["image"]["id"]}')
+
+
+@scenario('DELETE', '/api/uploads/<upload_id>')
+def abort_upload(session):
+    yield f'/api/uploads/{start_upload(session, b"x")}'
+
+
+# ===== Users and auth =====
+@scenario('POST', '/api/auth/login', auth=False)
+def login(session):
+    yield '/api/auth/login', {'username': session.pick('users')['username'], 'password': USER_PASSWORD}
+
+
+@scenario('GET', '/api/users')
+def get_users(session):
+    yield '/api/users'
+
+
+def new_user(session):
+    name = f'load-{uuid.UUID(int=session.rng.getrandbits(128)).hex[:12]}'
+    return {'username': name, 'email': f'{name}@example.com', 'password': USER_PASSWORD}
+
+
+@scenario('POST', '/api/users', expect=(201,))
+def create_user(session):
+    response = yield '/api/users', new_user(session)
+    session.call('DELETE', f'/api/users/{response.json()["data"]["id"]}')
+
+
+@scenario('PUT', '/api/users/<user_id>')
+def update_user(session):
+    user = session.pick('users')
+    yield f'/api/users/{user["id"]}', {'email': f'{user["username"]}@example.com'}
+
+
+@scenario('DELETE', '/api/users/<user_id>')
+def delete_user(session):
+    user_id = session.create('/api/users', new_user(session), 'data')
+    yield f'/api/users/{user_id}'
+
+
+# ===== System =====
+@scenario('GET', '/api/events')
+def change_events(session):
+    # The runner sets EVENTS_STREAM_SECONDS to 0, so the stream ends after its first event
+    yield '/api/events'
+
+
+@scenario('GET', '/api/stats')
+def get_stats(session):
+    yield '/api/stats'
+
+
+@scenario('GET', '/metrics', auth=False)
+def get_metrics(session):
+    yield '/metrics'
+
+
+def uncovered_routes(app):
+    """'METHOD rule' for every route of app that no scenario requests (static files aside)."""
+    covered = {(s.method, s.rule) for s in SCENARIOS}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (method, rule.rule) not in covered:
+                missing.append(f'{method} {rule.rule}')
+    return missing
+
+
+def session_rng(seed, name, worker):
+    """The random stream of one client running one scenario; the same for every run with seed."""
+    return random.Random(f'{seed}/{name}/{worker}')
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from storage import FileLock, atomic_write_bytes, record_io
+
+
+class ChangeLog:
+    """Numbered record changes, shared by every process using the same file.
+
+    Each line of the JSONL file is {"id": n, "type": "...", "data": {...}}.
+    publish() appends under a cross-process lock and numbers events on from
+    the last id in the file, so ids are ordered across processes. Every
+    process tails the file into a backlog of the newest `backlog` events:
+    events published here wake waiting readers at once, those published by
+    another process are noticed within poll_interval seconds. The file is
+    trimmed back to the backlog once it holds twice that many lines.
+    """
+
+    def __init__(self, path, backlog=1000, poll_interval=1.0):
+        self.path = Path(path)
+        self.backlog = backlog
+        self.poll_interval = poll_interval
+        self.lock = FileLock(self.path)
+        self._changed = threading.Condition()
+        self._events = deque(maxlen=backlog)
+        self._last_id = 0
+        self._offset = 0
+        self._inode = None
+        self._lines = 0
+
+    def _catch_up(self):
+        """Read lines appended since the last call; the caller holds self._changed."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # Trimmed (here or in another process): read it again and keep the newer events
+            self._inode = st.st_ino
+            self._offset = 0
+            self._lines = 0
+        if st.st_size == self._offset:
+            return
+        started = time.perf_counter()
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        record_io(self.path.name, 'read', time.perf_counter() - started, len(chunk))
+        # Only consume complete lines; a partial tail is picked up next time.
+        end = chunk.rfind(b'\n') + 1
+        events = []
+        for line in chunk[:end].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            self._lines += 1
+            events.append(event)
+        if self._offset == 0 and events and events[-1]['id'] < self._last_id:
+            # The file was replaced by one with lower ids: its history is all that counts now
+            self._events.clear()
+            self._last_id = 0
+        self._offset += end
+        for event in events:
+            if event['id'] > self._last_id:
+                self._events.append(event)
+                self._last_id = event['id']
+        if events:
+            self._changed.notify_all()
+
+    def publish(self, event_type, data):
+        """Record one change; returns its event."""
+        return self.publish_many([(event_type, data)])[0]
+
+    def publish_many(self, changes):
+        """Record several (type, data) changes with a single append; returns their events."""
+        if not changes:
+            return []
+        with self.lock, self._changed:
+            self._catch_up()
+            events = [
+                {'id': self._last_id + i, 'type': event_type, 'data': data}
+                for i, (event_type, data) in enumerate(changes, 1)
+            ]
+            payload = b''.join(
+                json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n' for event in events
+            )
+            started = time.perf_counter()
+            # Not fsynced: a change lost in a crash only costs a reader a reload
+            with open(self.path, 'ab') as f:
+                f.write(payload)
+            record_io(self.path.name, 'write', time.perf_counter() - started, len(payload))
+            self._catch_up()
+            if self._lines >= 2 * self.backlog:
+                self._trim()
+        return events
+
+    def _trim(self):
+        payload = b''.join(
+            json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n' for event in self._events
+        )
+        atomic_write_bytes(self.path, payload, fsync=False)
+        st = os.stat(self.path)
+        self._inode = st.st_ino
+        self._offset = st.st_size
+        self._lines = len(self._events)
+
+    @property
+    def last_id(self):
+        with self._changed:
+            self._catch_up()
+            return self._last_id
+
+    def events_after(self, after, timeout=0):
+        """Events with ids above after, waiting up to timeout seconds for the first.
+
+        Returns [] when nothing happened in time and None when after is not
+        an id this log can resume from: older than the backlog, or newer
+        than any event (from a log since replaced).
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                self._catch_up()
+                if after > self._last_id:
+                    return None
+                if after < self._last_id:
+                    if after < self._events[0]['id'] - 1:
+                        return None
+                    return [event for event in self._events if event['id'] > after]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._changed.wait(min(remaining, self.poll_interval))
+
+
+class StreamSlots:
+    """Caps how many event streams this process serves at once.
+
+    A stream occupies a server thread for as long as it is open, so the
+    cap keeps some threads free for ordinary requests.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.open = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.open >= self.limit:
+                self.rejected += 1
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
@@ -0,0 +1,325 @@
+import base64
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from storage import FileLock, WriteBatcher, atomic_write_bytes, record_io
+
+
+class EnquiryLog:
+    """Append-only JSONL store for enquiries with an in-memory id index.
+
+    Each line is either {"op": "put", "enquiry": {...}} or
+    {"op": "del", "id": "..."}. Lines written by other processes are picked up
+    by reading forward from the last consumed offset, and the file is compacted
+    once tombstones outnumber live records. Appends from concurrent threads
+    are batched into one write and one fsync under a cross-process lock.
+
+    query() pages through enquiries using sorted (timestamp, id) keys, kept
+    overall and per package. The indexes are built on first use and then
+    maintained incrementally.
+    """
+
+    COMPACT_MIN_TOMBSTONES = 1000
+    # Catching up on more lines than this drops the indexes for a bulk rebuild
+    INDEX_REBUILD_THRESHOLD = 1000
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.version = 0
+        self._lock = threading.RLock()
+        self._items = {}
+        self._list = None
+        self._offset = 0
+        self._inode = None
+        self._tombstones = 0
+        self._time_index = None
+        self._package_index = None
+        self.lock = FileLock(self.path)
+        self._batcher = WriteBatcher(self._commit)
+
+    def _reset(self):
+        self._items = {}
+        self._list = None
+        self._offset = 0
+        self._tombstones = 0
+        self._drop_indexes()
+
+    def _drop_indexes(self):
+        self._time_index = None
+        self._package_index = None
+
+    def _build_indexes(self):
+        self._time_index = sorted(sort_key(e) for e in self._items.values())
+        self._package_index = {}
+        for key in self._time_index:
+            self._package_index.setdefault(package_key(self._items[key[1]]), []).append(key)
+
+    def _index_add(self, enquiry):
+        if self._time_index is None:
+            return
+        key = sort_key(enquiry)
+        bisect.insort(self._time_index, key)
+        bisect.insort(self._package_index.setdefault(package_key(enquiry), []), key)
+
+    def _index_remove(self, enquiry):
+        if self._time_index is None:
+            return
+        key = sort_key(enquiry)
+        for keys in (self._time_index, self._package_index.get(package_key(enquiry), [])):
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                keys.pop(i)
+
+    def _apply(self, record):
+        op = record.get('op')
+        if op == 'put':
+            enquiry = record.get('enquiry') or {}
+            if enquiry.get('id'):
+                previous = self._items.get(enquiry['id'])
+                if previous is not None:
+                    self._index_remove(previous)
+                self._items[enquiry['id']] = enquiry
+                self._index_add(enquiry)
+        elif op == 'del':
+            previous = self._items.pop(record.get('id'), None)
+            if previous is not None:
+                self._index_remove(previous)
+                self._tombstones += 1
+
+    def _catch_up(self):
+        """Apply any lines appended since the last read."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._offset or self._items:
+                self._reset()
+                self.version += 1
+            self._inode = None
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # Replaced by a compaction (here or in another process): start over.
+            self._reset()
+            self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return
+        started = time.perf_counter()
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        record_io(self.path.name, 'read', time.perf_counter() - started, len(chunk))
+        # Only consume complete lines; a partial tail is picked up next time.
+        end = chunk.rfind(b'\n') + 1
+        lines = chunk[:end].splitlines()
+        if len(lines) > self.INDEX_REBUILD_THRESHOLD:
+            self._drop_indexes()
+        for line in lines:
+            if line.strip():
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    continue
+        self._offset += end
+        self._list = None
+        self.version += 1
+
+    def _commit(self, batch):
+        data = b''.join(
+            json.dumps(r, separators=(',', ':')).encode('utf-8') + b'\n'
+            for item in batch for r in item.payload
+        )
+        with self.lock:
+            started = time.perf_counter()
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            record_io(self.path.name, 'write', time.perf_counter() - started, len(data))
+
+    def _append(self, records):
+        self._batcher.submit(records)
+        with self._lock:
+            self._catch_up()
+
+    def stamp(self):
+        """Identify the current log contents as 'inode:bytes-consumed'."""
+        with self._lock:
+            self._catch_up()
+            return f'{self._inode}:{self._offset}'
+
+    def refresh(self):
+        with self._lock:
+            self._catch_up()
+
+    def all(self):
+        """Return enquiries in insertion order (shared list, treat as read-only)."""
+        with self._lock:
+            self._catch_up()
+            if self._list is None:
+                self._list = list(self._items.values())
+            return self._list
+
+    def get(self, enquiry_id):
+        with self._lock:
+            self._catch_up()
+            return self._items.get(enquiry_id)
+
+    def query(self, since=None, until=None, package=None, descending=True, limit=50, cursor=None):
+        """Return (page, next_cursor, total) for enquiries in [since, until).
+
+        since/until are ISO timestamps compared against each enquiry's
+        timestamp; cursor is the opaque value returned as next_cursor by the
+        previous page.
+        """
+        with self._lock:
+            self._catch_up()
+            if self._time_index is None:
+                self._build_indexes()
+            keys = self._time_index if package is None else self._package_index.get(package.strip().lower(), [])
+            lo = bisect.bisect_left(keys, (since,)) if since else 0
+            hi = bisect.bisect_left(keys, (until,)) if until else len(keys)
+            total = max(hi - lo, 0)
+            if cursor is not None:
+                after = decode_cursor(cursor)
+                if descending:
+                    hi = min(hi, bisect.bisect_left(keys, after))
+                else:
+                    lo = max(lo, bisect.bisect_right(keys, after))
+            if descending:
+                page_keys = keys[max(lo, hi - limit):hi][::-1]
+                more = hi - limit > lo
+            else:
+                page_keys = keys[lo:min(hi, lo + limit)]
+                more = lo + limit < hi
+            page = [self._items[key[1]] for key in page_keys]
+            next_cursor = encode_cursor(page_keys[-1]) if more and page_keys else None
+            return page, next_cursor, total
+
+    def scan(self, since=None, until=None, package=None, batch_size=1000):
+        """Yield the enquiries in [since, until), oldest first.
+
+        The lock is held for one batch at a time and each batch resumes
+        after the last key of the previous one, so a slow consumer never
+        blocks writers; enquiries added behind the scan position meanwhile
+        are not yielded.
+        """
+        after = None
+        while True:
+            with self._lock:
+                self._catch_up()
+                if self._time_index is None:
+                    self._build_indexes()
+                keys = self._time_index if package is None else self._package_index.get(package.strip().lower(), [])
+                lo = bisect.bisect_left(keys, (since,)) if since else 0
+                if after is not None:
+                    lo = max(lo, bisect.bisect_right(keys, after))
+                hi = bisect.bisect_left(keys, (until,)) if until else len(keys)
+                batch_keys = keys[lo:min(hi, lo + batch_size)]
+                batch = [self._items[key[1]] for key in batch_keys]
+            yield from batch
+            if len(batch_keys) < batch_size:
+                return
+            after = batch_keys[-1]
+
+    def __len__(self):
+        with self._lock:
+            self._catch_up()
+            return len(self._items)
+
+    def add(self, enquiry):
+        """Append one enquiry to the log."""
+        self._append([{'op': 'put', 'enquiry': enquiry}])
+        return enquiry
+
+    def add_many(self, enquiries):
+        """Append several enquiries with a single write, skipping ids already stored."""
+        with self._lock:
+            self._catch_up()
+            new = [e for e in enquiries if e.get('id') and e['id'] not in self._items]
+        if new:
+            self._append([{'op': 'put', 'enquiry': e} for e in new])
+        return len(new)
+
+    def delete(self, enquiry_id):
+        """Tombstone an enquiry. Returns False when the id is unknown."""
+        with self._lock:
+            self._catch_up()
+            if enquiry_id not in self._items:
+                return False
+        self._append([{'op': 'del', 'id': enquiry_id}])
+        if self._tombstones >= self.COMPACT_MIN_TOMBSTONES and self._tombstones > len(self._items):
+            self.compact()
+        return True
+
+    def delete_many(self, enquiry_ids):
+        """Tombstone several enquiries with a single write. Returns how many existed."""
+        with self._lock:
+            self._catch_up()
+            known = [i for i in dict.fromkeys(enquiry_ids) if i in self._items]
+        if known:
+            self._append([{'op': 'del', 'id': i} for i in known])
+            if self._tombstones >= self.COMPACT_MIN_TOMBSTONES and self._tombstones > len(self._items):
+                self.compact()
+        return len(known)
+
+    def _rewrite(self, enquiries):
+        started = time.perf_counter()
+        data = b''.join(
+            json.dumps({'op': 'put', 'enquiry': enquiry}, separators=(',', ':')).encode('utf-8') + b'\n'
+            for enquiry in enquiries
+        )
+        atomic_write_bytes(self.path, data)
+        record_io(self.path.name, 'write', time.perf_counter() - started, len(data))
+
+    def compact(self):
+        """Rewrite the log with live records only."""
+        with self._lock, self.lock:
+            self._catch_up()
+            self._rewrite(self._items.values())
+            st = os.stat(self.path)
+            self._inode = st.st_ino
+            self._offset = st.st_size
+            self._tombstones = 0
+            self._list = None
+            self.version += 1
+
+    def replace_all(self, enquiries):
+        """Rewrite the log so that it holds exactly enquiries."""
+        with self._lock, self.lock:
+            self._rewrite(enquiries)
+            self._reset()
+            self._inode = os.stat(self.path).st_ino
+            self._catch_up()
+
+
+def migrate_enquiries_from_data(data_store, enquiry_log):
+    """Move any enquiries still embedded in data.json into the enquiry log."""
+    if 'enquiries' not in data_store.get(fresh=True):
+        return 0
+    document = data_store.load()
+    moved = enquiry_log.add_many(document.pop('enquiries') or [])
+    data_store.save(document)
+    return moved
+
+
+def sort_key(enquiry):
+    return (enquiry.get('timestamp') or '', enquiry.get('id') or '')
+
+
+def package_key(enquiry):
+    return (enquiry.get('package') or '').strip().lower()
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Turn a cursor back into a sort key; raises ValueError for malformed input."""
+    try:
+        timestamp, enquiry_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    return (str(timestamp), str(enquiry_id))
@@ -0,0 +1,76 @@
+"""Gunicorn settings for serving the API in production.
+
+Run from src/services/backend:
+
+    gunicorn wsgi:app
+
+Workers are separate processes sharing the data directory (or SQLite
+database). Every write takes a cross-process lock and re-reads the stored
+data first, spooled jobs are claimed by rename, and cached reads are
+re-validated against the store at most STORE_CHECK_INTERVAL seconds apart,
+so a change made through one worker reaches the others within that time.
+Login throttling is shared by all workers through LOGIN_THROTTLE_FILE; the
+public enquiry limits are counted per worker.
+
+Signals to the master process:
+  HUP   re-read this file, re-warm the caches from the current data and
+        replace the workers gracefully; in-flight requests finish first
+  TERM  graceful shutdown (waits up to graceful_timeout)
+  USR2  start a new master from the code on disk (then TERM the old one);
+        needed for code changes, since HUP reuses the preloaded app
+
+Throughput measured with benchmarks/bench_wsgi_server.py is listed in
+COMPLETE_REFERENCE.md.
+"""
+import os
+
+# Address to listen on
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+# Worker processes; each keeps its own copy of the catalogue and search index.
+# Serving cached catalogue data is CPU work under the GIL, so workers beyond
+# one per core mostly add context switches (see COMPLETE_REFERENCE.md)
+workers = int(os.environ.get('WEB_CONCURRENCY', (os.cpu_count() or 1) + 1))
+# Threads per worker. Requests mostly wait on disk, uploads, the password
+# hashing pool or slow clients rather than on the interpreter
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+# Seconds an idle keep-alive connection is held open. gthread parks idle
+# connections without tying up a thread; keep this above the idle timeout of
+# any proxy or load balancer in front (60s for nginx and AWS ALB) so they
+# never reuse a connection the worker has just closed
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '75'))
+# Most connections, idle ones included, a worker keeps open at once
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+# Seconds a worker may go silent before it is restarted; large uploads stream
+# in chunks, so this bounds a stuck request, not a slow one
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# Recycle workers now and then to bound memory growth; the jitter keeps them
+# from restarting at the same moment
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '20000'))
+max_requests_jitter = max_requests // 10
+# Import and warm the app once in the master; workers share its memory copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+# Worker heartbeat files; tmpfs avoids stalls when /tmp is on a slow disk
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def on_reload(server):
+    """Re-warm the preloaded app before replacement workers are forked from it"""
+    if server.cfg.preload_app:
+        from app import warm_caches
+        server.log.info('Caches re-warmed in %.2fs', warm_caches())
+
+
+def post_fork(server, worker):
+    """Start the worker's job threads, which also picks up jobs spooled before a restart"""
+    from app import job_queue
+    job_queue.start()
+
+
+def worker_exit(server, worker):
+    """Write the worker's last metrics so the totals in /metrics keep them"""
+    from metrics import registry
+    registry.flush()
@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except Exception:
+    Image = None
+
+# Responsive widths generated for every uploaded image (never upscaled)
+DERIVATIVE_WIDTHS = (320, 640, 1280, 1920)
+# Preferred first when negotiating with the client's Accept header
+DERIVATIVE_FORMATS = ('avif', 'webp')
+SAVE_OPTIONS = {
+    'avif': {'quality': 60},
+    'webp': {'quality': 80, 'method': 4}
+}
+
+
+def supported_formats():
+    """Derivative formats this Pillow build can encode."""
+    if Image is None:
+        return ()
+    formats = []
+    for fmt in DERIVATIVE_FORMATS:
+        try:
+            if features.check(fmt):
+                formats.append(fmt)
+        except ValueError:
+            continue
+    return tuple(formats)
+
+
+def generate_derivatives(source_path, output_dir, stem, widths=DERIVATIVE_WIDTHS, formats=None):
+    """Write resized copies of source_path in each format.
+
+    Returns a list of {'filename', 'width', 'format'} dicts, or [] when the
+    source is not an image Pillow can read. Runs in a worker process.
+    """
+    formats = supported_formats() if formats is None else formats
+    if Image is None or not formats:
+        return []
+    try:
+        image = Image.open(source_path)
+    except (UnidentifiedImageError, OSError):
+        return []
+
+    variants = []
+    with image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        sizes = sorted({w for w in widths if w < image.width} | {image.width})
+        for width in sizes:
+            if width == image.width:
+                resized = image
+            else:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            for fmt in formats:
+                filename = f'{stem}-{width}w.{fmt}'
+                tmp_path = os.path.join(output_dir, f'.{filename}.{os.getpid()}.tmp')
+                resized.save(tmp_path, format=fmt.upper(), **SAVE_OPTIONS.get(fmt, {}))
+                os.replace(tmp_path, os.path.join(output_dir, filename))
+                variants.append({'filename': filename, 'width': width, 'format': fmt})
+    return variants
+
+
+class DerivativePool:
+    """Process pool for derivative generation, created lazily once per process.
+
+    Uses the spawn start method so workers never inherit the server's
+    threads or locks. Spawned workers also import the parent's __main__
+    script, so the pool is only safe when that script does nothing on
+    import (gunicorn's does; `python app.py` would open the stores again in
+    every worker). With workers=0, the default, derivatives are generated in
+    the calling thread instead.
+    """
+
+    def __init__(self, workers=0):
+        self.workers = workers
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def generate(self, source_path, output_dir, stem):
+        """Generate derivatives in a worker process (or this thread) and wait for the result."""
+        if Image is None:
+            return []
+        if not self.workers:
+            return generate_derivatives(str(source_path), str(output_dir), stem)
+        return self._executor().submit(generate_derivatives, str(source_path), str(output_dir), stem).result()
+
+
+def pick_variant(variants, accept_mimetypes, width=None):
+    """Best variant for a request: a format named in Accept, then the smallest width >= width.
+
+    Returns None when the client accepts none of the variant formats, so the
+    original file is served.
+    """
+    if not variants:
+        return None
+    accepted = {value for value, quality in accept_mimetypes if quality > 0}
+    for fmt in DERIVATIVE_FORMATS:
+        if f'image/{fmt}' not in accepted:
+            continue
+        candidates = sorted((v for v in variants if v['format'] == fmt), key=lambda v: v['width'])
+        if not candidates:
+            continue
+        if width:
+            return next((v for v in candidates if v['width'] >= width), candidates[-1])
+        return candidates[-1]
+    return None
@@ -0,0 +1,189 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+from storage import atomic_write_bytes
+from processes import pid_alive
+
+
+class JobQueue:
+    """In-process worker pool for post-commit side effects.
+
+    Every job is spooled to disk before enqueue() returns, so jobs that were
+    pending when the process stopped are picked up again on the next start.
+    A job is claimed by renaming its spool file, which keeps several server
+    processes sharing one spool directory from running the same job twice.
+    Failed jobs are retried with exponential backoff and moved to failed/
+    after max_attempts.
+    """
+
+    def __init__(self, spool_dir, workers=2, max_attempts=5, retry_delay=2.0):
+        self.spool_dir = Path(spool_dir)
+        self.failed_dir = self.spool_dir / 'failed'
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._handlers = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_keys = set()
+        self._running = 0
+        self._stats = {}
+        self._pid = None
+
+    def handler(self, name):
+        """Register the decorated function as the handler for jobs called name."""
+        def register(func):
+            self._handlers[name] = func
+            return func
+        return register
+
+    def enqueue(self, name, payload=None, key=None):
+        """Spool a job and hand it to the workers.
+
+        Jobs sharing a key are coalesced while one of them is still waiting.
+        """
+        self.start()
+        with self._lock:
+            if key is not None and key in self._pending_keys:
+                return None
+            if key is not None:
+                self._pending_keys.add(key)
+        job = {
+            'id': uuid.uuid4().hex,
+            'name': name,
+            'payload': payload or {},
+            'key': key,
+            'attempts': 0,
+            'enqueued_at': time.time()
+        }
+        self._spool(job)
+        self._queue.put(job)
+        return job['id']
+
+    def start(self):
+        """Start the workers once per process (also after a fork) and recover spooled jobs."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._pending_keys = set()
+            self._running = 0
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            self.failed_dir.mkdir(parents=True, exist_ok=True)
+            for _ in range(self.workers):
+                threading.Thread(target=self._work, name='job-worker', daemon=True).start()
+        self._recover()
+
+    def _job_path(self, job):
+        return self.spool_dir / f"{job['id']}.json"
+
+    def _spool(self, job):
+        atomic_write_bytes(self._job_path(job), json.dumps(job).encode('utf-8'), fsync=False)
+
+    def _recover(self):
+        for path in self.spool_dir.glob('*.running-*'):
+            # Claimed by a process that is no longer alive: hand it back, before the
+            # scan below so it is queued now rather than at the next start
+            pid = path.name.rsplit('-', 1)[-1]
+            if pid.isdigit() and not pid_alive(int(pid)):
+                try:
+                    os.replace(path, self.spool_dir / path.name.split('.running-')[0])
+                except OSError:
+                    continue
+        for path in sorted(self.spool_dir.glob('*.json')):
+            try:
+                job = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            if job.get('key') is not None:
+                with self._lock:
+                    if job['key'] in self._pending_keys:
+                        path.unlink(missing_ok=True)
+                        continue
+                    self._pending_keys.add(job['key'])
+            self._queue.put(job)
+
+    def _claim(self, job):
+        running_path = self.spool_dir / f"{job['id']}.json.running-{os.getpid()}"
+        try:
+            os.replace(self._job_path(job), running_path)
+        except FileNotFoundError:
+            return None
+        return running_path
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.get('key') is not None:
+                    self._pending_keys.discard(job['key'])
+            running_path = self._claim(job)
+            if running_path is None:
+                continue
+            with self._lock:
+                self._running += 1
+            started = time.perf_counter()
+            error = None
+            try:
+                func = self._handlers.get(job['name'])
+                if func is None:
+                    raise LookupError(f"No handler registered for job {job['name']}")
+                func(**job['payload'])
+            except Exception as e:
+                error = e
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+            self._record(job['name'], elapsed, error)
+            if error is None:
+                running_path.unlink(missing_ok=True)
+            else:
+                self._retry(job, running_path, error)
+
+    def _retry(self, job, running_path, error):
+        job['attempts'] += 1
+        job['last_error'] = str(error)
+        if job['attempts'] >= self.max_attempts:
+            atomic_write_bytes(self.failed_dir / f"{job['id']}.json", json.dumps(job).encode('utf-8'), fsync=False)
+            running_path.unlink(missing_ok=True)
+            return
+        self._spool(job)
+        running_path.unlink(missing_ok=True)
+        delay = self.retry_delay * (2 ** (job['attempts'] - 1))
+        timer = threading.Timer(delay, self._queue.put, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _record(self, name, elapsed, error):
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                'count': 0, 'failures': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'last_seconds': 0.0
+            })
+            stats['count'] += 1
+            stats['total_seconds'] += elapsed
+            stats['last_seconds'] = elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            if error is not None:
+                stats['failures'] += 1
+
+    def stats(self):
+        """Queue depth plus per-job-type counts and latency."""
+        with self._lock:
+            jobs = {
+                name: dict(s, avg_seconds=s['total_seconds'] / s['count'] if s['count'] else 0.0)
+                for name, s in self._stats.items()
+            }
+            running = self._running
+        return {
+            'depth': self._queue.qsize(),
+            'running': running,
+            'failed': sum(1 for _ in self.failed_dir.glob('*.json')) if self.failed_dir.exists() else 0,
+            'jobs': jobs
+        }
@@ -0,0 +1,263 @@
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from processes import pid_alive
+try:
+    import fcntl
+except Exception:
+    fcntl = None
+
+# Upper bounds in seconds; suit request latencies
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE_FILE = 'archive.json'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """A monotonically increasing total per combination of label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _empty(self):
+        return 0
+
+    def _merge(self, total, value):
+        return total + value
+
+    def _lines(self, values):
+        for labels, value in values.items():
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    """Observation counts per bucket plus their sum, per combination of label values.
+
+    Values are kept as [count per bucket..., count above the last bucket, sum].
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = self._empty()
+            counts[i] += 1
+            counts[-1] += value
+
+    def _empty(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def _merge(self, total, value):
+        if len(value) != len(total):
+            # Written with other buckets by an older version; cannot be combined
+            return total
+        return [a + b for a, b in zip(total, value)]
+
+    def _lines(self, values):
+        for labels, counts in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_number(bound)}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(counts[-1])}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class MetricsRegistry:
+    """Named counters and histograms rendered in the Prometheus text format.
+
+    Values live in memory per process, so recording one costs a dict update
+    under a lock. After share(directory), a background thread writes this
+    process's values to its own file there every flush_interval seconds and
+    render() adds up the files of every process, so whichever server worker
+    answers a scrape reports the totals for all of them. Files left by
+    processes that have exited are folded into one archive file, keeping the
+    totals monotonic across worker restarts. A forked child starts from
+    zero; its parent's values stay with the parent.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self.directory = None
+        self.flush_interval = 10.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._filename = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forked)
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def share(self, directory, flush_interval=10.0):
+        """Combine the values of every process that shares directory."""
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _forked(self):
+        for metric in self._metrics.values():
+            metric._lock = threading.Lock()
+            metric._values = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start this process's flush thread once (also after a fork); cheap to call per request."""
+        if self._pid == os.getpid() or self.directory is None:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # Unique per process, so a recycled pid never overwrites a dead process's file
+            self._filename = f'{self._pid}-{uuid.uuid4().hex[:8]}.json'
+        threading.Thread(target=self._flush_forever, name='metrics-flush', daemon=True).start()
+
+    def _flush_forever(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _snapshot(self):
+        snapshot = {}
+        for name, metric in self._metrics.items():
+            with metric._lock:
+                values = {labels: list(v) if isinstance(v, list) else v for labels, v in metric._values.items()}
+            snapshot[name] = values
+        return snapshot
+
+    def _encode(self, values_by_name):
+        return json.dumps({
+            name: [[list(labels), value] for labels, value in values.items()]
+            for name, values in values_by_name.items()
+        }).encode('utf-8')
+
+    def _write(self, filename, payload):
+        tmp_path = self.directory / f'.{filename}.tmp'
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, self.directory / filename)
+
+    def flush(self):
+        """Write this process's values to its file in the shared directory."""
+        if self.directory is None or self._filename is None:
+            return
+        with self._flush_lock:
+            self._write(self._filename, self._encode(self._snapshot()))
+
+    def _add(self, totals, document):
+        for name, entries in document.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            values = totals.setdefault(name, {})
+            for labels, value in entries:
+                labels = tuple(labels)
+                values[labels] = metric._merge(values.get(labels, metric._empty()), value)
+
+    def _read(self, path):
+        try:
+            return json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            return {}
+
+    def _fold_exited(self):
+        """Merge the files of processes that have exited into the archive file."""
+        exited = [path for path in self.directory.glob('*-*.json') if not pid_alive(int(path.name.split('-', 1)[0]))]
+        if not exited:
+            return
+        archive = {}
+        self._add(archive, self._read(self.directory / ARCHIVE_FILE))
+        for path in exited:
+            self._add(archive, self._read(path))
+        self._write(ARCHIVE_FILE, self._encode(archive))
+        for path in exited:
+            path.unlink(missing_ok=True)
+
+    def collect(self):
+        """Totals per metric name and label values, over every process sharing the directory."""
+        if self.directory is None:
+            return self._snapshot()
+        self.start()
+        self.flush()
+        # Held while folding, so no reader counts a file and the archive it went into
+        lock_fd = os.open(self.directory / '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            self._fold_exited()
+            totals = {}
+            for path in self.directory.glob('*.json'):
+                self._add(totals, self._read(path))
+        finally:
+            os.close(lock_fd)
+        return totals
+
+    def render(self):
+        """Everything collected, in the Prometheus text exposition format (version 0.0.4)."""
+        totals = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric._lines(totals.get(name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every module of the backend
+registry = MetricsRegistry()
@@ -0,0 +1,113 @@
+import re
+from repository import BatchError
+
+# Currency symbols and words seen in free-form prices, by ISO 4217 code
+CURRENCY_SYMBOLS = {
+    '$': 'USD',
+    '€': 'EUR',
+    '£': 'GBP',
+    '¥': 'JPY',
+    '₹': 'INR',
+    'rs': 'INR',
+    'inr': 'INR',
+    'usd': 'USD',
+    'eur': 'EUR',
+    'gbp': 'GBP',
+    'aud': 'AUD',
+    'cad': 'CAD',
+    'jpy': 'JPY',
+    'aed': 'AED',
+    'sgd': 'SGD'
+}
+
+_AMOUNT = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_CURRENCY = re.compile(r'[$€£¥₹]|\b(?:' + '|'.join(k for k in CURRENCY_SYMBOLS if k.isalpha()) + r')\b', re.IGNORECASE)
+_DAYS = re.compile(r'(\d+)\s*(?:d\b|days?\b)', re.IGNORECASE)
+_NIGHTS = re.compile(r'(\d+)\s*(?:n\b|nights?\b)', re.IGNORECASE)
+_WEEKS = re.compile(r'(\d+)\s*(?:w\b|weeks?\b)', re.IGNORECASE)
+_NUMBER = re.compile(r'\d+')
+
+
+def parse_price(value):
+    """(amount, currency) from a price like '$2000', '6777' or 'INR 45,000'.
+
+    amount is a float, or None when no number is present; currency is an
+    ISO code, or None when the text does not name one.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value), None
+    if not isinstance(value, str):
+        return None, None
+    amount = _AMOUNT.search(value)
+    currency = _CURRENCY.search(value)
+    return (
+        float(amount.group().replace(',', '')) if amount else None,
+        CURRENCY_SYMBOLS[currency.group().lower()] if currency else None
+    )
+
+
+def parse_duration(value):
+    """Length in days from a duration like '5 days', '4N/5D', '2 weeks' or '7'; None when unknown."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if not isinstance(value, str):
+        return None
+    days = _DAYS.search(value)
+    if days:
+        return int(days.group(1))
+    nights = _NIGHTS.search(value)
+    if nights:
+        return int(nights.group(1)) + 1
+    weeks = _WEEKS.search(value)
+    if weeks:
+        return int(weeks.group(1)) * 7
+    number = _NUMBER.search(value)
+    return int(number.group()) if number else None
+
+
+def derived_fields(package, default_currency=None):
+    """Numeric price, its currency and the duration in days for a package record.
+
+    A price that does not name its currency is taken to be in
+    default_currency. Whole amounts are stored as integers.
+    """
+    amount, currency = parse_price(package.get('price'))
+    if amount is not None and amount.is_integer():
+        amount = int(amount)
+    return {
+        'price_amount': amount,
+        'price_currency': (currency or default_currency) if amount is not None else None,
+        'duration_days': parse_duration(package.get('duration'))
+    }
+
+
+def normalize_package_fields(package, default_currency=None):
+    """Store the derived numeric fields alongside the raw price and duration strings."""
+    package.update(derived_fields(package, default_currency))
+    return package
+
+
+def is_normalized(package, default_currency=None):
+    return all(field in package and package[field] == value
+               for field, value in derived_fields(package, default_currency).items())
+
+
+def backfill_package_fields(collection, default_currency=None):
+    """Add or correct the derived fields of every record in collection, in one write.
+
+    Returns how many records changed.
+    """
+    for _ in range(3):
+        stale = [record['id'] for record in collection.all() if not is_normalized(record, default_currency)]
+        if not stale:
+            return 0
+        try:
+            collection.apply([
+                ('update', record_id, lambda package: normalize_package_fields(package, default_currency))
+                for record_id in stale
+            ])
+            return len(stale)
+        except BatchError:
+            # A record was deleted meanwhile; look again
+            continue
+    return 0
@@ -0,0 +1,80 @@
+import csv
+import io
+try:
+    from openpyxl import load_workbook
+except Exception:
+    load_workbook = None
+
+# Columns read from an import file; any others are ignored
+IMPORT_COLUMNS = ('name', 'price', 'description', 'duration', 'includes')
+
+
+class ImportFormatError(ValueError):
+    """An import file could not be read as a package spreadsheet."""
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _records(header, rows, max_rows):
+    columns = [_cell(name).lower() for name in header]
+    if 'name' not in columns:
+        raise ImportFormatError('The first row must name the columns and include "name"')
+    positions = {field: columns.index(field) for field in IMPORT_COLUMNS if field in columns}
+    records = []
+    for row in rows:
+        record = {field: _cell(row[i]) if i < len(row) else '' for field, i in positions.items()}
+        if not record['name']:
+            # Blank or spacer rows
+            continue
+        records.append(record)
+        if max_rows is not None and len(records) > max_rows:
+            raise ImportFormatError(f'Import files may contain at most {max_rows} packages')
+    return records
+
+
+def read_csv_rows(stream, max_rows=None):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            raise ImportFormatError('The file is empty')
+        return _records(header, reader, max_rows)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f'Could not read CSV: {e}')
+    finally:
+        text.detach()
+
+
+def read_xlsx_rows(stream, max_rows=None):
+    """Rows of the first worksheet, read in openpyxl's streaming read-only mode."""
+    if load_workbook is None:
+        raise ImportFormatError('openpyxl is not installed; import a CSV file instead')
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f'Could not read XLSX: {e}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFormatError('The file is empty')
+        return _records(header, rows, max_rows)
+    finally:
+        workbook.close()
+
+
+def read_package_rows(stream, filename, max_rows=None):
+    """Package fields (column -> text) for each data row of a .csv or .xlsx file."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return read_csv_rows(stream, max_rows)
+    if extension == 'xlsx':
+        return read_xlsx_rows(stream, max_rows)
+    raise ImportFormatError('Import files must be .csv or .xlsx')
@@ -0,0 +1,97 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash
+from metrics import registry
+
+check_seconds = registry.histogram(
+    'travel_password_check_duration_seconds',
+    'Time to check a password against its stored hash on the hashing pool (cache misses only)',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+def timed_check_password_hash(pwhash, password):
+    started = time.perf_counter()
+    try:
+        return check_password_hash(pwhash, password)
+    finally:
+        check_seconds.observe(time.perf_counter() - started)
+
+
+class VerifierBusy(Exception):
+    """Every hash verification slot is taken; the caller should retry later."""
+
+
+class PasswordVerifier:
+    """Check passwords against stored hashes on a bounded thread pool.
+
+    scrypt/pbkdf2 release the GIL, so up to `workers` checks run in
+    parallel; at most `max_pending` may be running or queued, and further
+    calls raise VerifierBusy at once instead of piling up. Successful checks
+    are remembered for `cache_ttl` seconds under an HMAC of the stored hash
+    and password (keyed per process), so repeated logins by the same user
+    skip the key derivation; a password change alters the stored hash and
+    so the key. Failed checks are never cached.
+    """
+
+    def __init__(self, workers=2, max_pending=8, cache_size=1024, cache_ttl=300):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._key = os.urandom(32)
+        self._verified = OrderedDict()
+        self.busy_rejections = 0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._pid = os.getpid()
+            return self._pool
+
+    def _cache_key(self, pwhash, password):
+        return hmac.new(self._key, f'{pwhash}\0{password}'.encode('utf-8'), hashlib.sha256).digest()
+
+    def _cached(self, key):
+        with self._lock:
+            verified_at = self._verified.get(key)
+            if verified_at is None:
+                return False
+            if time.monotonic() - verified_at > self.cache_ttl:
+                del self._verified[key]
+                return False
+            return True
+
+    def _remember(self, key):
+        with self._lock:
+            self._verified[key] = time.monotonic()
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+    def verify(self, pwhash, password):
+        """True when password matches pwhash; raises VerifierBusy when the pool is saturated."""
+        if not pwhash:
+            return False
+        key = self._cache_key(pwhash, password)
+        if self._cached(key):
+            return True
+        if not self._slots.acquire(blocking=False):
+            self.busy_rejections += 1
+            raise VerifierBusy()
+        try:
+            ok = self._executor().submit(timed_check_password_hash, pwhash, password).result()
+        finally:
+            self._slots.release()
+        if ok:
+            self._remember(key)
+        return ok
@@ -0,0 +1,12 @@
+import os
+
+
+def pid_alive(pid):
+    """True while a process with this id exists (including one owned by another user)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,205 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: burst requests at once, refilled at rate per second.
+
+    State is kept in this process only, so with several server processes
+    each one enforces the limit separately (SharedTokenBucketLimiter keeps
+    it in a file they all use). The least recently used keys
+    are dropped beyond max_keys; a dropped key simply starts with a full
+    bucket again.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def acquire(self, key, cost=1.0):
+        """Take cost tokens for key. Returns (allowed, seconds until enough tokens are available)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            else:
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return True, 0
+        return False, math.ceil((cost - tokens) / self.rate) if self.rate else None
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class SharedTokenBucketLimiter:
+    """Token buckets like TokenBucketLimiter, kept in a SQLite file so every process shares them.
+
+    Each acquire() is one short write transaction, so all server processes
+    using the same path draw on the same bucket for a key; that suits checks
+    on rare, costly requests such as logins. Several limiters can share one
+    file under different names. Buckets that have refilled completely hold
+    nothing a fresh bucket would not and are deleted every prune_every
+    acquires. rejected counts this process's rejections only.
+    """
+
+    def __init__(self, path, name, rate, burst, prune_every=1000):
+        self.path = str(path)
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._acquires = 0
+        self.rejected = 0
+        # Closed again at once: limiters are built at import, which under gunicorn's
+        # preload_app is in the master, and a SQLite connection must not cross fork()
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'name TEXT NOT NULL, key TEXT NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL, '
+                'PRIMARY KEY (name, key))'
+            )
+        finally:
+            conn.close()
+
+    def _connection(self):
+        """This thread's connection, opened on first use in each process."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def acquire(self, key, cost=1.0):
+        """Take cost tokens for key. Returns (allowed, seconds until enough tokens are available)."""
+        conn = self._connection()
+        # Wall-clock time, since the file outlives processes (and reboots)
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM buckets WHERE name = ? AND key = ?', (self.name, key)
+            ).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0, now - updated) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (name, key, tokens, updated) VALUES (?, ?, ?, ?)',
+                (self.name, key, tokens, now)
+            )
+            with self._lock:
+                self._acquires += 1
+                prune = self.rate and self._acquires % self.prune_every == 0
+                if not allowed:
+                    self.rejected += 1
+            if prune:
+                conn.execute(
+                    'DELETE FROM buckets WHERE name = ? AND updated < ?', (self.name, now - self.burst / self.rate)
+                )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        if allowed:
+            return True, 0
+        return False, math.ceil((cost - tokens) / self.rate) if self.rate else None
+
+    def reset(self, key):
+        self._connection().execute('DELETE FROM buckets WHERE name = ? AND key = ?', (self.name, key))
+
+
+class SlidingWindowLimiter:
+    """At most limit requests per key in any window seconds.
+
+    Keeps the times of a key's last limit requests, so unlike a fixed
+    window it never lets 2 x limit through around a window boundary. A
+    limit of 0 or less disables the limiter. As with TokenBucketLimiter,
+    state is per process and the least recently used keys are dropped
+    beyond max_keys.
+    """
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def acquire(self, key):
+        """Count a request for key. Returns (allowed, seconds until the next one would be)."""
+        if self.limit <= 0:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.pop(key, None) or deque(maxlen=self.limit)
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            allowed = len(hits) < self.limit
+            if allowed:
+                hits.append(now)
+            else:
+                self.rejected += 1
+            self._hits[key] = hits
+            if len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        if allowed:
+            return True, 0
+        return False, max(1, math.ceil(hits[0] + self.window - now))
+
+
+class DuplicateFilter:
+    """Recently seen request fingerprints, each remembered for ttl seconds.
+
+    Holds at most max_size fingerprints; beyond that the oldest are
+    forgotten first. Per process, like the limiters.
+    """
+
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def claim(self, fingerprint, value):
+        """Remember fingerprint with value. Returns None, or the value it was claimed with if still remembered."""
+        now = time.monotonic()
+        with self._lock:
+            while self._seen and next(iter(self._seen.values()))[0] <= now - self.ttl:
+                self._seen.popitem(last=False)
+            if fingerprint in self._seen:
+                self.duplicates += 1
+                return self._seen[fingerprint][1]
+            self._seen[fingerprint] = (now, value)
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+        return None
+
+    def discard(self, fingerprint):
+        """Forget fingerprint, e.g. when the request it was claimed for failed."""
+        with self._lock:
+            self._seen.pop(fingerprint, None)
@@ -0,0 +1,309 @@
+import copy
+import threading
+from pathlib import Path
+from storage import JsonFileStore
+from enquiry_store import EnquiryLog, migrate_enquiries_from_data
+
+# Record collections every backend provides, with the fields each one is
+# looked up by and the fields whose non-empty values must be unique
+COLLECTIONS = {
+    'all_packages': {'indexed': ('image',), 'unique': ()},
+    'high_selling_packages': {'indexed': ('image',), 'unique': ()},
+    'home_images': {'indexed': ('url',), 'unique': ()},
+    'users': {'indexed': (), 'unique': ('username', 'email')}
+}
+DEFAULT_ABOUT = {'content': '', 'video': ''}
+DATA_KEYS = ('high_selling_packages', 'all_packages', 'home_images')
+BACKENDS = ('json', 'sqlite')
+
+
+class DuplicateRecord(ValueError):
+    """A record would repeat the value of a unique field."""
+
+    def __init__(self, field):
+        super().__init__(f'{field.capitalize()} already exists')
+        self.field = field
+
+
+class RecordNotFound(LookupError):
+    """No record has the requested id."""
+
+    def __init__(self, record_id):
+        super().__init__(f'No record with id {record_id}')
+        self.record_id = record_id
+
+
+class BatchError(Exception):
+    """Operation `index` of a batch failed, so none of the batch was applied."""
+
+    def __init__(self, index, error):
+        super().__init__(f'Operation {index}: {error}')
+        self.index = index
+        self.error = error
+
+
+def ensure_data_schema(data):
+    normalized = dict(data) if isinstance(data, dict) else {}
+    for key in DATA_KEYS:
+        if key not in normalized or not isinstance(normalized[key], list):
+            normalized[key] = []
+    return normalized
+
+
+def ensure_users_list(users):
+    return users if isinstance(users, list) else []
+
+
+def check_unique(records, record, fields):
+    """Raise DuplicateRecord when another record in records shares a unique value with record."""
+    for field in fields:
+        value = record.get(field)
+        if value in (None, ''):
+            continue
+        if any(other.get(field) == value and other.get('id') != record.get('id') for other in records):
+            raise DuplicateRecord(field)
+
+
+class Repository:
+    """Persistence for the site's records, independent of how they are stored.
+
+    Backends expose each name in COLLECTIONS as a collection, plus `about`
+    (a single document) and `enquiries` (with the EnquiryLog interface).
+    Collections and the about document all offer snapshot(), so catalogue
+    responses can be validated and cached the same way on every backend.
+
+    Collection methods:
+      snapshot()                  -> Snapshot(records, version, etag, last_modified)
+      all()                       -> records in insertion order (read-only)
+      get(record_id)              -> record or None
+      find(field, value)          -> records whose field equals value
+      add(record)                 -> record; raises DuplicateRecord
+      update(record_id, mutator)  -> (True, mutator(record)) or (False, None)
+      update_where(field, value, mutator) -> number of records changed
+      delete(record_id)           -> removed record or None
+      apply(operations)           -> one result per operation; raises BatchError
+      replace_all(records)
+
+    apply() takes ('add', record), ('update', record_id, mutator) and
+    ('delete', record_id) tuples and commits all of them in a single write,
+    or none of them.
+    """
+
+    def collection(self, name):
+        if name not in COLLECTIONS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def export(self):
+        """Everything stored, as one JSON-serializable document."""
+        dump = {name: list(self.collection(name).all()) for name in COLLECTIONS}
+        dump['about'] = dict(self.about.get())
+        dump['enquiries'] = list(self.enquiries.all())
+        return dump
+
+    def import_dump(self, dump):
+        """Replace the stored records with those in an export() document."""
+        for name in COLLECTIONS:
+            self.collection(name).replace_all(copy.deepcopy(dump.get(name) or []))
+        self.about.replace(copy.deepcopy(dump.get('about') or DEFAULT_ABOUT))
+        self.enquiries.replace_all(copy.deepcopy(dump.get('enquiries') or []))
+
+    def close(self):
+        """Release handles this thread holds open; they are reopened on next use.
+
+        Called before forking worker processes so none inherit them.
+        """
+
+
+class JsonCollection:
+    """A list of records inside a JsonFileStore document.
+
+    Lookups go through per-field dictionaries that are built on first use
+    for each version of the document; writes rewrite the whole file.
+    """
+
+    def __init__(self, store, key=None, unique=()):
+        self.store = store
+        self.key = key
+        self.unique = unique
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._indexed_version = None
+
+    def _records(self, document):
+        return document if self.key is None else document[self.key]
+
+    def snapshot(self):
+        snapshot = self.store.snapshot()
+        return snapshot if self.key is None else snapshot._replace(data=snapshot.data.get(self.key, []))
+
+    def all(self):
+        return self.snapshot().data
+
+    def _index(self, field):
+        snapshot = self.snapshot()
+        with self._lock:
+            if self._indexed_version != snapshot.version:
+                self._indexes = {}
+                self._indexed_version = snapshot.version
+            index = self._indexes.get(field)
+            if index is None:
+                index = {}
+                for record in snapshot.data:
+                    index.setdefault(record.get(field), []).append(record)
+                self._indexes[field] = index
+            return index
+
+    def get(self, record_id):
+        matches = self._index('id').get(record_id)
+        return matches[0] if matches else None
+
+    def find(self, field, value):
+        return list(self._index(field).get(value, ()))
+
+    def add(self, record):
+        def append(document):
+            records = self._records(document)
+            check_unique(records, record, self.unique)
+            records.append(record)
+
+        self.store.update(append)
+        return record
+
+    def update(self, record_id, mutator):
+        def apply(document):
+            records = self._records(document)
+            for record in records:
+                if record.get('id') == record_id:
+                    # Mutate a copy so a rejected change leaves the batch untouched
+                    candidate = copy.deepcopy(record)
+                    result = mutator(candidate)
+                    check_unique(records, candidate, self.unique)
+                    record.clear()
+                    record.update(candidate)
+                    return True, result
+            return False, None
+
+        return self.store.update(apply)
+
+    def update_where(self, field, value, mutator):
+        if not self.find(field, value):
+            return 0
+
+        def apply(document):
+            changed = 0
+            for record in self._records(document):
+                if record.get(field) == value:
+                    before = copy.deepcopy(record)
+                    mutator(record)
+                    changed += record != before
+            return changed
+
+        return self.store.update(apply)
+
+    def delete(self, record_id):
+        def remove(document):
+            records = self._records(document)
+            for i, record in enumerate(records):
+                if record.get('id') == record_id:
+                    return records.pop(i)
+            return None
+
+        return self.store.update(remove)
+
+    def apply(self, operations):
+        def apply_all(document):
+            records = self._records(document)
+            # Work on a copy of the list; deleted slots become None
+            working = list(records)
+            positions = {record.get('id'): i for i, record in enumerate(working)}
+            results = []
+            for index, operation in enumerate(operations):
+                try:
+                    results.append(self._apply_one(working, positions, operation))
+                except (RecordNotFound, DuplicateRecord) as e:
+                    raise BatchError(index, e)
+            records[:] = [record for record in working if record is not None]
+            return results
+
+        return self.store.update(apply_all)
+
+    def _apply_one(self, working, positions, operation):
+        kind = operation[0]
+        if kind == 'add':
+            record = operation[1]
+            if self.unique:
+                check_unique([r for r in working if r is not None], record, self.unique)
+            positions[record.get('id')] = len(working)
+            working.append(record)
+            return record
+        record_id = operation[1]
+        i = positions.get(record_id)
+        if i is None:
+            raise RecordNotFound(record_id)
+        if kind == 'delete':
+            del positions[record_id]
+            removed, working[i] = working[i], None
+            return removed
+        candidate = copy.deepcopy(working[i])
+        result = operation[2](candidate)
+        if self.unique:
+            check_unique([r for r in working if r is not None], candidate, self.unique)
+        working[i] = candidate
+        return result
+
+    def replace_all(self, records):
+        def replace(document):
+            self._records(document)[:] = records
+
+        self.store.update(replace)
+
+
+class JsonDocument:
+    """A single JSON object kept in its own file."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def snapshot(self):
+        return self.store.snapshot()
+
+    def get(self):
+        return self.store.get()
+
+    def update(self, mutator):
+        """Apply mutator(document) and persist it; returns what the mutator returned."""
+        return self.store.update(mutator)
+
+    def replace(self, document):
+        self.store.save(document)
+
+
+# Files the json backend keeps its records in, relative to the data directory
+JSON_FILES = ('data.json', 'about.json', 'users.json', 'enquiries.jsonl')
+
+
+class JsonRepository(Repository):
+    """The original file layout: data.json, about.json, users.json and enquiries.jsonl."""
+
+    def __init__(self, data_dir, check_interval=1.0):
+        data_dir = Path(data_dir)
+        self.data_store = JsonFileStore(data_dir / 'data.json', dict, ensure_data_schema, check_interval)
+        self.about_store = JsonFileStore(data_dir / 'about.json', lambda: dict(DEFAULT_ABOUT), check_interval=check_interval)
+        self.users_store = JsonFileStore(data_dir / 'users.json', list, ensure_users_list, check_interval)
+        for name in DATA_KEYS:
+            setattr(self, name, JsonCollection(self.data_store, name, COLLECTIONS[name]['unique']))
+        self.users = JsonCollection(self.users_store, unique=COLLECTIONS['users']['unique'])
+        self.about = JsonDocument(self.about_store)
+        self.enquiries = EnquiryLog(data_dir / 'enquiries.jsonl')
+        migrate_enquiries_from_data(self.data_store, self.enquiries)
+
+
+def open_repository(backend, data_dir, check_interval=1.0, database=None):
+    """Repository for backend ('json' or 'sqlite') rooted at data_dir."""
+    if backend == 'json':
+        return JsonRepository(data_dir, check_interval)
+    if backend == 'sqlite':
+        from sqlite_repository import SqliteRepository
+        return SqliteRepository(database or Path(data_dir) / 'travel.db', check_interval)
+    raise ValueError(f'Unknown storage backend {backend!r}; expected one of {", ".join(BACKENDS)}')
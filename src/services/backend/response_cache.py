@@ -0,0 +1,65 @@
+import gzip
+import threading
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+
+class CachedBody:
+    """One encoded response body with its compressed variants."""
+
+    __slots__ = ('version', 'identity', 'gzip', 'br')
+
+    def __init__(self, version, identity, min_compress_size):
+        self.version = version
+        self.identity = identity
+        self.gzip = None
+        self.br = None
+        if len(identity) >= min_compress_size:
+            self.gzip = gzip.compress(identity, compresslevel=6, mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(identity, quality=5)
+
+    def encoded(self, accept_encodings):
+        """Return (body, content_encoding) for the best encoding the client accepts."""
+        if self.br is not None and accept_encodings.quality('br'):
+            return self.br, 'br'
+        if self.gzip is not None and accept_encodings.quality('gzip'):
+            return self.gzip, 'gzip'
+        return self.identity, None
+
+
+class ResponseCache:
+    """Serialized response bodies per endpoint, tied to the data version they were built from.
+
+    Each endpoint keeps only its latest body; asking for a different version
+    rebuilds it, so a write anywhere (including another process) retires the
+    old entry on the next request.
+    """
+
+    def __init__(self, min_compress_size=512):
+        self.min_compress_size = min_compress_size
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, version, build):
+        """Return the CachedBody for name at version, calling build() for the bytes on a miss."""
+        entry = self._entries.get(name)
+        if entry is not None and entry.version == version:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = CachedBody(version, build(), self.min_compress_size)
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
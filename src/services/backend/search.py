@@ -0,0 +1,496 @@
+import bisect
+import heapq
+import itertools
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from package_fields import parse_duration, parse_price
+
+# Fields searched, and the bit each one sets in a term's field mask
+NAME, INCLUDES, DESCRIPTION = 1, 2, 4
+SEARCH_FIELDS = (('name', NAME), ('includes', INCLUDES), ('description', DESCRIPTION))
+# Facet bucket lower bounds; each bucket runs up to the next bound
+PRICE_BUCKETS = (0, 500, 1000, 2000, 5000, 10000)
+DURATION_BUCKETS = (1, 4, 8, 15)
+# Doc bitmasks kept between queries (each is one bit per indexed package)
+MAX_CACHED_MASKS = 4096
+# Price-ordered docs between stored prefix masks
+PRICE_CHECKPOINT = 512
+# Result orders besides relevance, each kept as a sorted view of the index
+SORT_ORDERS = ('relevance', 'price', '-price', 'duration', '-duration', 'newest')
+# Orders that compare amounts, so are kept per currency
+PRICE_SORTS = ('price', '-price')
+# Records changed in one sync beyond which sorted views are rebuilt rather than patched
+VIEW_REBUILD_THRESHOLD = 256
+
+_WORD = re.compile(r'\w+')
+_ONE = re.compile('1')
+
+
+def tokenize(text):
+    """Lower-cased words of text with accents removed."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return _WORD.findall(''.join(c for c in text if not unicodedata.combining(c)))
+
+
+def _field_text(value):
+    if isinstance(value, list):
+        return ' '.join(str(item) for item in value)
+    return value if isinstance(value, str) else ''
+
+
+def _bucket(value, bounds):
+    if value is None or value < bounds[0]:
+        return None
+    return bisect.bisect_right(bounds, value) - 1
+
+
+def _facet(bounds, counts):
+    return [
+        {'min': low, 'max': bounds[i + 1] if i + 1 < len(bounds) else None, 'count': count}
+        for i, (low, count) in enumerate(zip(bounds, counts))
+    ]
+
+
+def _bitmask(docs, size):
+    bits = bytearray((size + 7) // 8)
+    for doc in docs:
+        bits[doc >> 3] |= 1 << (doc & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _positions(mask):
+    """Positions of every set bit of mask, lowest first."""
+    return [match.start() for match in _ONE.finditer(format(mask, 'b')[::-1])]
+
+
+def _select(mask, offset, limit):
+    """Positions of the set bits of mask from the offset-th (lowest first), at most limit of them."""
+    if offset:
+        if mask.bit_count() <= offset:
+            return []
+        # Binary search for the lowest cut that keeps exactly offset set bits below it
+        lo, hi = 0, mask.bit_length()
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (mask & ((1 << mid) - 1)).bit_count() < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        mask = mask >> lo << lo
+    positions = []
+    while mask and len(positions) < limit:
+        lowest = mask & -mask
+        positions.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return positions
+
+
+class _Entry:
+    __slots__ = ('record', 'doc', 'terms', 'price', 'currency', 'duration', 'created_at')
+
+    def __init__(self, record, doc, default_currency=None):
+        self.record = record
+        self.doc = doc
+        self.terms = {}
+        for field, bit in SEARCH_FIELDS:
+            for term in tokenize(_field_text(record.get(field))):
+                self.terms[term] = self.terms.get(term, 0) | bit
+        # Records written since normalization carry their parsed values
+        if 'price_amount' in record:
+            self.price, self.currency = record['price_amount'], record.get('price_currency')
+        else:
+            self.price, self.currency = parse_price(record.get('price'))
+        if self.price is not None and self.currency is None:
+            self.currency = default_currency
+        self.duration = record['duration_days'] if 'duration_days' in record else parse_duration(record.get('duration'))
+        self.created_at = record.get('created_at')
+
+
+class _SortedView:
+    """Doc numbers ordered by key(entry), then doc number, patched in place as records change.
+
+    Entries without a value for the key sort last. A reverse view stores
+    the opposite order and is read back to front.
+    """
+
+    def __init__(self, key, reverse=False):
+        self.key = key
+        self.reverse = reverse
+        self.items = []
+
+    def _item(self, entry):
+        value = self.key(entry)
+        # (False, value) for entries with a value; reverse views are read back to front
+        return ((value is None) ^ self.reverse, value if value is not None else 0, entry.doc)
+
+    def build(self, entries):
+        self.items = sorted(self._item(entry) for entry in entries)
+
+    def add(self, entry):
+        bisect.insort(self.items, self._item(entry))
+
+    def remove(self, entry):
+        del self.items[bisect.bisect_left(self.items, self._item(entry))]
+
+    def __len__(self):
+        return len(self.items)
+
+    def docs(self):
+        return (item[2] for item in (reversed(self.items) if self.reverse else self.items))
+
+    def page(self, offset, limit):
+        if not self.reverse:
+            return [item[2] for item in self.items[offset:offset + limit]]
+        end = max(len(self.items) - offset, 0)
+        return [item[2] for item in reversed(self.items[max(end - limit, 0):end])]
+
+    def first(self, entries, limit):
+        """Docs of the limit entries that come first in this view."""
+        pick = heapq.nlargest if self.reverse else heapq.nsmallest
+        return [item[2] for item in pick(limit, map(self._item, entries))]
+
+
+def _price_in(currency):
+    """Sort key: an entry's price if it is in currency, so entries priced in others sort last."""
+    return lambda entry: entry.price if entry.currency == currency else None
+
+
+# Key (given the currency prices are compared in) and direction of each sorted view;
+# with no query, relevance is catalogue order
+SORT_KEYS = {
+    'relevance': (lambda currency: lambda entry: 0, False),
+    'price': (_price_in, False),
+    '-price': (_price_in, True),
+    'duration': (lambda currency: lambda entry: entry.duration, False),
+    '-duration': (lambda currency: lambda entry: entry.duration, True),
+    'newest': (lambda currency: lambda entry: entry.created_at, True)
+}
+
+
+class PackageSearchIndex:
+    """In-memory inverted index over a package collection.
+
+    Every record gets a document number in catalogue order. Postings, facet
+    buckets and durations are kept as sets of document numbers, which are
+    cheap to update one record at a time; queries run on bitmasks (Python
+    ints) built from those sets on first use and cached until the set
+    changes, so matching, filtering and facet counts are a handful of
+    big-integer ANDs and popcounts whatever the number of matches.
+
+    Before answering, the index compares the collection's current snapshot
+    with the records it has indexed and re-tokenizes only those that were
+    added, changed or removed, so writes made by any process are picked up
+    without a rebuild. Prices and durations are parsed once per record
+    change, not per query.
+
+    Amounts in different currencies are never compared: price filters,
+    price facets and price sorts work in one currency per query, by default
+    default_currency, which is also assumed for prices that name none.
+    """
+
+    def __init__(self, collection, default_currency=None):
+        self.collection = collection
+        self.default_currency = default_currency
+        self._lock = threading.Lock()
+        self._version = None
+        self._reset()
+
+    def _reset(self):
+        self._entries = {}
+        self._docs = {}
+        self._next_doc = 0
+        # term -> docs containing it anywhere ('all'), in the name, and in
+        # the name or includes ('primary'); facet bucket -> docs, price buckets
+        # as (currency, bucket); currency -> priced docs; days -> docs
+        self._sets = {kind: {} for kind in ('all', 'name', 'primary', 'price', 'currency', 'duration', 'days')}
+        self._masks = OrderedDict()
+        self._prefix_masks = OrderedDict()
+        self._vocabulary = None
+        self._by_price = {}
+        self._views = {}
+
+    def _link(self, kind, key, doc):
+        docs = self._sets[kind].get(key)
+        if docs is None:
+            docs = self._sets[kind][key] = set()
+        docs.add(doc)
+        self._masks.pop((kind, key), None)
+
+    def _unlink(self, kind, key, doc):
+        docs = self._sets[kind][key]
+        docs.discard(doc)
+        if not docs:
+            del self._sets[kind][key]
+        self._masks.pop((kind, key), None)
+
+    @staticmethod
+    def _cached(cache, key, build):
+        mask = cache.get(key)
+        if mask is not None:
+            cache.move_to_end(key)
+            return mask
+        mask = cache[key] = build()
+        while len(cache) > MAX_CACHED_MASKS:
+            cache.popitem(last=False)
+        return mask
+
+    def _mask(self, kind, key):
+        return self._cached(self._masks, (kind, key), lambda: _bitmask(self._sets[kind].get(key, ()), self._next_doc))
+
+    def _prefix_mask(self, kind, prefix):
+        """Mask of docs with any term starting with prefix; cached until the next change."""
+        def build():
+            if self._vocabulary is None:
+                self._vocabulary = sorted(self._sets['all'])
+            vocabulary = self._vocabulary
+            start = bisect.bisect_left(vocabulary, prefix)
+            end = bisect.bisect_left(vocabulary, prefix + '\U0010ffff', start)
+            terms = (vocabulary[i] for i in range(start, end))
+            return _bitmask(itertools.chain.from_iterable(self._sets[kind].get(term, ()) for term in terms), self._next_doc)
+        return self._cached(self._prefix_masks, (kind, prefix), build)
+
+    def _view(self, sort, currency=None):
+        key = (sort, currency if sort in PRICE_SORTS else None)
+        view = self._views.get(key)
+        if view is None:
+            sort_key, reverse = SORT_KEYS[sort]
+            view = self._views[key] = _SortedView(sort_key(key[1]), reverse)
+            view.build(self._docs.values())
+        return view
+
+    def _buckets(self, entry):
+        """(kind, facet bucket) pairs entry is counted in."""
+        buckets = []
+        price_bucket = _bucket(entry.price, PRICE_BUCKETS)
+        if price_bucket is not None:
+            buckets.append(('price', (entry.currency, price_bucket)))
+        duration_bucket = _bucket(entry.duration, DURATION_BUCKETS)
+        if duration_bucket is not None:
+            buckets.append(('duration', duration_bucket))
+        if entry.price is not None:
+            buckets.append(('currency', entry.currency))
+        return buckets
+
+    def _add(self, record, doc):
+        entry = _Entry(record, doc, self.default_currency)
+        self._entries[record.get('id')] = entry
+        self._docs[doc] = entry
+        for term, fields in entry.terms.items():
+            if term not in self._sets['all']:
+                self._vocabulary = None
+            self._link('all', term, doc)
+            if fields & NAME:
+                self._link('name', term, doc)
+            if fields & (NAME | INCLUDES):
+                self._link('primary', term, doc)
+        for kind, bucket in self._buckets(entry):
+            self._link(kind, bucket, doc)
+        if entry.duration is not None:
+            self._link('days', entry.duration, doc)
+        return entry
+
+    def _remove(self, record_id):
+        entry = self._entries.pop(record_id)
+        doc = entry.doc
+        del self._docs[doc]
+        for term, fields in entry.terms.items():
+            self._unlink('all', term, doc)
+            if term not in self._sets['all']:
+                self._vocabulary = None
+            if fields & NAME:
+                self._unlink('name', term, doc)
+            if fields & (NAME | INCLUDES):
+                self._unlink('primary', term, doc)
+        for kind, bucket in self._buckets(entry):
+            self._unlink(kind, bucket, doc)
+        if entry.duration is not None:
+            self._unlink('days', entry.duration, doc)
+        return entry
+
+    def _sync(self):
+        snapshot = self.collection.snapshot()
+        if snapshot.version == self._version:
+            return
+        if self._next_doc > 2 * len(snapshot.data) + 1024:
+            # Deleted records leave holes in the document numbers; renumber
+            self._reset()
+        seen = set()
+        added, removed = [], []
+        for record in snapshot.data:
+            record_id = record.get('id')
+            seen.add(record_id)
+            entry = self._entries.get(record_id)
+            if entry is not None:
+                if entry.record is record:
+                    continue
+                if entry.record == record:
+                    entry.record = record
+                    continue
+                # Changed records keep their place in catalogue order
+                removed.append(self._remove(record_id))
+                doc = entry.doc
+            else:
+                doc = self._next_doc
+                self._next_doc += 1
+            added.append(self._add(record, doc))
+        for record_id in [record_id for record_id in self._entries if record_id not in seen]:
+            removed.append(self._remove(record_id))
+        if added or removed:
+            self._prefix_masks.clear()
+            self._by_price = {}
+            if len(added) + len(removed) > VIEW_REBUILD_THRESHOLD:
+                self._views = {}
+            for view in self._views.values():
+                for entry in removed:
+                    view.remove(entry)
+                for entry in added:
+                    view.add(entry)
+        self._version = snapshot.version
+
+    def _term_masks(self, term, prefix):
+        """(all, name, name-or-includes) masks for term, or for every term it prefixes."""
+        mask = self._prefix_mask if prefix else self._mask
+        return tuple(mask(kind, term) for kind in ('all', 'name', 'primary'))
+
+    def _text_matches(self, terms):
+        """Mask of docs containing every term (the last one as a prefix), and its relevance tiers.
+
+        Tiers, best first: every term in the name; every term in the name or
+        includes; the rest.
+        """
+        matches = name = primary = -1
+        for i, term in enumerate(terms):
+            term_all, term_name, term_primary = self._term_masks(term, i == len(terms) - 1)
+            matches &= term_all
+            if not matches:
+                return 0, []
+            name &= term_name
+            primary &= term_primary
+        name &= matches
+        primary &= matches
+        return matches, [name, primary & ~name, matches & ~primary]
+
+    def _price_prefix(self, by_price, n):
+        """Mask of the n lowest-priced docs of by_price."""
+        _, docs, checkpoints = by_price
+        start = n // PRICE_CHECKPOINT * PRICE_CHECKPOINT
+        return checkpoints[n // PRICE_CHECKPOINT] | _bitmask(docs[start:n], self._next_doc)
+
+    def _price_mask(self, currency, min_price, max_price):
+        """Mask of the docs priced in currency between min_price and max_price."""
+        by_price = self._by_price.get(currency)
+        if by_price is None:
+            priced = [item for item in self._view('price', currency).items if not item[0]]
+            prices, docs = [item[1] for item in priced], [item[2] for item in priced]
+            bits, checkpoints = bytearray((self._next_doc + 7) // 8), []
+            for i, doc in enumerate(docs):
+                if i % PRICE_CHECKPOINT == 0:
+                    checkpoints.append(int.from_bytes(bits, 'little'))
+                bits[doc >> 3] |= 1 << (doc & 7)
+            checkpoints.append(int.from_bytes(bits, 'little'))
+            by_price = self._by_price[currency] = (prices, docs, checkpoints)
+        prices = by_price[0]
+        lo = bisect.bisect_left(prices, min_price) if min_price is not None else 0
+        hi = bisect.bisect_right(prices, max_price) if max_price is not None else len(prices)
+        return self._price_prefix(by_price, hi) & ~self._price_prefix(by_price, lo) if hi > lo else 0
+
+    def _tiered_page(self, tiers, offset, limit):
+        """(page of docs, total) for the docs in tiers, best tier first, then catalogue order."""
+        counts = [tier.bit_count() for tier in tiers]
+        page, skip = [], offset
+        for tier, count in zip(tiers, counts):
+            if skip >= count:
+                skip -= count
+                continue
+            page += _select(tier, skip, limit - len(page))
+            skip = 0
+            if len(page) >= limit:
+                break
+        return page, sum(counts)
+
+    def _sorted_page(self, view, tiers, offset, limit):
+        """(page of docs, total) for the docs in tiers, in view order."""
+        mask = 0
+        for tier in tiers:
+            mask |= tier
+        total = mask.bit_count()
+        if total * 16 < len(view):
+            # Few matches: pick the first ones directly
+            page = view.first((self._docs[doc] for doc in _positions(mask)), offset + limit)[offset:]
+        else:
+            # Many matches: walk the view until the page is full
+            bits = mask.to_bytes((self._next_doc + 8) // 8, 'little')
+            matching = (doc for doc in view.docs() if bits[doc >> 3] >> (doc & 7) & 1)
+            page = list(itertools.islice(matching, offset, offset + limit))
+        return page, total
+
+    def _duration_mask(self, min_duration, max_duration):
+        mask = 0
+        for days in list(self._sets['days']):
+            if (min_duration is None or days >= min_duration) and (max_duration is None or days <= max_duration):
+                mask |= self._mask('days', days)
+        return mask
+
+    def search(self, query='', min_price=None, max_price=None, min_duration=None, max_duration=None,
+               sort='relevance', limit=20, offset=0, currency=None):
+        """Matching packages in sort order (one of SORT_ORDERS), with price and duration facet counts.
+
+        Returns {'total', 'results', 'facets', 'currency'}. Facets count every
+        record that matches the text query, before the range filters, so
+        clients can show how many packages each bucket would give. Price
+        filters, price facets and price sorts use amounts in currency
+        (default_currency when None) only; packages priced in another
+        currency are filtered out by a price range and sorted last by price.
+        The 'currency' facet counts matching packages per price currency.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f'sort must be one of {", ".join(SORT_ORDERS)}')
+        currency = currency or self.default_currency
+        with self._lock:
+            self._sync()
+            terms = tokenize(query or '')
+            matches, tiers = self._text_matches(terms) if terms else (None, None)
+
+            def count(kind, key):
+                if matches is None:
+                    return len(self._sets[kind].get(key, ()))
+                return (self._mask(kind, key) & matches).bit_count()
+
+            facets = {
+                'price': _facet(PRICE_BUCKETS, [count('price', (currency, i)) for i in range(len(PRICE_BUCKETS))]),
+                'duration': _facet(DURATION_BUCKETS, [count('duration', i) for i in range(len(DURATION_BUCKETS))]),
+                'currency': []
+            }
+            # None (no currency named, and no default) sorts first
+            for code in sorted(self._sets['currency'], key=lambda code: code or ''):
+                n = count('currency', code)
+                if n:
+                    facets['currency'].append({'currency': code, 'count': n})
+
+            filters = []
+            if min_price is not None or max_price is not None:
+                filters.append(self._price_mask(currency, min_price, max_price))
+            if min_duration is not None or max_duration is not None:
+                filters.append(self._duration_mask(min_duration, max_duration))
+
+            if tiers is None and not filters:
+                view = self._view(sort, currency)
+                page = view.page(offset, limit)
+                total = len(view)
+            else:
+                if tiers is None:
+                    tiers = [filters.pop()]
+                for mask in filters:
+                    tiers = [tier & mask for tier in tiers]
+                if sort == 'relevance':
+                    page, total = self._tiered_page(tiers, offset, limit)
+                else:
+                    page, total = self._sorted_page(self._view(sort, currency), tiers, offset, limit)
+            return {
+                'total': total,
+                'results': [self._docs[doc].record for doc in page],
+                'facets': facets,
+                'currency': currency
+            }
@@ -0,0 +1,505 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from storage import FileLock, Snapshot, content_digest, io_bytes, record_io
+from enquiry_store import decode_cursor, encode_cursor, package_key, sort_key
+from repository import (
+    BatchError, COLLECTIONS, DEFAULT_ABOUT, DuplicateRecord, JSON_FILES, JsonRepository, RecordNotFound, Repository
+)
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(',', ':'))
+
+
+class SqliteDatabase:
+    """One SQLite file in WAL mode, with a connection per thread and process.
+
+    Readers never block the writer and see a consistent snapshot for the
+    length of a read() block; write() transactions start with BEGIN IMMEDIATE
+    so concurrent writers queue on the database lock instead of failing late.
+    Every write bumps the revision of what it touched in the same
+    transaction, which is what cached reads are validated against.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        with self.write() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS revisions ('
+                'name TEXT PRIMARY KEY, revision INTEGER NOT NULL, updated_at REAL NOT NULL)'
+            )
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', ?)", (uuid.uuid4().hex,))
+            self.instance = conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()[0]
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    @contextmanager
+    def read(self):
+        conn = self.connection()
+        started = time.perf_counter()
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        finally:
+            conn.execute('COMMIT')
+            record_io(self.path.name, 'read', time.perf_counter() - started)
+
+    @contextmanager
+    def write(self):
+        conn = self.connection()
+        started = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        record_io(self.path.name, 'write', time.perf_counter() - started)
+
+    def encode(self, record):
+        """JSON text of a record about to be written, counted as bytes written."""
+        data = _dumps(record)
+        io_bytes.inc((self.path.name, 'write'), len(data))
+        return data
+
+    def decode(self, data):
+        """Record from JSON text read from a row, counted as bytes read."""
+        io_bytes.inc((self.path.name, 'read'), len(data))
+        return json.loads(data)
+
+    def decode_all(self, rows):
+        """Records from (data,) rows, counted as bytes read in one go."""
+        records = []
+        size = 0
+        for (data,) in rows:
+            size += len(data)
+            records.append(json.loads(data))
+        io_bytes.inc((self.path.name, 'read'), size)
+        return records
+
+    def register(self, conn, name):
+        conn.execute('INSERT OR IGNORE INTO revisions (name, revision, updated_at) VALUES (?, 0, ?)', (name, time.time()))
+
+    def bump(self, conn, name):
+        conn.execute('UPDATE revisions SET revision = revision + 1, updated_at = ? WHERE name = ?', (time.time(), name))
+
+    def revision(self, conn, name):
+        return conn.execute('SELECT revision, updated_at FROM revisions WHERE name = ?', (name,)).fetchone()
+
+
+class _CachedRead:
+    """Whole-table reads cached per revision, re-validated at most every check_interval.
+
+    load(conn) reads the data a snapshot holds.
+    """
+
+    def __init__(self, db, name, check_interval, load):
+        self.db = db
+        self.name = name
+        self.check_interval = check_interval
+        self._read_snapshot_data = load
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._revision = None
+        self._checked_at = 0.0
+
+    def snapshot(self):
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock, self.db.read() as conn:
+            revision, updated_at = self.db.revision(conn, self.name)
+            if self._snapshot is None or revision != self._revision:
+                self._snapshot = Snapshot(
+                    self._read_snapshot_data(conn),
+                    revision,
+                    content_digest(f'{self.db.instance}:{self.name}:{revision}'.encode('utf-8')),
+                    updated_at
+                )
+                self._revision = revision
+            self._checked_at = now
+            return self._snapshot
+
+    def _changed(self):
+        # Writes made here are visible to the next read in this process at once
+        self._checked_at = 0.0
+
+
+def _duplicate_field(error):
+    message = str(error)
+    if 'index' in message:
+        return message.rsplit('_', 1)[-1].rstrip("'")
+    return 'id'
+
+
+class SqliteCollection(_CachedRead):
+    """Records stored as JSON text, one row each, with expression indexes on lookup fields."""
+
+    def __init__(self, db, name, indexed=(), unique=(), check_interval=1.0):
+        super().__init__(db, name, check_interval, self._load)
+        with db.write() as conn:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {name} ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, data TEXT NOT NULL)'
+            )
+            for field in indexed:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_{field} ON {name} (json_extract(data, '$.{field}'))")
+            for field in unique:
+                conn.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_{field} ON {name} (json_extract(data, '$.{field}')) "
+                    f"WHERE json_extract(data, '$.{field}') <> ''"
+                )
+            db.register(conn, name)
+
+    def _load(self, conn):
+        return self.db.decode_all(conn.execute(f'SELECT data FROM {self.name} ORDER BY seq'))
+
+    @contextmanager
+    def _write(self):
+        try:
+            with self.db.write() as conn:
+                before = conn.total_changes
+                yield conn
+                if conn.total_changes != before:
+                    self.db.bump(conn, self.name)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateRecord(_duplicate_field(e))
+        finally:
+            self._changed()
+
+    def all(self):
+        return self.snapshot().data
+
+    def get(self, record_id):
+        row = self.db.connection().execute(f'SELECT data FROM {self.name} WHERE id = ?', (record_id,)).fetchone()
+        return self.db.decode(row[0]) if row else None
+
+    def find(self, field, value):
+        rows = self.db.connection().execute(
+            f"SELECT data FROM {self.name} WHERE json_extract(data, '$.{field}') = ? ORDER BY seq", (value,)
+        )
+        return self.db.decode_all(rows)
+
+    def add(self, record):
+        with self._write() as conn:
+            conn.execute(f'INSERT INTO {self.name} (id, data) VALUES (?, ?)', (record['id'], self.db.encode(record)))
+        return record
+
+    def update(self, record_id, mutator):
+        with self._write() as conn:
+            row = conn.execute(f'SELECT data FROM {self.name} WHERE id = ?', (record_id,)).fetchone()
+            if row is None:
+                return False, None
+            record = self.db.decode(row[0])
+            result = mutator(record)
+            conn.execute(f'UPDATE {self.name} SET data = ? WHERE id = ?', (self.db.encode(record), record_id))
+        return True, result
+
+    def update_where(self, field, value, mutator):
+        changed = 0
+        with self._write() as conn:
+            rows = conn.execute(
+                f"SELECT id, data FROM {self.name} WHERE json_extract(data, '$.{field}') = ?", (value,)
+            ).fetchall()
+            for record_id, data in rows:
+                record = self.db.decode(data)
+                mutator(record)
+                if _dumps(record) != data:
+                    conn.execute(f'UPDATE {self.name} SET data = ? WHERE id = ?', (self.db.encode(record), record_id))
+                    changed += 1
+        return changed
+
+    def delete(self, record_id):
+        with self._write() as conn:
+            row = conn.execute(f'SELECT data FROM {self.name} WHERE id = ?', (record_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f'DELETE FROM {self.name} WHERE id = ?', (record_id,))
+        return self.db.decode(row[0])
+
+    def apply(self, operations):
+        results = []
+        with self._write() as conn:
+            for index, operation in enumerate(operations):
+                try:
+                    results.append(self._apply_one(conn, operation))
+                except sqlite3.IntegrityError as e:
+                    raise BatchError(index, DuplicateRecord(_duplicate_field(e)))
+                except RecordNotFound as e:
+                    raise BatchError(index, e)
+        return results
+
+    def _apply_one(self, conn, operation):
+        kind = operation[0]
+        if kind == 'add':
+            record = operation[1]
+            conn.execute(f'INSERT INTO {self.name} (id, data) VALUES (?, ?)', (record['id'], self.db.encode(record)))
+            return record
+        record_id = operation[1]
+        row = conn.execute(f'SELECT data FROM {self.name} WHERE id = ?', (record_id,)).fetchone()
+        if row is None:
+            raise RecordNotFound(record_id)
+        record = self.db.decode(row[0])
+        if kind == 'delete':
+            conn.execute(f'DELETE FROM {self.name} WHERE id = ?', (record_id,))
+            return record
+        result = operation[2](record)
+        conn.execute(f'UPDATE {self.name} SET data = ? WHERE id = ?', (self.db.encode(record), record_id))
+        return result
+
+    def replace_all(self, records):
+        with self._write() as conn:
+            conn.execute(f'DELETE FROM {self.name}')
+            conn.executemany(
+                f'INSERT INTO {self.name} (id, data) VALUES (?, ?)',
+                ((record['id'], self.db.encode(record)) for record in records)
+            )
+
+
+class SqliteDocument(_CachedRead):
+    """A single JSON object stored as one row of the documents table."""
+
+    def __init__(self, db, name, default, check_interval=1.0):
+        super().__init__(db, name, check_interval, self._load)
+        with db.write() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS documents (name TEXT PRIMARY KEY, data TEXT NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO documents (name, data) VALUES (?, ?)', (name, _dumps(default)))
+            db.register(conn, name)
+
+    def _load(self, conn):
+        return self.db.decode(conn.execute('SELECT data FROM documents WHERE name = ?', (self.name,)).fetchone()[0])
+
+    def get(self):
+        return self.snapshot().data
+
+    def update(self, mutator):
+        """Apply mutator(document) and persist it; returns what the mutator returned."""
+        try:
+            with self.db.write() as conn:
+                document = self._load(conn)
+                result = mutator(document)
+                conn.execute('UPDATE documents SET data = ? WHERE name = ?', (self.db.encode(document), self.name))
+                self.db.bump(conn, self.name)
+        finally:
+            self._changed()
+        return result
+
+    def replace(self, document):
+        def replace(current):
+            current.clear()
+            current.update(document)
+        self.update(replace)
+
+
+class SqliteEnquiries(_CachedRead):
+    """Enquiries table with the EnquiryLog interface.
+
+    The (timestamp, id) and (package, timestamp, id) indexes give query()
+    the same ordering and cursor semantics as the log's in-memory indexes.
+    """
+
+    def __init__(self, db, check_interval=1.0):
+        super().__init__(db, 'enquiries', check_interval, self._load)
+        with db.write() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS enquiries ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, '
+                'timestamp TEXT NOT NULL, package TEXT NOT NULL, data TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS enquiries_time ON enquiries (timestamp, id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS enquiries_package ON enquiries (package, timestamp, id)')
+            db.register(conn, 'enquiries')
+
+    def _load(self, conn):
+        return self.db.decode_all(conn.execute('SELECT data FROM enquiries ORDER BY seq'))
+
+    def _row(self, enquiry):
+        timestamp, enquiry_id = sort_key(enquiry)
+        return enquiry_id, timestamp, package_key(enquiry), self.db.encode(enquiry)
+
+    def stamp(self):
+        with self.db.read() as conn:
+            revision, _ = self.db.revision(conn, self.name)
+        return f'{self.db.instance}:{revision}'
+
+    def refresh(self):
+        self._changed()
+
+    def all(self):
+        return self.snapshot().data
+
+    def get(self, enquiry_id):
+        row = self.db.connection().execute('SELECT data FROM enquiries WHERE id = ?', (enquiry_id,)).fetchone()
+        return self.db.decode(row[0]) if row else None
+
+    def query(self, since=None, until=None, package=None, descending=True, limit=50, cursor=None):
+        """Return (page, next_cursor, total) for enquiries in [since, until)."""
+        where, params = [], []
+        if package is not None:
+            where.append('package = ?')
+            params.append(package.strip().lower())
+        if since:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            where.append('timestamp < ?')
+            params.append(until)
+        with self.db.read() as conn:
+            total = conn.execute(
+                'SELECT COUNT(*) FROM enquiries' + (' WHERE ' + ' AND '.join(where) if where else ''), params
+            ).fetchone()[0]
+            if cursor is not None:
+                where.append('(timestamp, id) < (?, ?)' if descending else '(timestamp, id) > (?, ?)')
+                params.extend(decode_cursor(cursor))
+            direction = 'DESC' if descending else 'ASC'
+            rows = conn.execute(
+                'SELECT data, timestamp, id FROM enquiries'
+                + (' WHERE ' + ' AND '.join(where) if where else '')
+                + f' ORDER BY timestamp {direction}, id {direction} LIMIT ?',
+                params + [limit + 1]
+            ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        page = self.db.decode_all((data,) for data, _, _ in rows)
+        next_cursor = encode_cursor((rows[-1][1], rows[-1][2])) if more and rows else None
+        return page, next_cursor, total
+
+    def scan(self, since=None, until=None, package=None, batch_size=1000):
+        """Yield the enquiries in [since, until), oldest first, reading batch_size rows per transaction."""
+        where, params = [], []
+        if package is not None:
+            where.append('package = ?')
+            params.append(package.strip().lower())
+        if since:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            where.append('timestamp < ?')
+            params.append(until)
+        after = None
+        while True:
+            conditions = where + ['(timestamp, id) > (?, ?)'] if after else where
+            with self.db.read() as conn:
+                rows = conn.execute(
+                    'SELECT data, timestamp, id FROM enquiries'
+                    + (' WHERE ' + ' AND '.join(conditions) if conditions else '')
+                    + ' ORDER BY timestamp, id LIMIT ?',
+                    params + list(after or ()) + [batch_size]
+                ).fetchall()
+            yield from self.db.decode_all((data,) for data, _, _ in rows)
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][1], rows[-1][2]
+
+    def __len__(self):
+        return self.db.connection().execute('SELECT COUNT(*) FROM enquiries').fetchone()[0]
+
+    def _write(self, statement, rows):
+        try:
+            with self.db.write() as conn:
+                before = conn.total_changes
+                conn.executemany(statement, rows)
+                changed = conn.total_changes - before
+                if changed:
+                    self.db.bump(conn, self.name)
+        finally:
+            self._changed()
+        return changed
+
+    def add(self, enquiry):
+        """Store one enquiry, replacing any with the same id."""
+        self._write(
+            'INSERT INTO enquiries (id, timestamp, package, data) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (id) DO UPDATE SET timestamp = excluded.timestamp, '
+            'package = excluded.package, data = excluded.data',
+            [self._row(enquiry)]
+        )
+        return enquiry
+
+    def add_many(self, enquiries):
+        """Store several enquiries in one transaction, skipping ids already stored."""
+        return self._write(
+            'INSERT OR IGNORE INTO enquiries (id, timestamp, package, data) VALUES (?, ?, ?, ?)',
+            [self._row(e) for e in enquiries if e.get('id')]
+        )
+
+    def delete(self, enquiry_id):
+        """Delete an enquiry. Returns False when the id is unknown."""
+        return self._write('DELETE FROM enquiries WHERE id = ?', [(enquiry_id,)]) > 0
+
+    def delete_many(self, enquiry_ids):
+        """Delete several enquiries in one transaction. Returns how many existed."""
+        return self._write('DELETE FROM enquiries WHERE id = ?', [(i,) for i in dict.fromkeys(enquiry_ids)])
+
+    def compact(self):
+        pass
+
+    def replace_all(self, enquiries):
+        with self.db.write() as conn:
+            conn.execute('DELETE FROM enquiries')
+            conn.executemany(
+                'INSERT OR REPLACE INTO enquiries (id, timestamp, package, data) VALUES (?, ?, ?, ?)',
+                [self._row(e) for e in enquiries if e.get('id')]
+            )
+            self.db.bump(conn, self.name)
+        self._changed()
+
+
+class SqliteRepository(Repository):
+    """All records in one SQLite database file (WAL mode)."""
+
+    def __init__(self, path, check_interval=1.0):
+        self.db = SqliteDatabase(path)
+        for name, spec in COLLECTIONS.items():
+            setattr(self, name, SqliteCollection(self.db, name, spec['indexed'], spec['unique'], check_interval))
+        self.about = SqliteDocument(self.db, 'about', DEFAULT_ABOUT, check_interval)
+        self.enquiries = SqliteEnquiries(self.db, check_interval)
+
+    def adopt_json(self, data_dir):
+        """Import the json backend's records from data_dir, once, into a database that holds none.
+
+        The first call marks the database, so later ones (in any process) do
+        nothing and records deleted since are never brought back; a database
+        that already holds records is only marked. Returns the imported
+        export() document, or None when nothing was imported.
+        """
+        data_dir = Path(data_dir)
+        with FileLock(self.db.path):
+            with self.db.read() as conn:
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'json_adopted'").fetchone():
+                    return None
+            empty = not len(self.enquiries) and not any(self.collection(name).all() for name in COLLECTIONS)
+            dump = None
+            if empty and any((data_dir / name).exists() for name in JSON_FILES):
+                dump = JsonRepository(data_dir).export()
+                self.import_dump(dump)
+            with self.db.write() as conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_adopted', ?)", (str(time.time()),))
+        return dump
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,114 @@
+import mimetypes
+import os
+from urllib.parse import quote
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+CHUNK_SIZE = 256 * 1024
+SERVE_MODES = ('app', 'x-sendfile', 'x-accel-redirect')
+
+
+class _FileRange:
+    """Iterate over length bytes of an open file from its current position."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.remaining <= 0:
+            raise StopIteration
+        chunk = self.f.read(min(CHUNK_SIZE, self.remaining))
+        if not chunk:
+            raise StopIteration
+        self.remaining -= len(chunk)
+        return chunk
+
+    def close(self):
+        self.f.close()
+
+
+def resolve_file(directory, filename):
+    """Absolute path of filename inside directory; hidden files and directories are not served."""
+    path = safe_join(directory, filename)
+    if path is None or any(part.startswith('.') for part in filename.split('/')) or not os.path.isfile(path):
+        raise NotFound()
+    return path
+
+
+def file_response(request, directory, filename, cache_control, mode='app', accel_prefix='/'):
+    """Serve a file with validators, byte ranges and zero-copy transfer where possible.
+
+    mode 'app' sends the bytes from this process. Whole files (and, under
+    gunicorn, ranges too, since it bounds sendfile by Content-Length) go
+    through the server's wsgi.file_wrapper, which uses sendfile(2).
+    'x-sendfile' and 'x-accel-redirect' answer conditional requests here and
+    leave the bytes, including Range handling, to the front proxy.
+    """
+    path = resolve_file(directory, filename)
+    st = os.stat(path)
+    etag = f'{st.st_size:x}-{st.st_mtime_ns:x}'
+
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.direct_passthrough = True
+    response.set_etag(etag)
+    response.last_modified = int(st.st_mtime)
+    response.headers['Cache-Control'] = cache_control
+    response.headers['Accept-Ranges'] = 'bytes'
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = bool(request.if_modified_since) and response.last_modified <= request.if_modified_since
+    if not_modified:
+        response.status_code = 304
+        return response
+
+    if mode == 'x-sendfile':
+        response.headers['X-Sendfile'] = path
+        return response
+    if mode == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(filename)
+        return response
+
+    start, stop = 0, st.st_size
+    if request.range and _if_range_matches(request, etag, response.last_modified):
+        byte_range = request.range.range_for_length(st.st_size)
+        if byte_range is not None:
+            start, stop = byte_range
+            response.status_code = 206
+            response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{st.st_size}'
+        elif _unsatisfiable(request.range, st.st_size):
+            response.status_code = 416
+            response.headers['Content-Range'] = f'bytes */{st.st_size}'
+            return response
+        # Otherwise (e.g. several ranges) the Range header is ignored and the whole file sent
+
+    f = open(path, 'rb')
+    f.seek(start)
+    environ = request.environ
+    if stop == st.st_size or environ.get('SERVER_SOFTWARE', '').startswith('gunicorn'):
+        response.response = wrap_file(environ, f, CHUNK_SIZE)
+    else:
+        response.response = _FileRange(f, stop - start)
+    response.content_length = stop - start
+    return response
+
+
+def _unsatisfiable(byte_range, length):
+    """True when no range in byte_range overlaps a file of length bytes (RFC 9110 section 15.5.17)."""
+    return all(length == 0 if start < 0 else start >= length for start, _ in byte_range.ranges)
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.if_range
+    if not if_range.etag and not if_range.date:
+        return True
+    if if_range.etag:
+        return if_range.etag == etag
+    return if_range.date == last_modified
@@ -0,0 +1,297 @@
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from metrics import registry
+try:
+    import fcntl
+except Exception:
+    fcntl = None
+
+
+class StorageError(Exception):
+    """Raised when a stored file cannot be read safely."""
+
+
+class FileLock:
+    """Exclusive lock shared by threads and processes, held on a sidecar .lock file."""
+
+    def __init__(self, path):
+        self.path = Path(str(path) + '.lock')
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+# Finer than the request buckets: most reads and writes take well under a millisecond
+IO_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+io_seconds = registry.histogram(
+    'travel_storage_operation_duration_seconds',
+    'Time spent reading or writing a store (a data file, the enquiry log, the database, uploads or enquiries.xlsx)',
+    ('store', 'operation'),
+    IO_BUCKETS
+)
+io_bytes = registry.counter(
+    'travel_storage_bytes_total',
+    'Bytes read from or written to a store',
+    ('store', 'operation')
+)
+
+
+def record_io(store, operation, seconds, size=0):
+    """Record a 'read' or 'write' of size bytes on store that took seconds."""
+    io_seconds.observe(seconds, (store, operation))
+    if size:
+        io_bytes.inc((store, operation), size)
+
+
+def fsync_directory(path):
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path, payload, fsync=True):
+    """Replace path with payload via a temp file and rename (fsynced unless fsync=False)."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        fsync_directory(str(path.parent))
+
+
+# data: parsed document; version: in-process change counter; etag: digest of
+# the file bytes (identical in every process); last_modified: file mtime
+Snapshot = namedtuple('Snapshot', ['data', 'version', 'etag', 'last_modified'])
+
+
+def content_digest(payload):
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class _PendingWrite:
+    __slots__ = ('payload', 'result', 'error', 'done')
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.result = None
+        self.error = None
+        self.done = False
+
+
+class WriteBatcher:
+    """Group concurrent writes so that one caller commits everything queued behind it.
+
+    commit(batch) receives the pending writes, performs a single durable write
+    for all of them and sets .result (or .error) on each.
+    """
+
+    def __init__(self, commit):
+        self._commit = commit
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+    def submit(self, payload):
+        pending = _PendingWrite(payload)
+        with self._queue_lock:
+            self._queue.append(pending)
+        with self._commit_lock:
+            if not pending.done:
+                with self._queue_lock:
+                    batch, self._queue = self._queue, []
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    for item in batch:
+                        if item.error is None:
+                            item.error = e
+                for item in batch:
+                    item.done = True
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+
+class JsonFileStore:
+    """Keep a parsed JSON file in memory and reload it only when it changes on disk.
+
+    Readers call get() and must treat the result as read-only. Writers go
+    through update(mutator), which re-reads the file under a cross-process lock,
+    applies the mutator to a private copy and atomically replaces the file.
+    Mutators should validate before they change anything, since a mutator that
+    raises halfway leaves its partial changes in the batch being written.
+
+    snapshot() returns the document together with its version and a content
+    digest, which callers use for ETags and response caching.
+    """
+
+    def __init__(self, path, default_factory, normalize=None, check_interval=1.0):
+        self.path = Path(path)
+        self.default_factory = default_factory
+        self.normalize = normalize
+        self.check_interval = check_interval
+        self.version = 0
+        self.lock = FileLock(self.path)
+        self._lock = threading.RLock()
+        self._data = None
+        self._snapshot = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._corrupt = False
+        self._batcher = WriteBatcher(self._commit)
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _apply_normalize(self, data):
+        return self.normalize(data) if self.normalize else data
+
+    def _set(self, data, payload, stamp):
+        self._data = data
+        self._stamp = stamp
+        self.version += 1
+        self._snapshot = Snapshot(
+            data,
+            self.version,
+            content_digest(payload),
+            stamp[0] / 1e9 if stamp else time.time()
+        )
+
+    def _reload(self, stamp):
+        if stamp is None:
+            data = self._apply_normalize(self.default_factory())
+            payload = json.dumps(data).encode('utf-8')
+        else:
+            try:
+                started = time.perf_counter()
+                with open(self.path, 'rb') as f:
+                    payload = f.read()
+                raw = json.loads(payload)
+                record_io(self.path.name, 'read', time.perf_counter() - started, len(payload))
+            except Exception:
+                # Keep serving the last good copy rather than an empty document,
+                # and refuse writes until the file is readable again.
+                if self._data is None:
+                    data = self._apply_normalize(self.default_factory())
+                    self._set(data, json.dumps(data).encode('utf-8'), None)
+                self._corrupt = True
+                self._stamp = stamp
+                return
+            data = self._apply_normalize(raw)
+            if data != raw:
+                with self.lock:
+                    payload = self._write(data)
+                stamp = self._file_stamp()
+        self._corrupt = False
+        self._set(data, payload, stamp)
+
+    def _write(self, data):
+        started = time.perf_counter()
+        payload = json.dumps(data, indent=2).encode('utf-8')
+        atomic_write_bytes(self.path, payload)
+        record_io(self.path.name, 'write', time.perf_counter() - started, len(payload))
+        return payload
+
+    def _writable_copy(self):
+        current = self.get(fresh=True)
+        if self._corrupt:
+            raise StorageError(f'{self.path.name} could not be parsed; refusing to overwrite it')
+        return copy.deepcopy(current)
+
+    def _store(self, data):
+        payload = self._write(data)
+        self._set(data, payload, self._file_stamp())
+        self._checked_at = time.monotonic()
+
+    def _commit(self, batch):
+        with self._lock, self.lock:
+            data = self._writable_copy()
+            for item in batch:
+                try:
+                    item.result = item.payload(data)
+                except Exception as e:
+                    item.error = e
+            self._store(self._apply_normalize(data))
+
+    def snapshot(self, fresh=False):
+        """Return the cached Snapshot, re-checking the file at most every check_interval seconds."""
+        now = time.monotonic()
+        if not fresh and self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            stamp = self._file_stamp()
+            self._checked_at = now
+            if self._snapshot is None or stamp != self._stamp:
+                self._reload(stamp)
+            return self._snapshot
+
+    def get(self, fresh=False):
+        """Return the cached document (read-only)."""
+        return self.snapshot(fresh).data
+
+    def load(self):
+        """Return a private, mutable copy of the current document."""
+        with self._lock:
+            return self._writable_copy()
+
+    def update(self, mutator):
+        """Apply mutator(document) and persist it; returns what the mutator returned."""
+        return self._batcher.submit(mutator)
+
+    def save(self, data):
+        """Replace the whole document."""
+        def replace(document):
+            if isinstance(document, dict):
+                document.clear()
+                document.update(data)
+            else:
+                document[:] = data
+        self.update(replace)
+
+    def invalidate(self):
+        """Force the next get() to re-read the file."""
+        with self._lock:
+            self._stamp = False
+            self._checked_at = 0.0
@@ -0,0 +1,79 @@
+"""Copy the site's records between storage backends, or to and from a JSON dump.
+
+Run from src/services/backend:
+
+    python storage_tool.py copy --from json --to sqlite
+    python storage_tool.py export --backend sqlite --output dump.json
+    python storage_tool.py import --backend json dump.json
+
+Paths default to the same TRAVEL_DATA_DIR / TRAVEL_DATABASE the server uses.
+The server itself imports the JSON files the first time it starts on an
+empty SQLite database; use copy to redo that later or to go back.
+Stop the server (or accept that writes made during the copy may be lost)
+before switching TRAVEL_STORAGE to the new backend.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from repository import BACKENDS, COLLECTIONS, open_repository
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def open_backend(backend, args):
+    return open_repository(backend, args.data_dir, database=args.database)
+
+
+def summary(dump):
+    counts = {name: len(dump.get(name) or []) for name in list(COLLECTIONS) + ['enquiries']}
+    return ', '.join(f'{count} {name}' for name, count in counts.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--data-dir', type=Path, default=Path(os.environ.get('TRAVEL_DATA_DIR', BASE_DIR)))
+    parser.add_argument('--database', type=Path, default=None,
+                        help='SQLite file (default: $TRAVEL_DATABASE or <data-dir>/travel.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    copy_parser = commands.add_parser('copy', help='replace the records of one backend with another\'s')
+    copy_parser.add_argument('--from', dest='source', choices=BACKENDS, required=True)
+    copy_parser.add_argument('--to', dest='target', choices=BACKENDS, required=True)
+
+    export_parser = commands.add_parser('export', help='write every record to a JSON dump')
+    export_parser.add_argument('--backend', choices=BACKENDS, required=True)
+    export_parser.add_argument('--output', type=Path, help='file to write (default: stdout)')
+
+    import_parser = commands.add_parser('import', help='replace the records of a backend with a JSON dump')
+    import_parser.add_argument('--backend', choices=BACKENDS, required=True)
+    import_parser.add_argument('dump', type=Path)
+
+    args = parser.parse_args(argv)
+    if args.database is None and os.environ.get('TRAVEL_DATABASE'):
+        args.database = Path(os.environ['TRAVEL_DATABASE'])
+
+    if args.command == 'copy':
+        if args.source == args.target:
+            parser.error('--from and --to must differ')
+        dump = open_backend(args.source, args).export()
+        open_backend(args.target, args).import_dump(dump)
+        print(f'Copied {summary(dump)} from {args.source} to {args.target}', file=sys.stderr)
+    elif args.command == 'export':
+        dump = open_backend(args.backend, args).export()
+        payload = json.dumps(dump, indent=2)
+        if args.output:
+            args.output.write_text(payload, encoding='utf-8')
+        else:
+            sys.stdout.write(payload + '\n')
+        print(f'Exported {summary(dump)}', file=sys.stderr)
+    else:
+        dump = json.loads(args.dump.read_text(encoding='utf-8'))
+        open_backend(args.backend, args).import_dump(dump)
+        print(f'Imported {summary(dump)}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
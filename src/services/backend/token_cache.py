@@ -0,0 +1,79 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """LRU of decoded JWT claims keyed by a digest of the token.
+
+    An entry lives until the token's exp claim, until the user it belongs
+    to is invalidated, or until the generation passed to get() differs from
+    the one it was stored with (callers pass the user store's etag, so a
+    user change made by another process also retires cached tokens).
+
+    Also keeps the hit/miss counts and time spent authenticating requests.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._requests = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, token, generation=None):
+        """Cached claims for token, or None when it has to be decoded."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at, entry_generation = entry
+                if expires_at > time.time() and entry_generation == generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token, claims, generation=None):
+        expires_at = claims.get('exp')
+        if not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Forget every cached token issued to user_id."""
+        with self._lock:
+            for key in [k for k, (claims, _, _) in self._entries.items() if claims.get('user_id') == user_id]:
+                del self._entries[key]
+
+    def observe(self, seconds):
+        with self._lock:
+            self._requests += 1
+            self._total_seconds += seconds
+            self._max_seconds = max(self._max_seconds, seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'requests': self._requests,
+                'avg_seconds': self._total_seconds / self._requests if self._requests else 0.0,
+                'max_seconds': self._max_seconds
+            }
@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from storage import atomic_write_bytes, record_io
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def content_addressed_name(sha256, original_name):
+    """Blob name for uploaded content: its SHA-256 plus the original extension."""
+    ext = os.path.splitext(secure_filename(original_name or ''))[1].lower()
+    return f'{sha256}{ext}'
+
+
+def upload_filename(url):
+    """Filename inside the uploads folder for an /uploads/... URL, else None."""
+    if isinstance(url, str) and url.startswith('/uploads/'):
+        return url[len('/uploads/'):] or None
+    return None
+
+
+class UploadIndex:
+    """Reference-counted index of the files in the uploads folder.
+
+    New uploads are stored under their content hash, so uploading the same
+    bytes again only bumps the reference count of the existing file. Files
+    are deleted when their last reference is released. The index is a
+    JsonFileStore; blobs are moved into place or deleted inside the index
+    update, under its lock, so processes never race on the same file.
+    """
+
+    def __init__(self, store, upload_folder):
+        self.store = store
+        self.upload_folder = Path(upload_folder)
+
+    def add(self, source_path, sha256, size, original_name):
+        """Take ownership of source_path and return the stored filename, holding one reference."""
+        filename = content_addressed_name(sha256, original_name)
+
+        def add_blob(index):
+            files = index['files']
+            existing = next((name for name, entry in files.items() if entry.get('sha256') == sha256), None)
+            if existing is not None:
+                if (self.upload_folder / existing).exists():
+                    try:
+                        os.remove(source_path)
+                    except OSError:
+                        pass
+                else:
+                    os.replace(source_path, self.upload_folder / existing)
+                files[existing]['refs'] += 1
+                return existing
+            os.replace(source_path, self.upload_folder / filename)
+            files[filename] = {
+                'sha256': sha256,
+                'size': size,
+                'refs': 1,
+                'created_at': time.time()
+            }
+            return filename
+
+        return self.store.update(add_blob)
+
+    def get(self, filename, fresh=False):
+        """Index entry for filename, or None when it is not indexed (read-only)."""
+        if not filename:
+            return None
+        return self.store.get(fresh).get('files', {}).get(filename)
+
+    def set_variants(self, filename, variants):
+        """Record the derivative files generated for filename.
+
+        Returns False when filename was released in the meantime; the caller
+        then owns the derivative files and should delete them.
+        """
+        def record(index):
+            entry = index['files'].get(filename)
+            if entry is None:
+                return False
+            entry['variants'] = variants
+            return True
+
+        return self.store.update(record)
+
+    def acquire(self, filename):
+        """Add a reference to an indexed file; unknown files are ignored."""
+        if not filename or filename not in self.store.get().get('files', {}):
+            return
+
+        def add_ref(index):
+            entry = index['files'].get(filename)
+            if entry is not None:
+                entry['refs'] += 1
+
+        self.store.update(add_ref)
+
+    def release(self, filename):
+        """Drop a reference and delete the file (and its derivatives) once nothing refers to it."""
+        if not filename or filename not in self.store.get(fresh=True).get('files', {}):
+            return
+
+        def drop_ref(index):
+            entry = index['files'].get(filename)
+            if entry is None:
+                return
+            entry['refs'] -= 1
+            if entry['refs'] <= 0:
+                del index['files'][filename]
+                for name in [filename] + [v['filename'] for v in entry.get('variants') or []]:
+                    try:
+                        os.remove(self.upload_folder / name)
+                    except OSError:
+                        pass
+
+        self.store.update(drop_ref)
+
+    def adopt(self, reference_counts):
+        """Index referenced files that predate the index, e.g. uuid-named uploads."""
+        files = self.store.get(fresh=True).get('files', {})
+        missing = {
+            name: refs for name, refs in reference_counts.items()
+            if name not in files and (self.upload_folder / name).is_file()
+        }
+        if not missing:
+            return 0
+
+        def add_entries(index):
+            for name, refs in missing.items():
+                index['files'].setdefault(name, {
+                    'sha256': None,
+                    'size': (self.upload_folder / name).stat().st_size,
+                    'refs': refs,
+                    'created_at': time.time()
+                })
+
+        self.store.update(add_entries)
+        return len(missing)
+
+
+class StreamingUploadFile:
+    """Write target for an incoming multipart file part.
+
+    Bytes go straight into a .part file inside the uploads folder while
+    being hashed and counted; exceeding limit aborts the request with 413.
+    Unless commit() moved it into place, the .part file is removed on close.
+    """
+
+    def __init__(self, directory, limit=None):
+        self.directory = Path(directory)
+        self.path = self.directory / f'{uuid.uuid4().hex}.part'
+        self.limit = limit
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.committed = False
+        self._file = open(self.path, 'w+b')
+        # Time spent in disk writes, not waiting for the client
+        self._write_seconds = 0.0
+        self._written = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            # The form parser drops this object when it aborts, so clean up now.
+            self.close()
+            raise RequestEntityTooLarge(f'File exceeds the {self.limit} byte limit for this upload')
+        self.sha256.update(data)
+        started = time.perf_counter()
+        written = self._file.write(data)
+        self._write_seconds += time.perf_counter() - started
+        self._written += written
+        return written
+
+    def commit(self, upload_index, original_name):
+        """Hand the received bytes to upload_index (a rename, no copy); returns the stored filename."""
+        started = time.perf_counter()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._write_seconds += time.perf_counter() - started
+        filename = upload_index.add(self.path, self.sha256.hexdigest(), self.size, original_name)
+        self.committed = True
+        return filename
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            record_io('uploads', 'write', self._write_seconds, self._written)
+        if not self.committed:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def save_upload(file_storage, upload_index, incoming_dir, limit=None):
+    """Store an uploaded FileStorage through upload_index.
+
+    Returns (filename, sha256 hex digest, size); the caller holds one
+    reference to filename. Parts that were already streamed to disk are
+    renamed into place; anything else is first copied into incoming_dir in
+    chunks while hashing.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, StreamingUploadFile):
+        filename = stream.commit(upload_index, file_storage.filename)
+        return filename, stream.sha256.hexdigest(), stream.size
+
+    part_path = os.path.join(incoming_dir, f'{uuid.uuid4().hex}.part')
+    digest = hashlib.sha256()
+    size = 0
+    write_seconds = 0.0
+    try:
+        with open(part_path, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if limit is not None and size > limit:
+                    raise RequestEntityTooLarge(f'File exceeds the {limit} byte limit for this upload')
+                digest.update(chunk)
+                started = time.perf_counter()
+                f.write(chunk)
+                write_seconds += time.perf_counter() - started
+        record_io('uploads', 'write', write_seconds, size)
+    except BaseException:
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+        raise
+    filename = upload_index.add(part_path, digest.hexdigest(), size, file_storage.filename)
+    return filename, digest.hexdigest(), size
+
+
+class UploadSessionError(Exception):
+    """A chunked upload request that cannot be applied; carries an HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ChunkedUploads:
+    """Resumable uploads assembled from sequential chunks.
+
+    Session metadata and the partial file live in the incoming directory, so
+    any server process can accept the next chunk. The running SHA-256 is kept
+    in memory by the process that received the previous chunk; when another
+    process finishes the upload the hash is recomputed from the file.
+    """
+
+    SESSION_TTL = 24 * 3600
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._hashers = {}
+        self._lock = threading.Lock()
+
+    def _meta_path(self, session_id):
+        return self.directory / f'{session_id}.upload.json'
+
+    def _part_path(self, session_id):
+        return self.directory / f'{session_id}.upload.part'
+
+    def _save(self, session):
+        atomic_write_bytes(self._meta_path(session['id']), json.dumps(session).encode('utf-8'), fsync=False)
+
+    def get(self, session_id):
+        if not session_id.isalnum():
+            raise UploadSessionError('Upload not found', 404)
+        try:
+            return json.loads(self._meta_path(session_id).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            raise UploadSessionError('Upload not found', 404)
+
+    def create(self, filename, size, kind, limit, attributes=None):
+        if not filename:
+            raise UploadSessionError('filename is required')
+        if size < 0:
+            raise UploadSessionError('size must not be negative')
+        if limit is not None and size > limit:
+            raise UploadSessionError(f'File exceeds the {limit} byte limit for this upload', 413)
+        self.expire()
+        session = {
+            'id': uuid.uuid4().hex,
+            'filename': filename,
+            'size': size,
+            'kind': kind,
+            'offset': 0,
+            'created_at': time.time()
+        }
+        session.update(attributes or {})
+        self._part_path(session['id']).touch()
+        self._save(session)
+        with self._lock:
+            self._hashers[session['id']] = (0, hashlib.sha256())
+        return session
+
+    def write_chunk(self, session_id, start, stream, length):
+        """Append length bytes from stream at offset start; returns the updated session."""
+        session = self.get(session_id)
+        if start != session['offset']:
+            raise UploadSessionError(f"Expected a chunk starting at byte {session['offset']}", 409)
+        if start + length > session['size']:
+            raise UploadSessionError('Chunk runs past the declared upload size', 413)
+
+        with self._lock:
+            hashed_to, hasher = self._hashers.get(session_id, (None, None))
+        if hashed_to != start:
+            hasher = None
+
+        written = 0
+        write_seconds = 0.0
+        with open(self._part_path(session_id), 'r+b') as f:
+            f.seek(start)
+            while written < length:
+                chunk = stream.read(min(CHUNK_SIZE, length - written))
+                if not chunk:
+                    break
+                started = time.perf_counter()
+                f.write(chunk)
+                write_seconds += time.perf_counter() - started
+                if hasher is not None:
+                    hasher.update(chunk)
+                written += len(chunk)
+            f.truncate(start + written)
+        record_io('uploads', 'write', write_seconds, written)
+        session['offset'] = start + written
+        self._save(session)
+        with self._lock:
+            if hasher is not None:
+                self._hashers[session_id] = (session['offset'], hasher)
+            else:
+                self._hashers.pop(session_id, None)
+        if written != length:
+            raise UploadSessionError('Chunk body was shorter than its Content-Range', 400)
+        return session
+
+    def complete(self, session_id, upload_index):
+        """Hand a fully received upload to upload_index; returns (filename, sha256, size)."""
+        session = self.get(session_id)
+        if session['offset'] != session['size']:
+            raise UploadSessionError(f"Upload incomplete: {session['offset']} of {session['size']} bytes received", 409)
+        part_path = self._part_path(session_id)
+        with self._lock:
+            hashed_to, hasher = self._hashers.pop(session_id, (None, None))
+        if hashed_to != session['size']:
+            hasher = hashlib.sha256()
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+        filename = upload_index.add(part_path, hasher.hexdigest(), session['size'], session['filename'])
+        self._meta_path(session_id).unlink(missing_ok=True)
+        return filename, hasher.hexdigest(), session['size']
+
+    def abort(self, session_id):
+        self.get(session_id)
+        with self._lock:
+            self._hashers.pop(session_id, None)
+        self._part_path(session_id).unlink(missing_ok=True)
+        self._meta_path(session_id).unlink(missing_ok=True)
+
+    def expire(self):
+        """Remove sessions that have not been completed within SESSION_TTL."""
+        cutoff = time.time() - self.SESSION_TTL
+        for meta_path in self.directory.glob('*.upload.json'):
+            try:
+                if meta_path.stat().st_mtime < cutoff:
+                    session_id = meta_path.name.split('.', 1)[0]
+                    self._part_path(session_id).unlink(missing_ok=True)
+                    meta_path.unlink(missing_ok=True)
+            except OSError:
+                continue
@@ -0,0 +1,14 @@
+"""WSGI entry point for production servers.
+
+    gunicorn wsgi:app            (settings are read from ./gunicorn.conf.py)
+
+Importing this module loads the app, switches image resizing to a pool of
+IMAGE_WORKERS processes and warms the caches. With gunicorn's preload_app
+that happens once, in the master, and every worker it forks starts warm.
+`python app.py` still runs Flask's development server.
+"""
+from app import IMAGE_WORKERS, app, derivative_pool, warm_caches
+
+# Safe here: the pool's spawned processes re-import gunicorn's entry script, not app.py
+derivative_pool.workers = IMAGE_WORKERS
+warm_caches()